@@ -0,0 +1,267 @@
+"""
+HTTP API for programmatic ingestion: the app's OCR -> classify -> split
+pipeline behind a small Starlette service.
+
+    python api_server.py [--host 0.0.0.0] [--port 8000]
+
+    curl -N -F file=@bundle.pdf http://localhost:8000/v1/documents
+    curl -o bundle_categorized.zip http://localhost:8000/v1/documents/<key>/zip
+
+Endpoints:
+    POST /v1/documents            multipart upload (field ``file``); the response
+                                  is NDJSON, one event per line, as the document
+                                  goes through the pipeline
+    GET  /v1/documents/<key>      categories of a processed document
+    GET  /v1/documents/<key>/zip  ZIP of its split PDFs, sent in chunks
+    GET  /metrics                 Prometheus metrics of the tracing spans
+    GET  /health
+
+Progress events, in order (``stage`` is "ocr", "classify" or "split"):
+
+    {"event": "accepted", "key": ..., "file_name": ..., "bytes": ...}
+    {"event": "queued"}                                  only while at capacity
+    {"event": "stage", "stage": ..., "status": "started"}
+    {"event": "progress", "stage": "ocr", "done": 2, "total": 8}
+    {"event": "label", "page": 0, "category": "passport"}
+    {"event": "stage", "stage": ..., "status": "done", "seconds": ...}
+    {"event": "done", "key": ..., "categories": {...}, "zip_url": ...}
+    {"event": "error", "error": ...}
+
+The upload is read by Starlette's multipart parser, which spools the file to
+disk beyond 1 MB. Connections are handled on one asyncio event loop; the
+pipeline itself is blocking and runs on a pool of ``API_MAX_CONCURRENT_DOCUMENTS``
+threads, while its provider calls share the ``async_services`` loop. Results
+are kept in a ``ResultsStore`` keyed by the PDF's SHA-256, so uploading the
+same PDF again answers from the store.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from batch_cli import get_resources
+from document_state import DocumentState
+from pipeline import categorize_documents, create_zip_from_pdfs, process_pdf, splitPdfBasedOnCategories
+from results_store import DocumentResult, ResultsStore, result_key
+from tracing import log_event, prometheus_text, trace
+from zip_export import iter_zip_chunks
+
+API_HOST = os.environ.get("API_HOST", "127.0.0.1")
+API_PORT = int(os.environ.get("API_PORT", 8000))
+API_MAX_UPLOAD_BYTES = int(os.environ.get("API_MAX_UPLOAD_BYTES", 200 * 1024 * 1024))
+# Documents in the pipeline at once; further uploads wait for a slot
+API_MAX_CONCURRENT_DOCUMENTS = int(os.environ.get("API_MAX_CONCURRENT_DOCUMENTS", 8))
+
+_DONE = object()
+
+
+def run_document(resources, pdf_bytes, file_name, emit) -> DocumentResult:
+    """
+    Run the pipeline on one PDF, calling ``emit(event_dict)`` as it goes.
+
+    Blocking; runs on a pipeline thread.
+    """
+    timings = {}
+
+    def stage(name):
+        emit({"event": "stage", "stage": name, "status": "started"})
+        return time.perf_counter()
+
+    def finish(name, started, **fields):
+        timings[name] = round(time.perf_counter() - started, 3)
+        emit({"event": "stage", "stage": name, "status": "done", "seconds": timings[name], **fields})
+
+    started = stage("ocr")
+    ocr_response = process_pdf(
+        resources["client"], pdf_bytes, file_name,
+        ocr_cache=resources["ocr_cache"], page_cache=resources["page_cache"],
+        on_chunk=lambda done, total, timing: emit({"event": "progress", "stage": "ocr", "done": done,
+                                                   "total": total}),
+    )
+    document = DocumentState.from_ocr_response(file_name, pdf_bytes, ocr_response)
+    finish("ocr", started, pages=document.page_count)
+
+    started = stage("classify")
+    categories = categorize_documents(
+        resources["llm"], document,
+        classification_cache=resources["classification_cache"],
+        fast_classifier_model=resources["fast_classifier_model"],
+        on_label=lambda page_num, category: emit({"event": "label", "page": page_num, "category": category}),
+    )
+    finish("classify", started)
+
+    started = stage("split")
+    split_pdfs = splitPdfBasedOnCategories(categories, pdf_bytes)
+    finish("split", started, files=len(split_pdfs))
+    return DocumentResult(document, ocr_response, categories, split_pdfs, timings=timings)
+
+
+def _ndjson(event: dict) -> bytes:
+    return (json.dumps(event) + "\n").encode("utf-8")
+
+
+def _zip_url(request, key: str) -> str:
+    return str(request.url_for("document_zip", key=key))
+
+
+class _UploadTooLarge(Exception):
+    pass
+
+
+def _limit_body(request, max_bytes: int) -> Request:
+    """The same request, with its body raising ``_UploadTooLarge`` once more than ``max_bytes`` arrived."""
+    received = 0
+
+    async def receive():
+        nonlocal received
+        message = await request.receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > max_bytes:
+                raise _UploadTooLarge
+        return message
+
+    return Request(request.scope, receive)
+
+
+async def _read_upload(request):
+    """Return ``(file_name, pdf_bytes)`` from the multipart body, or a ``JSONResponse`` error."""
+    content_length = request.headers.get("content-length")
+    if content_length is not None:
+        try:
+            content_length = int(content_length)
+        except ValueError:
+            return JSONResponse({"error": f"Malformed Content-Length header: {content_length!r}"}, status_code=400)
+        if content_length > API_MAX_UPLOAD_BYTES:
+            return JSONResponse({"error": f"Upload larger than {API_MAX_UPLOAD_BYTES} bytes"}, status_code=413)
+    # Without a Content-Length (chunked uploads) the limit is enforced as the body streams in
+    try:
+        async with _limit_body(request, API_MAX_UPLOAD_BYTES).form(max_files=1, max_fields=10) as form:
+            upload = form.get("file")
+            if upload is None or isinstance(upload, str):
+                return JSONResponse({"error": "Expected a multipart field 'file' with the PDF"}, status_code=400)
+            pdf_bytes = await upload.read()
+            file_name = upload.filename or "document.pdf"
+    except _UploadTooLarge:
+        return JSONResponse({"error": f"Upload larger than {API_MAX_UPLOAD_BYTES} bytes"}, status_code=413)
+    if not pdf_bytes.startswith(b"%PDF"):
+        return JSONResponse({"error": f"{file_name} is not a PDF"}, status_code=415)
+    return file_name, pdf_bytes
+
+
+async def submit_document(request):
+    upload = await _read_upload(request)
+    if isinstance(upload, JSONResponse):
+        return upload
+    file_name, pdf_bytes = upload
+    key = result_key(pdf_bytes)
+    state = request.app.state
+    return StreamingResponse(_progress_events(state, key, file_name, pdf_bytes, _zip_url(request, key)),
+                             media_type="application/x-ndjson")
+
+
+async def _progress_events(state, key, file_name, pdf_bytes, zip_url):
+    """Yield the NDJSON progress of one document; the pipeline runs on a pipeline thread."""
+    yield _ndjson({"event": "accepted", "key": key, "file_name": file_name, "bytes": len(pdf_bytes)})
+    # Spilled results are read back from disk, so off the event loop
+    result = await run_in_threadpool(state.results.get, key)
+    if result is None:
+        if state.slots.locked():
+            yield _ndjson({"event": "queued"})
+        await state.slots.acquire()
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+
+        def emit(event):
+            loop.call_soon_threadsafe(events.put_nowait, event)
+
+        def work():
+            # A client that disconnects doesn't stop the document: its result is still stored
+            try:
+                with trace(key[:16]):
+                    result = run_document(get_resources(), pdf_bytes, file_name, emit)
+                state.results.put(key, result)
+                return result
+            finally:
+                loop.call_soon_threadsafe(state.slots.release)
+
+        future = loop.run_in_executor(state.pipeline, work)
+        future.add_done_callback(lambda _: events.put_nowait(_DONE))
+        while (event := await events.get()) is not _DONE:
+            yield _ndjson(event)
+        try:
+            result = future.result()
+        except Exception as e:
+            log_event("api_document_failed", key=key, file_name=file_name, error=f"{type(e).__name__}: {e}")
+            yield _ndjson({"event": "error", "error": f"{type(e).__name__}: {e}"})
+            return
+    yield _ndjson({"event": "done", "key": key, "categories": result.categories, "timings": result.timings,
+                   "zip_url": zip_url})
+
+
+async def get_document(request):
+    key = request.path_params["key"]
+    result = await run_in_threadpool(request.app.state.results.get, key)
+    if result is None:
+        return JSONResponse({"error": f"No processed document {key}"}, status_code=404)
+    return JSONResponse({"key": key, "file_name": result.file_name, "pages": result.document.page_count,
+                         "categories": result.categories, "timings": result.timings,
+                         "zip_url": _zip_url(request, key)})
+
+
+async def document_zip(request):
+    key = request.path_params["key"]
+    result = await run_in_threadpool(request.app.state.results.get, key)
+    if result is None:
+        return JSONResponse({"error": f"No processed document {key}"}, status_code=404)
+    # No Content-Length, so the ZIP goes out with chunked transfer encoding as it is built;
+    # Starlette iterates the sync generator on its thread pool
+    chunks = iter_zip_chunks((f"{category}.pdf", pdf_bytes) for category, pdf_bytes in result.split_pdfs.items())
+    zip_name = f"{result.file_name.rsplit('.', 1)[0]}_categorized.zip"
+    return StreamingResponse(chunks, media_type="application/zip",
+                             headers={"Content-Disposition": f'attachment; filename="{zip_name}"'})
+
+
+async def metrics(request):
+    return PlainTextResponse(prometheus_text(), media_type="text/plain; version=0.0.4")
+
+
+async def health(request):
+    return JSONResponse({"status": "ok", **request.app.state.results.stats()})
+
+
+def create_app(max_concurrent_documents=API_MAX_CONCURRENT_DOCUMENTS) -> Starlette:
+    app = Starlette(routes=[
+        Route("/v1/documents", submit_document, methods=["POST"]),
+        Route("/v1/documents/{key}", get_document),
+        Route("/v1/documents/{key}/zip", document_zip, name="document_zip"),
+        Route("/metrics", metrics),
+        Route("/health", health),
+    ])
+    app.state.results = ResultsStore(create_zip_from_pdfs)
+    app.state.slots = asyncio.Semaphore(max_concurrent_documents)
+    app.state.pipeline = ThreadPoolExecutor(max_concurrent_documents, thread_name_prefix="api-pipeline")
+    return app
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the OCR -> classify -> split pipeline over HTTP.")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--max-concurrent-documents", type=int, default=API_MAX_CONCURRENT_DOCUMENTS)
+    args = parser.parse_args(argv)
+    uvicorn.run(create_app(args.max_concurrent_documents), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
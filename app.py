@@ -2,51 +2,28 @@ import os
 import json
 import base64
 import streamlit as st
-from mistralai import Mistral
 from dotenv import find_dotenv, load_dotenv
 from mistralai import DocumentURLChunk, ImageURLChunk, TextChunk
 from mistralai.models import OCRResponse
-from enum import Enum
-from pydantic import BaseModel
-import pycountry
-from langchain_google_vertexai import ChatVertexAI
 from PyPDF2 import PdfReader, PdfWriter
+from document_state import DocumentState
+from pipeline import make_llm, make_mistral_client
+from structured_ocr import structured_ocr_model
+from tracing import log_event
 # Load environment variables
 load_dotenv(find_dotenv())
-llm = ChatVertexAI(
-    model="gemini-2.5-pro",
-    temperature=0.3,
-    # api_key=os.environ.get("GOOGLE_API_KEY")
-)
 
 
-api_key = os.environ.get("MISTRAL_API_KEY")
-client = Mistral(api_key=api_key)
-
-# Define Language Enum
-languages = {lang.alpha_2: lang.name for lang in pycountry.languages if hasattr(lang, 'alpha_2')}
-
-
-class LanguageMeta(Enum.__class__):
-    def __new__(metacls, cls, bases, classdict):
-        for code, name in languages.items():
-            classdict[name.upper().replace(' ', '_')] = name
-        return super().__new__(metacls, cls, bases, classdict)
+# Built on first use and shared across reruns; langchain alone takes seconds to import
+@st.cache_resource
+def get_llm():
+    return make_llm("gemini-2.5-pro", temperature=0.3)
 
 
-class Language(Enum, metaclass=LanguageMeta):
-    pass
-
-
-class StructuredOCR(BaseModel):
-    file_name: str
-    topics: list[str]
-    languages: list[Language]
-    ocr_contents: dict
-
-pageWiseData = {}
+api_key = os.environ.get("MISTRAL_API_KEY")
+client = st.cache_resource(make_mistral_client)(api_key)
 
-def categorize_documents():
+def categorize_documents(document: DocumentState):
     print("Classifying document pages...");
     prompt = f"""
     You are an expert document classification AI.
@@ -80,10 +57,10 @@ def categorize_documents():
     }}
 
     Here is the page data to classify:
-    {pageWiseData}
+    {document.page_data()}
     """
-    response=llm.invoke(prompt);
-    print("Gemini Response:", response);
+    response=get_llm().invoke(prompt);
+    log_event("gemini_response", reply=response.content, usage=getattr(response, "usage_metadata", None))
 
     try:
         # Parse Gemini JSON response
@@ -99,11 +76,10 @@ def categorize_documents():
             response_text = response_text[:-3].strip()  # Remove trailing ``` and strip whitespace
         
         categories = json.loads(response_text)
-        print("Document Categories:", categories)
+        log_event("categories", pages=categories)
         return categories
     except Exception as e:
-        print("Failed to parse Gemini response:", e)
-        print("Raw response:", response.content)
+        log_event("gemini_reply_unusable", error=f"{type(e).__name__}: {e}", reply=response.content)
         return
 
 def replace_images_in_markdown(markdown_str: str, images_dict: dict) -> str:
@@ -115,12 +91,9 @@ def get_combined_markdown(ocr_response: OCRResponse) -> str:
     markdowns: list[str] = []
     
     for page in ocr_response.pages:
-        print("page", page)
+        log_event("ocr_page", index=page.index, chars=len(page.markdown), images=len(page.images))
         image_data = {img.id: img.image_base64 for img in page.images}
         markdowns.append(replace_images_in_markdown(page.markdown, image_data))
-        pageWiseData[page.index] = {
-            "markdown":page.markdown
-        }
     return "\n\n".join(markdowns)
 
 def process_pdf(pdf_bytes, file_name):
@@ -169,7 +142,7 @@ def process_pdf(pdf_bytes, file_name):
                 ],
             },
         ],
-        response_format=StructuredOCR,
+        response_format=structured_ocr_model(),
         temperature=0,
     )
     return json.loads(chat_response.choices[0].message.parsed.model_dump_json())
@@ -238,6 +211,7 @@ if uploaded_file:
                 # Process PDF
                 st.info("🔍 Step 1: Extracting text from PDF using OCR...")
                 pdf_response = process_pdf(file_bytes, file_name)
+                document = DocumentState.from_ocr_response(file_name, file_bytes, pdf_response)
                 
                 st.success(f"✅ OCR completed! Found {len(pdf_response.pages)} pages.")
                 
@@ -251,7 +225,7 @@ if uploaded_file:
                 
                 # Categorize documents
                 st.info("🏷️ Step 3: Categorizing pages...")
-                documentsData = categorize_documents()
+                documentsData = categorize_documents(document)
                 
                 if documentsData:
                     # Display categorization results
@@ -6,22 +6,41 @@ import os
 import json
 import base64
 import tempfile
-import zipfile
 import streamlit as st
-from mistralai import Mistral
 from dotenv import find_dotenv, load_dotenv
-from mistralai import DocumentURLChunk, ImageURLChunk, TextChunk
-from mistralai.models import OCRResponse
-from enum import Enum
-from pydantic import BaseModel
-import pycountry
-from langchain_google_vertexai import ChatVertexAI
-from PyPDF2 import PdfReader, PdfWriter
-from io import BytesIO
+import pipeline
+from pipeline import (
+    LLM_MODEL,
+    OCR_IMAGE_MODE,
+    create_zip_from_pdfs,
+    iter_page_markdown,
+    make_llm,
+    make_mistral_client,
+    splitPdfBasedOnCategories,
+)
+from fast_classifier import load_default_model
+from classification_cache import make_classification_cache
+from document_state import DocumentState
+from functools import partial
+from job_queue import JobQueue
+from pdf_splitter import count_pages
+from streaming_pipeline import PipelineJob, StagedPipeline
+from ocr_cache import OCRCache
+from page_cache import PageCache
+from page_dedup import PAGE_DEDUP, collapse_duplicate_pages
+from rate_limiter import limiter_metrics
+from results_store import DocumentResult, ResultsStore, result_key
+from tracing import log_event, prometheus_text, stage_metrics
 
 # Load environment variables (for local development)
 load_dotenv(find_dotenv())
 
+# Pages rendered at a time in the "View OCR Content" preview
+OCR_PREVIEW_PAGES = int(os.environ.get("OCR_PREVIEW_PAGES", 5))
+# Documents with at least this many pages are processed as background jobs
+BACKGROUND_JOB_MIN_PAGES = int(os.environ.get("BACKGROUND_JOB_MIN_PAGES", 50))
+JOB_POLL_SECONDS = float(os.environ.get("JOB_POLL_SECONDS", 2))
+
 # Handle secrets for both local and Streamlit Cloud deployment
 def get_secrets():
     """Get API keys and credentials from either Streamlit secrets or .env file"""
@@ -62,190 +81,221 @@ if not api_key:
     st.error("⚠️ MISTRAL_API_KEY not found. Please configure secrets in Streamlit Cloud or add to .env file locally.")
     st.stop()
 
-client = Mistral(api_key=api_key)
+# Clients and caches are built once per server process, not on every rerun
+client = st.cache_resource(make_mistral_client)(api_key)
+ocr_cache = st.cache_resource(OCRCache)()
+page_cache = st.cache_resource(PageCache)()
+fast_classifier_model = st.cache_resource(load_default_model)()
+# Built once per server process so the in-memory backend survives reruns
+classification_cache = st.cache_resource(make_classification_cache)(LLM_MODEL)
 
-# Initialize LLM (Gemini)
-try:
-    llm = ChatVertexAI(
-        model="gemini-2.5-pro",  # Use a valid, stable model
-        temperature=0.3,
-    )
-except Exception as e:
-    st.error(f"⚠️ Failed to initialize Gemini model: {e}")
-    st.info("Please ensure GOOGLE_APPLICATION_CREDENTIALS or GOOGLE_API_KEY is configured correctly.")
-    st.stop()
 
-# Define Language Enum
-languages = {lang.alpha_2: lang.name for lang in pycountry.languages if hasattr(lang, 'alpha_2')}
-
-
-class LanguageMeta(Enum.__class__):
-    def __new__(metacls, cls, bases, classdict):
-        for code, name in languages.items():
-            classdict[name.upper().replace(' ', '_')] = name
-        return super().__new__(metacls, cls, bases, classdict)
-
-
-class Language(Enum, metaclass=LanguageMeta):
-    pass
-
-
-class StructuredOCR(BaseModel):
-    file_name: str
-    topics: list[str]
-    languages: list[Language]
-    ocr_contents: dict
-
-pageWiseData = {}
-
-def categorize_documents():
-    print("Classifying document pages...")
-    prompt = f"""
-    You are an expert document classification AI.
-    Task:
-    Classify each page into one of the following categories:
-
-    ["tenth-marksheet","twelfth-marksheet","passport","passport-receipt",
-    "english-test-toefl","english-test-ielts","english-test-pte","english-test-duolingo",
-    "proficiency-test-gre","proficiency-test-gmat",
-    "under-graduate-degree-provisional-certificate","undergraduate-degree-original-certificate",
-    "under-graduate-marksheets-semester-wise-or-year-wise",
-    "post-graduate-degree-provisional-certificate","postgraduate-degree-original-certificate",
-    "post-graduate-marksheets-semester-wise-or-year-wise",
-    "resume","work-experience-letter","aadhaar-card",
-    "lor-academic","lor-professional","statement-of-purpose","letter-of-recommendation","unknown"]
-
-    Rules:
-    1. Only use one category per page.
-    2. If a page doesn't match any category, classify it as "unknown".
-    3. Ignore images, tables, or decorative content; classify based on textual content.
-    4. Output **strictly in JSON format**, where keys are category names and values are arrays of page numbers (integers).
-
-    Example Output:
-    {{
-    "tenth-marksheet": [],
-    "twelfth-marksheet": [1],
-    "passport": [2,3],
-    "statement-of-purpose": [10,11],
-    "resume": [7],
-    "unknown": [9,14]
-    }}
-
-    Here is the page data to classify:
-    {pageWiseData}
-    """
-    response = llm.invoke(prompt)
-    print("Gemini Response:", response)
+@st.cache_resource(show_spinner="Connecting to Gemini...")
+def get_llm():
+    return make_llm(LLM_MODEL)
+
 
+def load_llm():
+    """Return the Gemini model, building it on first use; stops the run if it can't be built."""
     try:
-        # Parse Gemini JSON response
-        response_text = response.content.strip()
-        
-        # Remove markdown code blocks if present
-        if response_text.startswith("```json"):
-            response_text = response_text[7:].strip()
-        elif response_text.startswith("```"):
-            response_text = response_text[3:].strip()
-        
-        if response_text.endswith("```"):
-            response_text = response_text[:-3].strip()
-        
-        categories = json.loads(response_text)
-        print("Document Categories:", categories)
-        return categories
+        return get_llm()
     except Exception as e:
-        print("Failed to parse Gemini response:", e)
-        print("Raw response:", response.content)
-        st.error(f"Failed to parse classification results: {e}")
-        return None
+        st.error(f"⚠️ Failed to initialize Gemini model: {e}")
+        st.info("Please ensure GOOGLE_APPLICATION_CREDENTIALS or GOOGLE_API_KEY is configured correctly.")
+        st.stop()
 
-def replace_images_in_markdown(markdown_str: str, images_dict: dict) -> str:
-    for img_name, base64_str in images_dict.items():
-        markdown_str = markdown_str.replace(f"![{img_name}]({img_name})", f"![{img_name}]({base64_str})")
-    return markdown_str
+@st.cache_resource
+def get_job_queue() -> JobQueue:
+    """One job table and worker pool per server process, shared by every session."""
+    def classify(document, on_label=None):
+        return pipeline.categorize_documents(get_llm(), document, classification_cache=classification_cache,
+                                             fast_classifier_model=fast_classifier_model, on_label=on_label)
 
-def get_combined_markdown(ocr_response: OCRResponse) -> str:
-    markdowns: list[str] = []
-    
-    for page in ocr_response.pages:
-        print("page", page)
-        image_data = {img.id: img.image_base64 for img in page.images}
-        markdowns.append(replace_images_in_markdown(page.markdown, image_data))
-        pageWiseData[page.index] = {
-            "markdown": page.markdown
-        }
-    return "\n\n".join(markdowns)
-
-def process_pdf(pdf_bytes, file_name):
-    """Process a PDF using OCR."""
-    uploaded_file = client.files.upload(
-        file={"file_name": file_name, "content": pdf_bytes},
-        purpose="ocr",
-    )
-    signed_url = client.files.get_signed_url(file_id=uploaded_file.id, expiry=1)
-    pdf_response = client.ocr.process(
-        document=DocumentURLChunk(document_url=signed_url.url),
-        model="mistral-ocr-latest",
-        include_image_base64=True,
-    )
+    return JobQueue(partial(pipeline.process_pdf, client, ocr_cache=ocr_cache, page_cache=page_cache), classify)
 
-    if isinstance(pdf_response, dict):
-        pdf_response = OCRResponse(**pdf_response)
 
-    return pdf_response
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def show_job_progress(job_id):
+    """Poll a background job; once it has finished, a full rerun shows its result."""
+    job = get_job_queue().get(job_id)
+    if job.finished:
+        st.rerun()
+    st.progress(job.progress, text=f"⏳ {job.describe()}")
+    st.caption("Processing in the background: you can refresh or leave this page and upload the file again later.")
 
 
-def splitPdfBasedOnCategories(documentsData, file_bytes):
-    """Split a PDF into multiple PDFs based on document categories."""
-    print("Splitting PDF based on categories...")
-    
-    pdf_reader = PdfReader(BytesIO(file_bytes))
-    total_pages = len(pdf_reader.pages)
-    print(f"Total pages in PDF: {total_pages}")
-    
-    split_pdfs = {}
-    
-    for category, pages in documentsData.items():
-        if len(pages) > 0:
-            print(f"Creating PDF for category: {category}, Pages: {pages}")
-            
-            pdf_writer = PdfWriter()
-            
-            for page_num in pages:
-                if page_num < total_pages:
-                    pdf_writer.add_page(pdf_reader.pages[page_num])
-                else:
-                    print(f"Warning: Page {page_num} does not exist in the PDF (total pages: {total_pages})")
-            
-            output_buffer = BytesIO()
-            pdf_writer.write(output_buffer)
-            output_buffer.seek(0)
-            
-            split_pdfs[category] = output_buffer.getvalue()
-            print(f"✅ Created {category}.pdf with {len(pages)} pages")
-    
-    return split_pdfs
+def categorize_documents(document: DocumentState):
+    llm = load_llm()
+    progress = st.progress(0.0, text="Waiting for page labels...")
+    labelled = set()
 
-def create_zip_from_pdfs(split_pdfs: dict) -> bytes:
+    def on_label(page_num, category):
+        # Labels stream in as Gemini writes its reply
+        labelled.add(page_num)
+        progress.progress(len(labelled) / max(1, document.page_count),
+                          text=f"Labelled {len(labelled)}/{document.page_count} pages (page {page_num}: {category})")
+
+    try:
+        return pipeline.categorize_documents(
+            llm,
+            document,
+            classification_cache=classification_cache,
+            fast_classifier_model=fast_classifier_model,
+            on_report=lambda report: st.caption(f"⚡ {report.summary()}"),
+            on_label=on_label,
+        )
+    except Exception as e:
+        log_event("classify_failed", file_name=document.file_name, error=f"{type(e).__name__}: {e}")
+        st.error(f"Failed to classify pages: {e}")
+        return None
+
+def process_pdf(pdf_bytes, file_name, include_images=OCR_IMAGE_MODE == "eager"):
+    """Process a PDF using OCR, reusing cached results for previously seen PDFs or pages."""
+    progress = None
+
+    def on_chunk(done, total, timing):
+        nonlocal progress
+        if progress is None:
+            progress = st.progress(0.0)
+        progress.progress(done / total, text=f"OCR chunk {done}/{total}: pages {timing.start + 1}-{timing.end} in {timing.seconds:.1f}s")
+
+    return pipeline.process_pdf(client, pdf_bytes, file_name, ocr_cache=ocr_cache, page_cache=page_cache,
+                                include_images=include_images, on_chunk=on_chunk)
+
+@st.fragment
+def show_ocr_preview(document: DocumentState, pdf_response):
     """
-    Create a ZIP file containing all categorized PDFs.
-    
-    Args:
-        split_pdfs: Dictionary with category names as keys and PDF bytes as values
-    
-    Returns:
-        ZIP file as bytes
+    Render the OCR markdown ``OCR_PREVIEW_PAGES`` pages at a time, fetching the
+    images of the pages shown on demand; runs as a fragment so paging doesn't
+    rerun the pipeline.
     """
-    zip_buffer = BytesIO()
-    
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        for category, pdf_bytes in split_pdfs.items():
-            # Add each PDF to the ZIP with a clean filename
-            filename = f"{category}.pdf"
-            zip_file.writestr(filename, pdf_bytes)
-    
-    zip_buffer.seek(0)
-    return zip_buffer.getvalue()
+    page_count = len(pdf_response.pages)
+    first = 0
+    if page_count > OCR_PREVIEW_PAGES:
+        first = st.number_input(f"First page (of {page_count})", min_value=1, max_value=page_count, value=1,
+                                step=OCR_PREVIEW_PAGES, key="ocr_preview_first") - 1
+        st.caption(f"Pages {first + 1}-{min(first + OCR_PREVIEW_PAGES, page_count)} of {page_count}")
+    shown = range(first, min(first + OCR_PREVIEW_PAGES, page_count))
+
+    # Pages whose images were fetched, kept for the current document only; its bytes
+    # object identifies it across fragment reruns
+    fetched = st.session_state.get("ocr_preview_images")
+    fetched = fetched[1] if fetched is not None and fetched[0] is document.pdf_bytes else None
+    if OCR_IMAGE_MODE == "lazy" and fetched is None and any(document.pages[page_num].image_ids for page_num in shown):
+        if st.button("🖼️ Load page images", key="load_page_images"):
+            fetched = {}
+            st.session_state["ocr_preview_images"] = (document.pdf_bytes, fetched)
+    if fetched is not None:
+        # Once images are loaded, each page turn fetches only the shown pages not fetched yet
+        missing = [page_num for page_num in shown if page_num not in fetched and document.pages[page_num].image_ids]
+        if missing:
+            with st.spinner("Fetching page images..."):
+                fetched.update(pipeline.fetch_page_images(client, document.pdf_bytes, document.file_name, missing,
+                                                          ocr_cache=ocr_cache, page_cache=page_cache))
+        pdf_response = pdf_response.model_copy(
+            update={"pages": [fetched.get(page_num, page) for page_num, page in enumerate(pdf_response.pages)]})
+
+    # Only the pages shown are built, so base64 images of the rest are never inlined
+    for markdown in iter_page_markdown(pdf_response, first, first + OCR_PREVIEW_PAGES):
+        st.markdown(markdown)
+
+
+def get_results_store() -> ResultsStore:
+    """This session's finished results, so reruns (e.g. after a download) don't reprocess anything."""
+    if "results" not in st.session_state:
+        st.session_state["results"] = ResultsStore(create_zip_from_pdfs)
+    return st.session_state["results"]
+
+
+def file_key(uploaded_file) -> str:
+    """Results store key of an upload, hashed once per upload rather than on every rerun."""
+    hashes = st.session_state.setdefault("file_hashes", {})
+    if uploaded_file.file_id not in hashes:
+        hashes[uploaded_file.file_id] = result_key(uploaded_file.getvalue())
+    return hashes[uploaded_file.file_id]
+
+
+def render_result(key, result: DocumentResult, key_prefix="download", preview=True):
+    """Show the summary, OCR preview and downloads of a stored result."""
+    non_empty_categories = {cat: pages for cat, pages in result.categories.items() if len(pages) > 0}
+    if non_empty_categories:
+        st.subheader("📊 Document Classification Summary")
+        for category, pages in non_empty_categories.items():
+            st.write(f"**{category.replace('-', ' ').title()}**: Pages {pages}")
+        if PAGE_DEDUP:
+            # Repeated pages were OCR'd and classified once and share their original's text and label
+            _, dedup = collapse_duplicate_pages(result.document.page_data())
+            if dedup.duplicates:
+                st.caption(f"🔁 {dedup.summary()}")
+
+    if preview:
+        with st.expander("📄 View OCR Content"):
+            show_ocr_preview(result.document, result.ocr_response)
+
+    if result.split_pdfs:
+        st.subheader("📥 Download Split PDFs")
+        render_downloads(key, result, key_prefix=key_prefix)
+    else:
+        st.warning("No PDFs were created. All categories might be empty.")
+
+
+def render_downloads(key, result: DocumentResult, key_prefix="download"):
+    """Show the ZIP and per-category download buttons for one processed document."""
+    results = get_results_store()
+    # Downloads are served from the results store without rerunning the script;
+    # the ZIP is only built the first time it is clicked
+    st.download_button(
+        label=f"📦 Download All PDFs as ZIP ({len(result.split_pdfs)} files)",
+        data=partial(results.zip_bytes, key),
+        file_name=f"{result.file_name.rsplit('.', 1)[0]}_categorized.zip",
+        mime="application/zip",
+        type="primary",
+        use_container_width=True,
+        key=f"{key_prefix}_zip",
+        on_click="ignore",
+    )
+
+    st.markdown("---")
+    st.markdown("**Or download individual PDFs:**")
+
+    cols = st.columns(2)
+    col_idx = 0
+
+    for category in result.split_pdfs:
+        with cols[col_idx % 2]:
+            st.download_button(
+                label=f"📄 {category.replace('-', ' ').title()} ({len(result.categories[category])} pages)",
+                data=partial(results.split_pdf, key, category),
+                file_name=f"{category}.pdf",
+                mime="application/pdf",
+                key=f"{key_prefix}_{category}",
+                on_click="ignore",
+            )
+        col_idx += 1
+
+def process_documents_streaming(uploaded_files, keys):
+    """Run several uploads through the staged pipeline so their stages overlap, storing their results."""
+    staged = StagedPipeline(
+        partial(pipeline.process_pdf, client, ocr_cache=ocr_cache, page_cache=page_cache),
+        partial(pipeline.categorize_documents, load_llm(), classification_cache=classification_cache,
+                fast_classifier_model=fast_classifier_model),
+        zip_fn=None,
+    )
+    jobs = [PipelineJob(key, uploaded.name, uploaded.getvalue()) for uploaded, key in zip(uploaded_files, keys)]
+    progress = st.progress(0.0, text=f"Processing {len(jobs)} documents...")
+    finished = []
+    with staged:
+        for job in staged.process(jobs):
+            finished.append(job)
+            progress.progress(len(finished) / len(jobs), text=f"Finished {job.file_name} ({len(finished)}/{len(jobs)})")
+
+    results = get_results_store()
+    for job in finished:
+        if job.error is not None:
+            st.error(f"❌ {job.file_name}: {job.error}")
+            continue
+        results.put(job.job_id, DocumentResult(job.document, job.ocr_response, job.categories, job.split_pdfs,
+                                               timings=job.timings))
 
 # Streamlit UI
 st.set_page_config(
@@ -257,88 +307,114 @@ st.set_page_config(
 st.title("📄 Multi Page Document Classifier")
 st.markdown("Upload a PDF to automatically classify and split documents by category.")
 
-uploaded_file = st.file_uploader("Upload a PDF", type=["pdf"], help="Upload a multi-page PDF document")
-
-if uploaded_file:
+uploaded_files = st.file_uploader(
+    "Upload a PDF",
+    type=["pdf"],
+    accept_multiple_files=True,
+    help="Upload a multi-page PDF document, or several to process them in parallel",
+)
+uploaded_file = uploaded_files[0] if len(uploaded_files) == 1 else None
+
+if len(uploaded_files) > 1:
+    results = get_results_store()
+    keys = [file_key(uploaded) for uploaded in uploaded_files]
+    if st.button(f"🚀 Process {len(uploaded_files)} Documents", type="primary"):
+        process_documents_streaming(uploaded_files, keys)
+    # Stored results are shown on every rerun, without reprocessing
+    for uploaded, key in zip(uploaded_files, keys):
+        result = results.get(key)
+        if result is not None:
+            with st.expander(f"📄 {uploaded.name}"):
+                timings = ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in result.timings.items())
+                st.caption(f"{result.document.page_count} pages · {timings}")
+                render_result(key, result, key_prefix=f"download_{key[:12]}", preview=False)
+elif uploaded_file:
     file_type = uploaded_file.type
     file_bytes = uploaded_file.read()
     file_name = uploaded_file.name
+    results = get_results_store()
+    key = file_key(uploaded_file)
 
     if st.button("🚀 Process Document", type="primary"):
-        with st.spinner(f"Processing {file_name}..."):
-            if "pdf" in file_type:
-                try:
-                    st.info("🔍 Step 1: Extracting text from PDF using OCR...")
-                    pdf_response = process_pdf(file_bytes, file_name)
+        try:
+            in_background = "pdf" in file_type and count_pages(file_bytes) >= BACKGROUND_JOB_MIN_PAGES
+        except Exception as e:
+            # A corrupt or encrypted PDF fails here already, before any processing
+            st.error(f"❌ Could not read {file_name}: {str(e)}")
+        else:
+            if in_background:
+                # Long documents don't hold this script thread; the progress below is polled
+                results.discard(key)
+                get_job_queue().submit(file_name, file_bytes, key)
+            else:
+                with st.spinner(f"Processing {file_name}..."):
+                    if "pdf" in file_type:
+                        try:
+                            st.info("🔍 Step 1: Extracting text from PDF using OCR...")
+                            pdf_response = process_pdf(file_bytes, file_name)
+                            document = DocumentState.from_ocr_response(file_name, file_bytes, pdf_response)
                     
-                    st.success(f"✅ OCR completed! Found {len(pdf_response.pages)} pages.")
+                            st.success(f"✅ OCR completed! Found {document.page_count} pages.")
                     
-                    st.info("📝 Step 2: Analyzing document content...")
-                    combined_markdown = get_combined_markdown(pdf_response)
+                            st.info("🏷️ Step 2: Categorizing pages...")
+                            documentsData = categorize_documents(document)
                     
-                    with st.expander("📄 View OCR Content"):
-                        st.markdown(combined_markdown)
-                    
-                    st.info("🏷️ Step 3: Categorizing pages...")
-                    documentsData = categorize_documents()
-                    
-                    if documentsData:
-                        st.success("✅ Categorization complete!")
-                        
-                        st.subheader("📊 Document Classification Summary")
-                        non_empty_categories = {cat: pages for cat, pages in documentsData.items() if len(pages) > 0}
+                            if documentsData:
+                                st.success("✅ Categorization complete!")
                         
-                        if non_empty_categories:
-                            for category, pages in non_empty_categories.items():
-                                st.write(f"**{category.replace('-', ' ').title()}**: Pages {pages}")
+                                st.info("✂️ Step 3: Splitting PDF by categories...")
+                                split_pdfs = splitPdfBasedOnCategories(documentsData, document.pdf_bytes)
+                                if split_pdfs:
+                                    st.success(f"✅ Created {len(split_pdfs)} separate PDF files!")
+                                # Kept for this session, so later reruns show it without any reprocessing
+                                results.put(key, DocumentResult(document, pdf_response, documentsData, split_pdfs))
+                            else:
+                                st.error("Failed to categorize documents. Please try again.")
                         
-                        st.info("✂️ Step 4: Splitting PDF by categories...")
-                        split_pdfs = splitPdfBasedOnCategories(documentsData, file_bytes)
-                        
-                        if split_pdfs:
-                            st.success(f"✅ Created {len(split_pdfs)} separate PDF files!")
-                            
-                            st.subheader("📥 Download Split PDFs")
-                            
-                            # Add bulk download button at the top
-                            zip_bytes = create_zip_from_pdfs(split_pdfs)
-                            st.download_button(
-                                label=f"📦 Download All PDFs as ZIP ({len(split_pdfs)} files)",
-                                data=zip_bytes,
-                                file_name=f"{file_name.rsplit('.', 1)[0]}_categorized.zip",
-                                mime="application/zip",
-                                type="primary",
-                                use_container_width=True
-                            )
-                            
-                            st.markdown("---")
-                            st.markdown("**Or download individual PDFs:**")
-                            
-                            cols = st.columns(2)
-                            col_idx = 0
-                            
-                            
-                            for category, pdf_bytes in split_pdfs.items():
-                                with cols[col_idx % 2]:
-                                    st.download_button(
-                                        label=f"📄 {category.replace('-', ' ').title()} ({len(documentsData[category])} pages)",
-                                        data=pdf_bytes,
-                                        file_name=f"{category}.pdf",
-                                        mime="application/pdf",
-                                        key=f"download_{category}"
-                                    )
-                                col_idx += 1
-                            
-                        else:
-                            st.warning("No PDFs were created. All categories might be empty.")
-                    else:
-                        st.error("Failed to categorize documents. Please try again.")
-                        
-                except Exception as e:
-                    st.error(f"❌ An error occurred: {str(e)}")
-                    st.exception(e)
+                        except Exception as e:
+                            st.error(f"❌ An error occurred: {str(e)}")
+                            st.exception(e)
+
+    if key not in results:
+        # A background job for this file, possibly started before a refresh or in another session
+        job = get_job_queue().latest(key)
+        if job is not None and not job.finished:
+            show_job_progress(job.job_id)
+        elif job is not None and job.status == "done":
+            results.put(key, get_job_queue().load_result(job.job_id))
+        elif job is not None:
+            st.error(f"❌ Background processing failed: {job.error}")
+
+    result = results.get(key)
+    if result is not None:
+        render_result(key, result)
 else:
     st.info("👆 Upload a PDF document to get started")
 
+with st.sidebar.expander("📈 Provider rate limits"):
+    # Queue depth and throttling of the shared limiters, for sizing quotas
+    metrics = limiter_metrics()
+    if metrics:
+        st.table({m["provider"]: {key: str(value) for key, value in m.items() if key != "provider"} for m in metrics})
+    else:
+        st.caption("No API calls yet.")
+
+with st.sidebar.expander("🗂️ Background jobs"):
+    jobs = get_job_queue().recent(10)
+    for job in jobs:
+        st.caption(f"{'✅' if job.status == 'done' else '❌' if job.status == 'failed' else '⏳'} {job.describe()}")
+    if not jobs:
+        st.caption(f"Documents of {BACKGROUND_JOB_MIN_PAGES}+ pages are processed in the background.")
+
+with st.sidebar.expander("⏱️ Pipeline metrics"):
+    # Per-stage totals from the tracing spans of this server process
+    stages = stage_metrics()
+    if stages:
+        st.table({name: {key: str(round(value, 2)) for key, value in stage.items()} for name, stage in stages.items()})
+        st.download_button("Download Prometheus metrics", prometheus_text(), file_name="metrics.prom",
+                           mime="text/plain")
+    else:
+        st.caption("No documents processed yet.")
+
 st.markdown("---")
 st.markdown("Built with Mistral OCR & Gemini AI | Deployed on Streamlit Cloud")
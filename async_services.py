@@ -0,0 +1,314 @@
+"""
+Asyncio service layer for Mistral OCR and Gemini.
+
+Every call runs on one background event loop (``get_service_loop()``), which
+owns a pooled ``httpx.AsyncClient`` for Mistral. Many documents and chunks can
+be in flight at once without a thread per request; semaphores cap concurrency
+per provider and every call has a timeout. OCR requests are paced and retried
+by the shared Mistral ``ProviderLimiter`` (see ``rate_limiter``).
+
+Sync code (Streamlit, the batch CLI) uses the blocking wrappers, which submit
+coroutines to that loop and wait for them:
+
+    services = MistralService(api_key)            # drop-in ``client`` for pipeline.process_pdf
+    llm = GeminiService(make_llm())               # drop-in ``llm`` with invoke()/ainvoke()
+
+``server_url`` lets ``MistralService`` talk to a local fake
+(``benchmarks/fake_mistral_server.py``) instead of the real API.
+"""
+import asyncio
+import os
+import queue
+import threading
+import time
+from io import BytesIO
+
+import httpx
+from mistralai import DocumentURLChunk, Mistral
+from mistralai.models import OCRResponse, OCRUsageInfo
+from PyPDF2 import PdfReader
+
+from chunked_ocr import OCR_CHUNK_RETRIES, OCR_CHUNK_SIZE, OCR_REQUESTS_PER_CALL, ChunkTiming, chunk_name
+from ocr import OCR_MODEL, pages_pdf
+from rate_limiter import get_limiter
+from tracing import log_event
+
+# Alternative Mistral API base URL, e.g. a local fake server for offline testing
+MISTRAL_SERVER_URL = os.environ.get("MISTRAL_SERVER_URL") or None
+MISTRAL_CONCURRENCY = int(os.environ.get("MISTRAL_CONCURRENCY", 8))
+GEMINI_CONCURRENCY = int(os.environ.get("GEMINI_CONCURRENCY", 4))
+MISTRAL_TIMEOUT_SECONDS = float(os.environ.get("MISTRAL_TIMEOUT_SECONDS", 120))
+GEMINI_TIMEOUT_SECONDS = float(os.environ.get("GEMINI_TIMEOUT_SECONDS", 180))
+HTTP_MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", 32))
+HTTP_MAX_KEEPALIVE = int(os.environ.get("HTTP_MAX_KEEPALIVE", 16))
+# "1" routes the app and batch CLI through these services, "0" uses the plain SDK clients
+ASYNC_SERVICES = os.environ.get("ASYNC_SERVICES", "1") == "1"
+
+_DONE = object()
+
+
+class ServiceLoop:
+    """An event loop running forever on a daemon thread, shared by all services."""
+
+    def __init__(self):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="service-loop", daemon=True)
+        self._thread.start()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._loop
+
+    def submit(self, coro):
+        """Schedule ``coro`` on the loop and return a ``concurrent.futures.Future``."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def run(self, coro):
+        """Run ``coro`` on the loop and block until it finishes."""
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("ServiceLoop.run() called from the service loop; await the coroutine instead")
+        return self.submit(coro).result()
+
+    def run_with_events(self, make_coro, on_event):
+        """
+        Run ``make_coro(emit)`` and call ``on_event(*args)`` in *this* thread for
+        every ``emit(*args)`` made on the loop (e.g. to drive a Streamlit progress bar).
+        """
+        events = queue.Queue()
+        future = self.submit(make_coro(lambda *args: events.put(args)))
+        future.add_done_callback(lambda _: events.put(_DONE))
+        while True:
+            event = events.get()
+            if event is _DONE:
+                return future.result()
+            on_event(*event)
+
+    def iterate(self, make_agen):
+        """
+        Iterate the async iterator ``make_agen()`` on the loop, yielding its items
+        in *this* thread as they arrive. Closing the generator early cancels it.
+        """
+        items = queue.Queue()
+
+        async def pump():
+            async for item in make_agen():
+                items.put(item)
+
+        future = self.submit(pump())
+        future.add_done_callback(lambda _: items.put(_DONE))
+        try:
+            while (item := items.get()) is not _DONE:
+                yield item
+            future.result()
+        finally:
+            future.cancel()
+
+
+_service_loop = None
+_service_loop_lock = threading.Lock()
+
+
+def get_service_loop() -> ServiceLoop:
+    """Return the process-wide ``ServiceLoop``, starting it on first use."""
+    global _service_loop
+    with _service_loop_lock:
+        if _service_loop is None:
+            _service_loop = ServiceLoop()
+        return _service_loop
+
+
+def _cut_chunks(pdf_bytes, chunk_size):
+    """Return ``(total_pages, [(start, end, chunk_bytes)])``; no chunks if the PDF fits in one."""
+    pdf_reader = PdfReader(BytesIO(pdf_bytes))
+    total_pages = len(pdf_reader.pages)
+    if chunk_size <= 0 or total_pages <= chunk_size:
+        return total_pages, []
+    ranges = [(start, min(start + chunk_size, total_pages)) for start in range(0, total_pages, chunk_size)]
+    return total_pages, [(start, end, pages_pdf(pdf_reader, range(start, end))) for start, end in ranges]
+
+
+class MistralService:
+    """Mistral OCR over a pooled async HTTP client, with a concurrency limit and per-call timeouts."""
+
+    def __init__(self, api_key, server_url=MISTRAL_SERVER_URL, concurrency=MISTRAL_CONCURRENCY,
+                 timeout_seconds=MISTRAL_TIMEOUT_SECONDS, max_connections=HTTP_MAX_CONNECTIONS,
+                 max_keepalive=HTTP_MAX_KEEPALIVE, service_loop=None, limiter=None):
+        """
+        Args:
+            api_key: Mistral API key
+            server_url: Override the API base URL (e.g. a local fake server)
+            concurrency: Maximum OCR requests in flight across all documents
+            timeout_seconds: Timeout for each HTTP call
+            max_connections, max_keepalive: Limits of the shared connection pool
+            service_loop: ``ServiceLoop`` to run on (default: the shared one)
+            limiter: ``ProviderLimiter`` pacing the requests (default: the shared Mistral one)
+        """
+        self._service_loop = service_loop or get_service_loop()
+        self.limiter = limiter or get_limiter("mistral")
+        self._timeout_ms = int(timeout_seconds * 1000)
+        self._http = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive),
+            timeout=timeout_seconds,
+        )
+        self.client = Mistral(api_key=api_key, server_url=server_url, async_client=self._http)
+        self._concurrency = max(1, concurrency)
+        self._semaphore = None
+
+    def __getattr__(self, name):
+        # Anything not wrapped here (files, ocr, chat, ...) goes to the SDK's sync API
+        return getattr(self.client, name)
+
+    def _limit(self) -> asyncio.Semaphore:
+        # Created lazily so it belongs to the service loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._concurrency)
+        return self._semaphore
+
+    async def aocr(self, pdf_bytes, file_name, model=OCR_MODEL, include_images=True) -> OCRResponse:
+        """Upload a PDF and OCR it; the three calls hold one concurrency slot."""
+        async with self._limit():
+            uploaded_file = await self.client.files.upload_async(
+                file={"file_name": file_name, "content": pdf_bytes},
+                purpose="ocr",
+                timeout_ms=self._timeout_ms,
+            )
+            signed_url = await self.client.files.get_signed_url_async(
+                file_id=uploaded_file.id, expiry=1, timeout_ms=self._timeout_ms,
+            )
+            return await self.client.ocr.process_async(
+                document=DocumentURLChunk(document_url=signed_url.url),
+                model=model,
+                include_image_base64=include_images,
+                timeout_ms=self._timeout_ms,
+            )
+
+    async def _aocr_chunk(self, chunk_bytes, start, end, upload_name, model, include_images, retries):
+        started = time.perf_counter()
+        for attempt in range(1, retries + 2):
+            try:
+                async with self.limiter.aslot(requests=OCR_REQUESTS_PER_CALL, tokens=end - start):
+                    response = await self.aocr(chunk_bytes, upload_name, model=model, include_images=include_images)
+                return response, ChunkTiming(start, end, time.perf_counter() - started, attempt)
+            except Exception as e:
+                delay = self.limiter.retry_delay(e, attempt) if attempt <= retries else None
+                if delay is None:
+                    raise
+                log_event("ocr_retry", pages=f"{start + 1}-{end}", error=f"{type(e).__name__}: {e}", attempt=attempt,
+                          delay_seconds=round(delay, 1))
+                await asyncio.sleep(delay)
+
+    async def aocr_chunked(self, pdf_bytes, file_name, model=OCR_MODEL, include_images=True,
+                           chunk_size=OCR_CHUNK_SIZE, retries=OCR_CHUNK_RETRIES, on_chunk=None) -> OCRResponse:
+        """
+        Async counterpart of ``chunked_ocr.run_ocr_chunked``.
+
+        All chunks are scheduled at once; the service's concurrency limit decides
+        how many are actually in flight. ``on_chunk(done, total, ChunkTiming)``
+        is called on the loop as each chunk finishes.
+        """
+        # Cutting chunks is CPU-bound PyPDF2 work; keep it off the loop
+        total_pages, chunks = await asyncio.to_thread(_cut_chunks, pdf_bytes, chunk_size)
+        if not chunks:
+            response, _ = await self._aocr_chunk(pdf_bytes, 0, total_pages, file_name, model, include_images,
+                                                 retries)
+            return response
+
+        log_event("ocr_chunks", file_name=file_name, pages=total_pages, chunks=len(chunks), chunk_size=chunk_size)
+        tasks = [
+            asyncio.ensure_future(self._aocr_chunk(chunk_bytes, start, end, chunk_name(file_name, start, end),
+                                                   model, include_images, retries))
+            for start, end, chunk_bytes in chunks
+        ]
+
+        pages = []
+        pages_processed = 0
+        try:
+            for done, task in enumerate(asyncio.as_completed(tasks), start=1):
+                response, timing = await task
+                log_event("ocr_chunk", pages=f"{timing.start + 1}-{timing.end}", seconds=round(timing.seconds, 2),
+                          attempts=timing.attempts)
+                for page in response.pages:
+                    pages.append(page.model_copy(update={"index": timing.start + page.index}))
+                pages_processed += response.usage_info.pages_processed
+                if on_chunk is not None:
+                    on_chunk(done, len(chunks), timing)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        pages.sort(key=lambda page: page.index)
+        return OCRResponse(
+            pages=pages,
+            model=model,
+            usage_info=OCRUsageInfo(pages_processed=pages_processed, doc_size_bytes=len(pdf_bytes)),
+        )
+
+    def runner(self, on_chunk=None):
+        """
+        Return a blocking OCR function with the ``ocr.process_pdf`` runner signature.
+
+        ``on_chunk`` is called from the thread that runs the OCR, not the loop.
+        """
+        def run(client, pdf_bytes, file_name, model=OCR_MODEL, include_images=True):
+            if on_chunk is None:
+                return self._service_loop.run(self.aocr_chunked(pdf_bytes, file_name, model=model,
+                                                                include_images=include_images))
+            return self._service_loop.run_with_events(
+                lambda emit: self.aocr_chunked(pdf_bytes, file_name, model=model,
+                                               include_images=include_images, on_chunk=emit),
+                on_chunk,
+            )
+        return run
+
+    def ocr_document(self, pdf_bytes, file_name, model=OCR_MODEL, include_images=True) -> OCRResponse:
+        """Blocking ``aocr_chunked``."""
+        return self.runner()(self.client, pdf_bytes, file_name, model=model, include_images=include_images)
+
+    async def aclose(self) -> None:
+        await self._http.aclose()
+
+
+class GeminiService:
+    """
+    Wraps a LangChain chat model so every call runs on the service loop with a
+    concurrency limit and a timeout; usable wherever an ``llm`` is expected.
+    """
+
+    def __init__(self, llm, concurrency=GEMINI_CONCURRENCY, timeout_seconds=GEMINI_TIMEOUT_SECONDS,
+                 service_loop=None):
+        self.llm = llm
+        self._service_loop = service_loop or get_service_loop()
+        self._concurrency = max(1, concurrency)
+        self._timeout_seconds = timeout_seconds
+        self._semaphore = None
+
+    def _limit(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._concurrency)
+        return self._semaphore
+
+    async def ainvoke(self, prompt, **kwargs):
+        async with self._limit():
+            return await asyncio.wait_for(self.llm.ainvoke(prompt, **kwargs), self._timeout_seconds)
+
+    def invoke(self, prompt, **kwargs):
+        """Blocking ``ainvoke``; safe to call from many threads at once."""
+        return self._service_loop.run(self.ainvoke(prompt, **kwargs))
+
+    async def astream(self, prompt, **kwargs):
+        """Stream reply chunks; the timeout covers the whole reply."""
+        async with self._limit():
+            async with asyncio.timeout(self._timeout_seconds):
+                async for chunk in self.llm.astream(prompt, **kwargs):
+                    yield chunk
+
+    def stream(self, prompt, **kwargs):
+        """Blocking ``astream``: yields chunks in the calling thread as they arrive."""
+        return self._service_loop.iterate(lambda: self.astream(prompt, **kwargs))
+
+    async def abatch(self, prompts):
+        return await asyncio.gather(*(self.ainvoke(prompt) for prompt in prompts))
+
+    def batch(self, prompts):
+        """Invoke all ``prompts`` concurrently (up to the concurrency limit) without extra threads."""
+        return self._service_loop.run(self.abatch(prompts))
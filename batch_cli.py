@@ -0,0 +1,334 @@
+"""
+Headless batch runner: classify and split every PDF under a directory.
+
+    python batch_cli.py INPUT_DIR OUTPUT_DIR [--workers 4] [--executor thread|process] [--zip]
+    python batch_cli.py INPUT_DIR OUTPUT_DIR --streaming [--ocr-workers 4] [--classify-workers 4]
+
+``--streaming`` runs the documents through a ``StagedPipeline`` instead of one
+worker per document, overlapping OCR, classification and splitting.
+
+Each input ``a/b/bundle.pdf`` produces ``OUTPUT_DIR/a/b/bundle/<category>.pdf``
+(plus ``bundle_categorized.zip`` with ``--zip``). Finished documents are
+appended to a JSON-lines manifest, so an interrupted run skips them when it is
+restarted with the same arguments.
+
+Provider rate-limit metrics (queue depth, throttling, retries) are printed at
+the end of the run, and every N seconds with ``--metrics-interval N``. With
+``--executor process`` each worker has its own limiters and quotas.
+
+Every stage is traced (see ``tracing``): spans of one document share its path
+as trace id, and per-stage totals are printed at the end. ``TRACE_JSONL_PATH``
+and ``PROMETHEUS_TEXTFILE_PATH`` export them; with ``--executor process`` the
+totals cover the main process only, the JSONL file covers every worker.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from dotenv import find_dotenv, load_dotenv
+
+from classification_cache import make_classification_cache
+from document_state import DocumentState
+from fast_classifier import load_default_model
+from ocr_cache import OCRCache
+from page_cache import PageCache
+from pdf_splitter import directory_sink, split_pdf, tee_sink
+from rate_limiter import limiter_metrics
+from pipeline import (
+    LLM_MODEL,
+    categorize_documents,
+    create_zip_from_pdfs,
+    make_llm,
+    make_mistral_client,
+    process_pdf,
+)
+from tracing import stage_metrics, trace, trace_span
+from streaming_pipeline import (
+    PIPELINE_CLASSIFY_WORKERS,
+    PIPELINE_OCR_WORKERS,
+    PIPELINE_QUEUE_SIZE,
+    PIPELINE_SPLIT_WORKERS,
+    PipelineJob,
+    StagedPipeline,
+)
+from zip_export import zip_sink
+
+MANIFEST_NAME = "manifest.jsonl"
+
+_resources = None
+_resources_lock = threading.Lock()
+
+
+def get_resources():
+    """Build the clients and caches once per worker process."""
+    global _resources
+    with _resources_lock:
+        if _resources is None:
+            load_dotenv(find_dotenv())
+            _resources = {
+                "client": make_mistral_client(os.environ["MISTRAL_API_KEY"]),
+                "llm": make_llm(LLM_MODEL),
+                "ocr_cache": OCRCache(),
+                "page_cache": PageCache(),
+                "classification_cache": make_classification_cache(LLM_MODEL),
+                "fast_classifier_model": load_default_model(),
+            }
+        return _resources
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def run_ocr_stage(pdf_bytes, file_name):
+    resources = get_resources()
+    return process_pdf(
+        resources["client"], pdf_bytes, file_name,
+        ocr_cache=resources["ocr_cache"], page_cache=resources["page_cache"],
+    )
+
+
+def run_classify_stage(document):
+    resources = get_resources()
+    return categorize_documents(
+        resources["llm"], document,
+        classification_cache=resources["classification_cache"],
+        fast_classifier_model=resources["fast_classifier_model"],
+    )
+
+
+def write_outputs(output_dir: str, rel_path: str, split_pdfs: dict, zip_bytes=None) -> None:
+    """Write one document's split PDFs (and ZIP) under its mirrored output directory."""
+    target_dir = os.path.join(output_dir, os.path.splitext(rel_path)[0])
+    os.makedirs(target_dir, exist_ok=True)
+    for category, split_bytes in split_pdfs.items():
+        with open(os.path.join(target_dir, f"{category}.pdf"), "wb") as f:
+            f.write(split_bytes)
+    if zip_bytes is not None:
+        zip_name = f"{os.path.splitext(os.path.basename(rel_path))[0]}_categorized.zip"
+        with open(os.path.join(target_dir, zip_name), "wb") as f:
+            f.write(zip_bytes)
+
+
+def process_file(input_dir: str, output_dir: str, rel_path: str, write_zip: bool) -> dict:
+    """
+    Run the full pipeline on one PDF and write its split PDFs.
+
+    Returns:
+        Manifest record for the file
+    """
+    started = time.perf_counter()
+    with open(os.path.join(input_dir, rel_path), "rb") as f:
+        pdf_bytes = f.read()
+    file_name = os.path.basename(rel_path)
+
+    with trace(rel_path):
+        pdf_response = run_ocr_stage(pdf_bytes, file_name)
+        document = DocumentState.from_ocr_response(file_name, pdf_bytes, pdf_response)
+        documentsData = run_classify_stage(document)
+        # Each category is written to disk (and the ZIP) as soon as it is complete
+        target_dir = os.path.join(output_dir, os.path.splitext(rel_path)[0])
+        with trace_span("split_pdf", bytes_in=len(pdf_bytes), zip=write_zip) as span:
+            if write_zip and any(documentsData.values()):
+                zip_name = f"{os.path.splitext(file_name)[0]}_categorized.zip"
+                os.makedirs(target_dir, exist_ok=True)
+                with zipfile.ZipFile(os.path.join(target_dir, zip_name), "w") as zip_file:
+                    report = split_pdf(documentsData, document.pdf_bytes,
+                                       tee_sink(directory_sink(target_dir), zip_sink(zip_file)))
+            else:
+                report = split_pdf(documentsData, document.pdf_bytes, directory_sink(target_dir))
+            span.set(pages=report.total_pages)
+
+    return {
+        "categories": {category: pages for category, pages in documentsData.items() if pages},
+        "pages": document.page_count,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def run_pooled(args, todo):
+    """Yield ``(rel_path, sha256, record_or_exception)`` using one worker per document."""
+    executor_class = ProcessPoolExecutor if args.executor == "process" else ThreadPoolExecutor
+    with executor_class(max_workers=max(1, args.workers)) as pool:
+        futures = {
+            pool.submit(process_file, args.input_dir, args.output_dir, rel_path, args.zip): (rel_path, sha256)
+            for rel_path, sha256 in todo
+        }
+        for future in as_completed(futures):
+            rel_path, sha256 = futures[future]
+            try:
+                yield rel_path, sha256, future.result()
+            except Exception as e:
+                yield rel_path, sha256, e
+
+
+def run_streaming(args, todo):
+    """Yield ``(rel_path, sha256, record_or_exception)`` from a ``StagedPipeline``."""
+    hashes = dict(todo)
+
+    def jobs():
+        # Files are read as the OCR queue accepts them, so backpressure bounds memory
+        for rel_path, _ in todo:
+            with open(os.path.join(args.input_dir, rel_path), "rb") as f:
+                yield PipelineJob(rel_path, os.path.basename(rel_path), f.read())
+
+    staged = StagedPipeline(
+        run_ocr_stage, run_classify_stage,
+        zip_fn=create_zip_from_pdfs if args.zip else None,
+        ocr_workers=args.ocr_workers, classify_workers=args.classify_workers,
+        split_workers=args.split_workers, queue_size=args.queue_size,
+    )
+    with staged:
+        for job in staged.process(jobs()):
+            if job.error is not None:
+                yield job.job_id, hashes[job.job_id], RuntimeError(job.error)
+                continue
+            write_outputs(args.output_dir, job.job_id, job.split_pdfs, job.zip_bytes)
+            yield job.job_id, hashes[job.job_id], {
+                "categories": {category: pages for category, pages in job.categories.items() if pages},
+                "pages": job.document.page_count,
+                "seconds": round(sum(job.timings.values()), 3),
+                "stage_seconds": {stage: round(seconds, 3) for stage, seconds in job.timings.items()},
+            }
+
+
+def format_limiter_metrics(metrics: dict) -> str:
+    throttle = f"throttled {metrics['throttle_seconds_left']}s" if metrics["throttled"] else "ok"
+    return (f"{metrics['provider']}: {throttle}, queue {metrics['queue_depth']}, in flight {metrics['in_flight']}, "
+            f"{metrics['requests']} requests, {metrics['tokens']} tokens, {metrics['retries']} retries, "
+            f"{metrics['rate_limited']} rate limited, rate x{metrics['rate_scale']}, "
+            f"waited {metrics['wait_seconds']}s")
+
+
+def format_stage_metrics(name: str, stage: dict) -> str:
+    counts = ", ".join(f"{field} {stage[field]}" for field in ("pages", "bytes_in", "bytes_out", "tokens_in",
+                                                               "tokens_out") if stage[field])
+    return (f"{name}: {stage['count']} runs, {stage['seconds']:.1f}s"
+            + (f", {stage['errors']} errors" if stage["errors"] else "") + (f", {counts}" if counts else ""))
+
+
+def report_metrics_every(interval: float, stop: threading.Event) -> None:
+    """Print limiter metrics every ``interval`` seconds until ``stop`` is set."""
+    while not stop.wait(interval):
+        for metrics in limiter_metrics():
+            print(f"📈 {format_limiter_metrics(metrics)}")
+
+
+def find_pdfs(input_dir: str) -> list:
+    """Return paths of all PDFs under ``input_dir``, relative to it, in sorted order."""
+    found = []
+    for root, _, files in os.walk(input_dir):
+        for name in files:
+            if name.lower().endswith(".pdf"):
+                found.append(os.path.relpath(os.path.join(root, name), input_dir))
+    return sorted(found)
+
+
+def load_manifest(path: str) -> dict:
+    """Return the latest manifest record per input path."""
+    records = {}
+    if not os.path.exists(path):
+        return records
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A crash can leave a truncated last line behind
+                continue
+            records[record["path"]] = record
+    return records
+
+
+def append_manifest(path: str, record: dict) -> None:
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classify and split a directory of PDFs.")
+    parser.add_argument("input_dir")
+    parser.add_argument("output_dir")
+    parser.add_argument("--workers", type=int, default=4, help="Documents processed in parallel")
+    parser.add_argument("--executor", choices=("thread", "process"), default="thread",
+                        help="Run workers as threads (default) or processes")
+    parser.add_argument("--zip", action="store_true", help="Also write a ZIP of each document's split PDFs")
+    parser.add_argument("--manifest", help=f"Manifest path (default OUTPUT_DIR/{MANIFEST_NAME})")
+    parser.add_argument("--retry-failed", action="store_true", help="Reprocess documents that failed before")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Overlap OCR, classification and splitting across documents")
+    parser.add_argument("--ocr-workers", type=int, default=PIPELINE_OCR_WORKERS)
+    parser.add_argument("--classify-workers", type=int, default=PIPELINE_CLASSIFY_WORKERS)
+    parser.add_argument("--split-workers", type=int, default=PIPELINE_SPLIT_WORKERS)
+    parser.add_argument("--queue-size", type=int, default=PIPELINE_QUEUE_SIZE,
+                        help="Documents buffered between streaming stages")
+    parser.add_argument("--metrics-interval", type=float, default=0,
+                        help="Print provider rate-limit metrics every N seconds (0: only at the end)")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    manifest_path = args.manifest or os.path.join(args.output_dir, MANIFEST_NAME)
+    done = load_manifest(manifest_path)
+
+    todo = []
+    for rel_path in find_pdfs(args.input_dir):
+        sha256 = file_sha256(os.path.join(args.input_dir, rel_path))
+        previous = done.get(rel_path)
+        if previous and previous["sha256"] == sha256 and (
+            previous["status"] == "done" or not args.retry_failed
+        ):
+            continue
+        todo.append((rel_path, sha256))
+
+    print(f"{len(todo)} documents to process ({len(done)} already in manifest)")
+    run = run_streaming if args.streaming else run_pooled
+
+    stop_metrics = threading.Event()
+    if args.metrics_interval > 0:
+        threading.Thread(target=report_metrics_every, args=(args.metrics_interval, stop_metrics),
+                         daemon=True).start()
+
+    started = time.perf_counter()
+    total_docs = total_pages = failed = 0
+    for rel_path, sha256, result in run(args, todo):
+        record = {"path": rel_path, "sha256": sha256}
+        if isinstance(result, Exception):
+            record.update(status="failed", error=f"{type(result).__name__}: {result}")
+            failed += 1
+            print(f"❌ {rel_path}: {record['error']}")
+        else:
+            record.update(result, status="done")
+            total_docs += 1
+            total_pages += record["pages"]
+            print(f"✅ {rel_path}: {record['pages']} pages in {record['seconds']}s")
+        append_manifest(manifest_path, record)
+    stop_metrics.set()
+
+    minutes = (time.perf_counter() - started) / 60
+    print(f"Processed {total_docs} documents ({total_pages} pages), {failed} failed, in {minutes * 60:.1f}s")
+    if minutes > 0 and total_docs:
+        print(f"Throughput: {total_docs / minutes:.1f} docs/min, {total_pages / minutes:.1f} pages/min")
+    for metrics in limiter_metrics():
+        print(f"Rate limits: {format_limiter_metrics(metrics)}")
+    for name, stage in stage_metrics().items():
+        print(f"Stage {format_stage_metrics(name, stage)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
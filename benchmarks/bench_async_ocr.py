@@ -0,0 +1,101 @@
+"""
+Compare thread-per-request OCR with the asyncio service layer, against a local fake Mistral server.
+
+    python -m benchmarks.bench_async_ocr --docs 40 --pages 60 --latency 0.5
+
+threads   one worker thread per document (``--workers``) using the sync SDK, each
+          fanning its chunks out to ``OCR_CHUNK_CONCURRENCY`` more threads
+async     every document submitted to one ``MistralService``; chunks of all
+          documents share its connection pool and concurrency limit
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from mistralai import Mistral
+
+from async_services import MistralService, get_service_loop
+from benchmarks.fake_mistral_server import FakeMistralServer
+from benchmarks.synthetic_pdf import build_pdf
+from chunked_ocr import run_ocr_chunked
+
+
+class ThreadSampler:
+    """Records the highest number of live threads while active."""
+
+    def __init__(self, interval=0.01):
+        self.peak = threading.active_count()
+        self._interval = interval
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _sample(self):
+        while not self._stop.wait(self._interval):
+            self.peak = max(self.peak, threading.active_count())
+
+
+def run_threads(server_url, docs, workers):
+    client = Mistral(api_key="fake", server_url=server_url)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda item: run_ocr_chunked(client, item[1], item[0]), docs))
+
+
+def run_async(server_url, docs, concurrency):
+    service = MistralService("fake", server_url=server_url, concurrency=concurrency)
+
+    async def all_docs():
+        return await asyncio.gather(*(service.aocr_chunked(pdf_bytes, name) for name, pdf_bytes in docs))
+
+    return get_service_loop().run(all_docs())
+
+
+def serve(port, latency):
+    FakeMistralServer(port, latency).serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=40)
+    parser.add_argument("--pages", type=int, default=60, help="Pages per document")
+    parser.add_argument("--latency", type=float, default=0.5, help="Fake server seconds per OCR request")
+    parser.add_argument("--workers", type=int, default=4, help="Document threads for the threaded variant")
+    parser.add_argument("--concurrency", type=int, default=16, help="OCR requests in flight for the async variant")
+    args = parser.parse_args()
+
+    # The server runs in its own process so its threads don't count towards the client's
+    probe = FakeMistralServer()
+    port = probe.server_address[1]
+    probe.server_close()
+    server = multiprocessing.Process(target=serve, args=(port, args.latency), daemon=True)
+    server.start()
+    server_url = f"http://127.0.0.1:{port}"
+    time.sleep(0.5)
+    docs = [(f"doc{i}.pdf", build_pdf(args.pages, image_kb=4, seed=i)) for i in range(args.docs)]
+
+    print(f"{'variant':<8} {'seconds':>8} {'docs/min':>9} {'peak threads':>13}")
+    for name, run in (("threads", lambda: run_threads(server_url, docs, args.workers)),
+                      ("async", lambda: run_async(server_url, docs, args.concurrency))):
+        with ThreadSampler() as sampler, contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            responses = run()
+            seconds = time.perf_counter() - started
+        assert all(len(response.pages) == args.pages for response in responses)
+        print(f"{name:<8} {seconds:>8.2f} {args.docs / seconds * 60:>9.0f} {sampler.peak:>13}")
+    server.terminate()
+
+
+if __name__ == "__main__":
+    main()
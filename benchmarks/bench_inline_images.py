@@ -0,0 +1,101 @@
+"""
+Micro-benchmark of image inlining on image-heavy OCR pages.
+
+    python -m benchmarks.bench_inline_images --pages 50 --images 20 --image-kb 100
+
+Variants:
+    legacy     one ``str.replace`` over the page per image (the original inliner)
+    single     ``pipeline.replace_images_in_markdown``, one regex pass per page
+    combined   ``get_combined_markdown``: every page inlined and joined into one string
+    preview    ``iter_page_markdown`` for the first ``--preview-pages`` pages only,
+               as the "View OCR Content" expander renders them
+
+Each variant reports the median wall time of ``--repeat`` runs and its peak
+traced memory.
+"""
+import argparse
+import base64
+import random
+import statistics
+import time
+import tracemalloc
+
+from mistralai.models import OCRResponse
+
+from ocr import OCR_MODEL
+from pipeline import get_combined_markdown, iter_page_markdown, replace_images_in_markdown
+
+
+def legacy_replace(markdown_str, images_dict):
+    """``replace_images_in_markdown`` as it was: a full copy of the page per image."""
+    for img_name, base64_str in images_dict.items():
+        markdown_str = markdown_str.replace(f"![{img_name}]({img_name})", f"![{img_name}]({base64_str})")
+    return markdown_str
+
+
+def image_heavy_response(pages, images, image_kb, seed=0) -> OCRResponse:
+    """OCR response whose pages each hold ``images`` inlined-size images between paragraphs."""
+    rng = random.Random(seed)
+    image_base64 = "data:image/jpeg;base64," + base64.b64encode(rng.randbytes(image_kb * 1024)).decode("ascii")
+    page_dicts = []
+    for index in range(pages):
+        parts = [f"# Page {index + 1}"]
+        for n in range(images):
+            parts += ["Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 5, f"![img-{n}.jpeg](img-{n}.jpeg)"]
+        page_dicts.append({
+            "index": index,
+            "markdown": "\n\n".join(parts),
+            "images": [{"id": f"img-{n}.jpeg", "top_left_x": 0, "top_left_y": 0, "bottom_right_x": 400,
+                        "bottom_right_y": 300, "image_base64": image_base64} for n in range(images)],
+            "dimensions": {"dpi": 200, "height": 2339, "width": 1654},
+        })
+    return OCRResponse.model_validate({"pages": page_dicts, "model": OCR_MODEL,
+                                       "usage_info": {"pages_processed": pages}})
+
+
+def measure(func, repeat):
+    """Return ``(median seconds, peak traced bytes)`` of ``func()``."""
+    seconds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - started)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(seconds), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--images", type=int, default=20, help="Images per page")
+    parser.add_argument("--image-kb", type=int, default=100, help="Size of each image before base64")
+    parser.add_argument("--preview-pages", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    response = image_heavy_response(args.pages, args.images, args.image_kb)
+    page_images = [{img.id: img.image_base64 for img in page.images} for page in response.pages]
+
+    def inline_all(replace):
+        return lambda: [replace(page.markdown, images) for page, images in zip(response.pages, page_images)]
+
+    variants = {
+        "legacy": inline_all(legacy_replace),
+        "single": inline_all(replace_images_in_markdown),
+        "combined": lambda: get_combined_markdown(response),
+        "preview": lambda: list(iter_page_markdown(response, 0, args.preview_pages)),
+    }
+    assert variants["legacy"]() == variants["single"]()
+
+    print(f"{args.pages} pages x {args.images} images of {args.image_kb} KB")
+    print(f"{'variant':<9} {'median ms':>10} {'peak MB':>8}")
+    for name, func in variants.items():
+        seconds, peak = measure(func, args.repeat)
+        print(f"{name:<9} {seconds * 1000:>10.1f} {peak / 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
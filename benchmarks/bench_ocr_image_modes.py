@@ -0,0 +1,99 @@
+"""
+Compare response size, parse time and memory of OCR with and without base64 images.
+
+Offline (synthetic scanned pages):
+    python -m benchmarks.bench_ocr_image_modes --pages 100 --image-kb 300
+
+Against Mistral with a real PDF (needs MISTRAL_API_KEY, two billable OCR calls):
+    python -m benchmarks.bench_ocr_image_modes --pdf bundle.pdf
+"""
+import argparse
+import base64
+import json
+import os
+import time
+import tracemalloc
+
+from mistralai.models import OCRResponse
+
+from ocr import OCR_MODEL
+
+
+def synthetic_response(pages, image_kb, include_images):
+    """Build an OCR response dict shaped like Mistral's for scanned pages."""
+    image_base64 = "data:image/jpeg;base64," + base64.b64encode(os.urandom(image_kb * 1024)).decode("ascii")
+    page_dicts = []
+    for index in range(pages):
+        image = {
+            "id": "img-0.jpeg",
+            "top_left_x": 0, "top_left_y": 0, "bottom_right_x": 1654, "bottom_right_y": 2339,
+        }
+        if include_images:
+            image["image_base64"] = image_base64
+        page_dicts.append({
+            "index": index,
+            "markdown": "![img-0.jpeg](img-0.jpeg)\n\n" + f"# Page {index}\n\n" + "Lorem ipsum dolor sit amet. " * 100,
+            "images": [image],
+            "dimensions": {"dpi": 200, "height": 2339, "width": 1654},
+        })
+    return {"pages": page_dicts, "model": OCR_MODEL, "usage_info": {"pages_processed": pages}}
+
+
+def live_response(pdf_path, include_images):
+    """OCR a real PDF with Mistral and return the raw response dict."""
+    from mistralai import Mistral
+    from ocr import run_ocr
+
+    with open(pdf_path, "rb") as f:
+        pdf_bytes = f.read()
+    client = Mistral(api_key=os.environ["MISTRAL_API_KEY"])
+    started = time.perf_counter()
+    response = run_ocr(client, pdf_bytes, os.path.basename(pdf_path), include_images=include_images)
+    print(f"  OCR round trip ({'images' if include_images else 'text only'}): {time.perf_counter() - started:.2f}s")
+    return response.model_dump(mode="json")
+
+
+def measure(response_dict):
+    """Return payload size, parse time and peak parse memory for one response."""
+    payload = json.dumps(response_dict)
+    tracemalloc.start()
+    started = time.perf_counter()
+    response = OCRResponse.model_validate_json(payload)
+    parse_seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    image_bytes = sum(len(img.image_base64 or "") for page in response.pages for img in page.images)
+    return {
+        "payload_bytes": len(payload),
+        "image_base64_bytes": image_bytes,
+        "parse_seconds": parse_seconds,
+        "parse_peak_bytes": peak,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", help="OCR this PDF with Mistral instead of using synthetic pages")
+    parser.add_argument("--pages", type=int, default=100, help="Synthetic page count")
+    parser.add_argument("--image-kb", type=int, default=300, help="Synthetic image size per page")
+    args = parser.parse_args()
+
+    results = {}
+    for mode, include_images in (("eager", True), ("lazy", False)):
+        if args.pdf:
+            response_dict = live_response(args.pdf, include_images)
+        else:
+            response_dict = synthetic_response(args.pages, args.image_kb, include_images)
+        results[mode] = measure(response_dict)
+
+    print(f"{'mode':<6} {'payload MB':>11} {'images MB':>10} {'parse s':>8} {'peak MB':>8}")
+    for mode, r in results.items():
+        print(f"{mode:<6} {r['payload_bytes'] / 1e6:>11.2f} {r['image_base64_bytes'] / 1e6:>10.2f} "
+              f"{r['parse_seconds']:>8.3f} {r['parse_peak_bytes'] / 1e6:>8.2f}")
+    eager, lazy = results["eager"], results["lazy"]
+    print(f"text-only payload is {lazy['payload_bytes'] / eager['payload_bytes']:.1%} of the full payload, "
+          f"peak parse memory {lazy['parse_peak_bytes'] / eager['parse_peak_bytes']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Regression check for the duplicate-page collapse: same-template scans must keep their own OCR text.
+
+    python -m benchmarks.bench_page_dedup --sheets 4 --copies 2
+
+The synthetic bundle holds ``--sheets`` semester marksheets scanned from one
+template (same letterhead, table grid and layout; only the semester and the
+marks differ), then ``--copies`` byte-identical copies of the first sheets and
+one re-encoded (re-scanned) copy of the first. It goes through
+``page_dedup.with_dedup`` with a stand-in OCR runner that reads each scan's
+text from the bytes it was rendered from, and then through
+``collapse_duplicate_pages``.
+
+Every page must come back with the text of its own sheet; the command exits
+with status 1 if any page was given another sheet's result. It also reports
+the pages OCR'd and classified with and without the collapse.
+"""
+import argparse
+import hashlib
+import sys
+import time
+from io import BytesIO
+
+from mistralai.models import OCRPageDimensions, OCRPageObject, OCRResponse, OCRUsageInfo
+from PIL import Image, ImageDraw, ImageFont
+from PyPDF2 import PdfReader
+
+from benchmarks.synthetic_pdf import SCAN_HEIGHT, SCAN_WIDTH, build_pdf
+from page_dedup import collapse_duplicate_pages, with_dedup
+
+SUBJECTS = ["Data Structures", "Operating Systems", "Database Systems", "Computer Networks", "Compiler Design",
+            "Machine Learning"]
+
+
+def marksheet_text(semester: int) -> str:
+    """Text of one semester's marksheet; every semester shares the template, only the numbers differ."""
+    lines = ["VISVESVARAYA TECHNOLOGICAL UNIVERSITY", f"Grade Card - B.Tech Semester {semester}",
+             "Name: Priya Sharma    USN: 1VT19CS042", "", "Course Title            Credits  Grade Points"]
+    lines += [f"{subject:<24}{3 + (semester + n) % 2:>7}{6 + (semester * 7 + n * 3) % 5:>14}"
+              for n, subject in enumerate(SUBJECTS)]
+    lines += ["", f"SGPA: {7 + semester % 3}.{(semester * 37) % 10}"]
+    return "\n".join(lines)
+
+
+def scan(text: str, quality=85) -> bytes:
+    """Render ``text`` on the marksheet template as a grayscale JPEG scan."""
+    img = Image.new("L", (SCAN_WIDTH, SCAN_HEIGHT), 245)
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.load_default(size=36)
+    # Letterhead band and table grid, identical on every sheet
+    draw.rectangle([120, 120, SCAN_WIDTH - 120, 330], outline=40, width=6)
+    for row in range(len(SUBJECTS) + 2):
+        draw.line([120, 560 + row * 70, SCAN_WIDTH - 120, 560 + row * 70], fill=90, width=3)
+    for line_num, line in enumerate(text.splitlines()):
+        draw.text((160, 160 + line_num * 70), line, fill=20, font=font)
+    output_buffer = BytesIO()
+    img.save(output_buffer, "JPEG", quality=quality)
+    return output_buffer.getvalue()
+
+
+def bundle(sheets: int, copies: int):
+    """Return ``(pdf_bytes, [expected OCR text per page], {scan sha256: text})``."""
+    texts = [marksheet_text(semester) for semester in range(1, sheets + 1)]
+    scans = [scan(text) for text in texts]
+    rescan = scan(texts[0], quality=60)
+    page_scans = scans + [scans[n % sheets] for n in range(copies)] + [rescan]
+    expected = texts + [texts[n % sheets] for n in range(copies)] + [texts[0]]
+    readable = {hashlib.sha256(data).hexdigest(): text for data, text in zip(page_scans, expected)}
+    pdf_bytes = build_pdf(len(page_scans), font_kb=1, image=lambda index: page_scans[index])
+    return pdf_bytes, expected, readable
+
+
+def reading_runner(readable: dict, sent: list):
+    """An OCR runner that reads each page's text from its scan's bytes and counts the pages sent."""
+    def run(client, pdf_bytes, file_name, model="stand-in", include_images=True):
+        pages = []
+        for index, page in enumerate(PdfReader(BytesIO(pdf_bytes)).pages):
+            data = max(page.images, key=lambda image: len(image.data)).data
+            pages.append(OCRPageObject(index=index, markdown=readable[hashlib.sha256(data).hexdigest()], images=[],
+                                       dimensions=OCRPageDimensions(dpi=200, height=SCAN_HEIGHT, width=SCAN_WIDTH)))
+        sent.append(len(pages))
+        return OCRResponse(pages=pages, model=model,
+                           usage_info=OCRUsageInfo(pages_processed=len(pages), doc_size_bytes=len(pdf_bytes)))
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sheets", type=int, default=4, help="Same-template marksheets in the bundle")
+    parser.add_argument("--copies", type=int, default=2, help="Byte-identical copies of the first sheets")
+    args = parser.parse_args()
+
+    pdf_bytes, expected, readable = bundle(args.sheets, args.copies)
+    sent = []
+    started = time.perf_counter()
+    response = with_dedup(reading_runner(readable, sent))(None, pdf_bytes, "marksheets.pdf")
+    seconds = time.perf_counter() - started
+    unique, report = collapse_duplicate_pages({page.index: {"markdown": page.markdown} for page in response.pages})
+
+    wrong = [page.index for page in response.pages if page.markdown != expected[page.index]]
+    print(f"{len(expected)} pages: {args.sheets} same-template sheets, {args.copies} byte-identical copies, "
+          f"1 re-encoded copy")
+    print(f"OCR'd {sum(sent)}/{len(expected)} pages in {seconds * 1000:.0f} ms; "
+          f"classified {len(unique)}/{len(expected)} pages ({report.summary()})")
+    print(f"Pages given another sheet's result: {len(wrong)}{' ' + str(wrong) if wrong else ''}")
+    if wrong:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+End-to-end benchmark of the app's document flow against fake providers.
+
+    python -m benchmarks.bench_pipeline --pages 10 100 500 --runs 5
+    python -m benchmarks.bench_pipeline --ocr-latency 0.5 --llm-latency 2 --ocr-image-kb 100
+    python -m benchmarks.bench_pipeline --record recording/ --pdf bundle.pdf    # real APIs, once
+    python -m benchmarks.bench_pipeline --replay recording/
+
+Each run goes through the steps ``app_streamlit.py`` takes for one upload:
+``process_pdf`` -> ``DocumentState`` -> ``get_combined_markdown`` ->
+``categorize_documents`` -> ``splitPdfBasedOnCategories`` -> ``create_zip_from_pdfs``.
+Mistral is a ``FakeMistralServer`` in its own process and Gemini a
+``FakeGemini``, each with simulated latency, so no network or credentials are
+needed. Caches are off, so every run does the full work.
+
+Synthetic documents are scanned-looking PDFs (``synthetic_pdf``) whose OCR
+text comes from ``sample_pages`` and whose recorded labels follow a
+bundle-like layout of categories. ``--replay`` uses a recording instead: the
+PDF, its OCR markdown and Gemini's labels, as saved by ``--record``.
+
+Reported per document size and stage: median, p95 and max wall time over
+``--runs``, throughput at the median, and peak memory allocated during the
+stage (one extra run under ``tracemalloc``). Provider quotas are off unless
+the ``*_PER_MINUTE`` variables are set.
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import time
+import tracemalloc
+
+# Quotas would pace the fake providers; set them explicitly to include pacing
+for name in ("MISTRAL_REQUESTS_PER_MINUTE", "GEMINI_REQUESTS_PER_MINUTE", "GEMINI_TOKENS_PER_MINUTE"):
+    os.environ.setdefault(name, "0")
+os.environ.setdefault("TRACE_LOG", "0")
+
+from mistralai import Mistral
+
+import pipeline
+from async_services import ASYNC_SERVICES, GeminiService, MistralService
+from benchmarks.fake_gemini import FakeGemini
+from benchmarks.fake_mistral_server import FakeMistralServer
+from benchmarks.sample_pages import TEMPLATES, sample_page
+from benchmarks.synthetic_pdf import build_pdf
+from document_state import DocumentState
+
+STAGES = ("ocr", "markdown", "classify", "split", "zip", "total")
+
+
+def synthetic_document(pages, image_kb, seed=0):
+    """Return ``(pdf_bytes, pages_markdown, labels)`` for a bundle of ``pages`` pages."""
+    rng = random.Random(seed)
+    categories = [category for category in TEMPLATES if category != "unknown"]
+    labels = {}
+    while len(labels) < pages:
+        # Consecutive runs of pages per document, like a real applicant bundle
+        category = rng.choice(categories)
+        for _ in range(rng.randint(1, 4)):
+            if len(labels) < pages:
+                labels[len(labels)] = category
+    pages_markdown = [sample_page(labels[page_num], rng) for page_num in range(pages)]
+    return build_pdf(pages, image_kb=image_kb, seed=seed), pages_markdown, labels
+
+
+def load_recording(path):
+    """Return ``(pdf_bytes, pages_markdown, labels)`` saved by ``record``."""
+    with open(os.path.join(path, "document.pdf"), "rb") as f:
+        pdf_bytes = f.read()
+    with open(os.path.join(path, "ocr.json"), encoding="utf-8") as f:
+        pages_markdown = json.load(f)["pages"]
+    with open(os.path.join(path, "labels.json"), encoding="utf-8") as f:
+        labels = {int(page_num): category for page_num, category in json.load(f).items()}
+    return pdf_bytes, pages_markdown, labels
+
+
+def record(path, pdf_path):
+    """OCR and classify ``pdf_path`` with the real APIs and save what they returned under ``path``."""
+    from dotenv import find_dotenv, load_dotenv
+    load_dotenv(find_dotenv())
+    with open(pdf_path, "rb") as f:
+        pdf_bytes = f.read()
+    file_name = os.path.basename(pdf_path)
+    client = pipeline.make_mistral_client(os.environ["MISTRAL_API_KEY"])
+    pdf_response = pipeline.process_pdf(client, pdf_bytes, file_name, include_images=False)
+    document = DocumentState.from_ocr_response(file_name, pdf_bytes, pdf_response)
+    categories = pipeline.categorize_documents(pipeline.make_llm(), document)
+
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, "document.pdf"), "wb") as f:
+        f.write(pdf_bytes)
+    with open(os.path.join(path, "ocr.json"), "w", encoding="utf-8") as f:
+        json.dump({"pages": [page.markdown for page in pdf_response.pages]}, f)
+    with open(os.path.join(path, "labels.json"), "w", encoding="utf-8") as f:
+        json.dump({page_num: category for category, pages in categories.items() for page_num in pages}, f)
+    print(f"Recorded {document.page_count} pages of {file_name} to {path}")
+
+
+def run_flow(client, llm, pdf_bytes, file_name, memory=False):
+    """Run the app's flow once; return ``{stage: seconds}`` or, with ``memory``, ``{stage: peak bytes}``."""
+    results = {}
+
+    @contextlib.contextmanager
+    def stage(name):
+        if memory:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        yield
+        if memory:
+            results[name] = tracemalloc.get_traced_memory()[1] - baseline
+        else:
+            results[name] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    with stage("ocr"):
+        pdf_response = pipeline.process_pdf(client, pdf_bytes, file_name)
+        document = DocumentState.from_ocr_response(file_name, pdf_bytes, pdf_response)
+    with stage("markdown"):
+        pipeline.get_combined_markdown(pdf_response)
+    with stage("classify"):
+        categories = pipeline.categorize_documents(llm, document)
+    with stage("split"):
+        split_pdfs = pipeline.splitPdfBasedOnCategories(categories, document.pdf_bytes)
+    with stage("zip"):
+        pipeline.create_zip_from_pdfs(split_pdfs)
+    if not memory:
+        results["total"] = time.perf_counter() - started
+    return results
+
+
+def serve(port, latency, latency_per_page, pages_markdown, image_kb):
+    FakeMistralServer(port, latency, latency_per_page, pages_markdown=pages_markdown,
+                      image_kb=image_kb).serve_forever()
+
+
+def start_server(args, pages_markdown):
+    """Start a fake Mistral server in its own process (so its memory and CPU aren't measured)."""
+    probe = FakeMistralServer()
+    port = probe.server_address[1]
+    probe.server_close()
+    server = multiprocessing.Process(
+        target=serve, args=(port, args.ocr_latency, args.ocr_latency_per_page, pages_markdown, args.ocr_image_kb),
+        daemon=True,
+    )
+    server.start()
+    time.sleep(0.5)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[round(fraction * (len(ordered) - 1))]
+
+
+def bench_document(args, label, pdf_bytes, pages_markdown, labels):
+    server, server_url = start_server(args, pages_markdown)
+    if ASYNC_SERVICES:
+        client = MistralService("fake", server_url=server_url)
+    else:
+        client = Mistral(api_key="fake", server_url=server_url)
+    llm = FakeGemini(labels, latency=args.llm_latency, seconds_per_1k_tokens=args.llm_seconds_per_1k_tokens,
+                     stream_seconds=args.llm_stream_seconds)
+    llm = GeminiService(llm) if ASYNC_SERVICES else llm
+    page_count = len(labels)
+
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            timings = [run_flow(client, llm, pdf_bytes, f"{label}.pdf") for _ in range(args.runs)]
+            tracemalloc.start()
+            peaks = run_flow(client, llm, pdf_bytes, f"{label}.pdf", memory=True)
+            tracemalloc.stop()
+    finally:
+        server.terminate()
+
+    print(f"\n{label}: {page_count} pages, {len(pdf_bytes) / 1e6:.1f} MB, {args.runs} runs")
+    print(f"{'stage':<9} {'median s':>9} {'p95 s':>8} {'max s':>8} {'pages/s':>9} {'peak MB':>8}")
+    for name in STAGES:
+        seconds = [timing[name] for timing in timings]
+        median = statistics.median(seconds)
+        peak = f"{peaks[name] / 1e6:>8.1f}" if name in peaks else f"{'':>8}"
+        print(f"{name:<9} {median:>9.3f} {percentile(seconds, 0.95):>8.3f} {max(seconds):>8.3f} "
+              f"{page_count / median if median else float('inf'):>9.0f} {peak}")
+    print(f"Throughput: {60 / statistics.median(t['total'] for t in timings):.1f} docs/min")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 500], help="Synthetic document sizes")
+    parser.add_argument("--runs", type=int, default=5, help="Timed runs per document")
+    parser.add_argument("--image-kb", type=int, default=150, help="Scanned image size per synthetic PDF page")
+    parser.add_argument("--ocr-latency", type=float, default=0.2, help="Fake Mistral seconds per OCR request")
+    parser.add_argument("--ocr-latency-per-page", type=float, default=0.01, help="Extra OCR seconds per page")
+    parser.add_argument("--ocr-image-kb", type=int, default=0,
+                        help="Image size per page in OCR responses (0: text-only pages)")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="Fake Gemini seconds to first chunk")
+    parser.add_argument("--llm-seconds-per-1k-tokens", type=float, default=0.02,
+                        help="Extra fake Gemini seconds per 1000 prompt tokens")
+    parser.add_argument("--llm-stream-seconds", type=float, default=0.5, help="Fake Gemini seconds to stream a reply")
+    parser.add_argument("--replay", help="Benchmark a recording instead of synthetic documents")
+    parser.add_argument("--record", help="Record real OCR and Gemini results for --pdf into this directory")
+    parser.add_argument("--pdf", help="PDF to record")
+    args = parser.parse_args()
+
+    if args.record:
+        if not args.pdf:
+            parser.error("--record needs --pdf")
+        return record(args.record, args.pdf)
+    print(f"Services: {'async' if ASYNC_SERVICES else 'sync'}, OCR {args.ocr_latency}s/request "
+          f"+ {args.ocr_latency_per_page}s/page, Gemini {args.llm_latency}s + {args.llm_stream_seconds}s stream")
+    if args.replay:
+        bench_document(args, os.path.basename(os.path.normpath(args.replay)), *load_recording(args.replay))
+        return
+    for pages in args.pages:
+        bench_document(args, f"synthetic-{pages}", *synthetic_document(pages, args.image_kb))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Compare the single-pass splitter with the original per-category splitter.
+
+Offline, on synthetic scanned bundles (one JPEG per page plus a shared font):
+    python -m benchmarks.bench_split --pages 100 250 --image-kb 150 --repeat-every 40
+
+``--repeat-every N`` gives page ``i`` a byte-identical copy of the scan on page
+``i % N``, like a bundle containing the same passport copy several times.
+"""
+import argparse
+import contextlib
+import gc
+import io
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from io import BytesIO
+
+from PyPDF2 import PdfReader, PdfWriter
+
+from benchmarks.synthetic_pdf import build_pdf, category_layout
+from pdf_splitter import split_pdf, split_pdf_to_memory
+from zip_export import zip_sink
+
+
+def legacy_split(documentsData, file_bytes):
+    """The splitter as it was before pdf_splitter (one writer per category, all kept in memory)."""
+    pdf_reader = PdfReader(BytesIO(file_bytes))
+    total_pages = len(pdf_reader.pages)
+    split_pdfs = {}
+    for category, pages in documentsData.items():
+        if len(pages) > 0:
+            pdf_writer = PdfWriter()
+            for page_num in pages:
+                if page_num < total_pages:
+                    pdf_writer.add_page(pdf_reader.pages[page_num])
+            output_buffer = BytesIO()
+            pdf_writer.write(output_buffer)
+            split_pdfs[category] = output_buffer.getvalue()
+    return split_pdfs
+
+
+def run_legacy(layout, pdf_bytes) -> int:
+    return sum(len(b) for b in legacy_split(layout, pdf_bytes).values())
+
+
+def run_single_pass(layout, pdf_bytes) -> int:
+    split_pdfs, _ = split_pdf_to_memory(layout, pdf_bytes)
+    return sum(len(b) for b in split_pdfs.values())
+
+
+def run_streaming_zip(layout, pdf_bytes) -> int:
+    """Single pass written straight into a ZIP on disk."""
+    with tempfile.TemporaryFile() as f, zipfile.ZipFile(f, "w") as zip_file:
+        split_pdf(layout, pdf_bytes, zip_sink(zip_file))
+        return sum(info.file_size for info in zip_file.infolist())
+
+
+SPLITTERS = {
+    "legacy": run_legacy,
+    "single-pass": run_single_pass,
+    "to-zip": run_streaming_zip,
+}
+
+
+def measure(run, layout, pdf_bytes, repeats):
+    """Return best wall time, peak traced memory and total output bytes."""
+    best = float("inf")
+    # The splitter logs every file it writes; keep the table readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeats):
+            gc.collect()
+            started = time.perf_counter()
+            run(layout, pdf_bytes)
+            best = min(best, time.perf_counter() - started)
+        gc.collect()
+        tracemalloc.start()
+        output_bytes = run(layout, pdf_bytes)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {"seconds": best, "peak_bytes": peak, "output_bytes": output_bytes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[100, 250])
+    parser.add_argument("--image-kb", type=int, default=150, help="Scanned image size per page")
+    parser.add_argument("--categories", type=int, default=8)
+    parser.add_argument("--repeat-every", type=int, default=0, help="Duplicate scans every N pages (0: all unique)")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per splitter (best is reported)")
+    args = parser.parse_args()
+
+    print(f"{'pages':>5} {'splitter':<12} {'seconds':>8} {'peak MB':>8} {'output MB':>10}")
+    for pages in args.pages:
+        pdf_bytes = build_pdf(pages, image_kb=args.image_kb, repeat_every=args.repeat_every)
+        layout = category_layout(pages, categories=args.categories)
+        results = {name: measure(run, layout, pdf_bytes, args.repeats) for name, run in SPLITTERS.items()}
+        for name, r in results.items():
+            print(f"{pages:>5} {name:<12} {r['seconds']:>8.3f} {r['peak_bytes'] / 1e6:>8.2f} "
+                  f"{r['output_bytes'] / 1e6:>10.2f}")
+        legacy = results["legacy"]
+        for name in ("single-pass", "to-zip"):
+            r = results[name]
+            print(f"{'':>5} {name}: {legacy['seconds'] / r['seconds']:.2f}x speed, "
+                  f"peak memory {r['peak_bytes'] / legacy['peak_bytes']:.1%}, "
+                  f"output size {r['output_bytes'] / legacy['output_bytes']:.1%} of legacy")
+
+
+if __name__ == "__main__":
+    main()
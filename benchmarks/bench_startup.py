@@ -0,0 +1,81 @@
+"""
+Measure Streamlit app startup: cold first run (imports + script) and a warm rerun.
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --baseline-rev <git revision>    # before/after
+
+Each script runs in a fresh interpreter through ``streamlit.testing`` with a
+dummy MISTRAL_API_KEY; nothing is uploaded, so no API calls are made.
+``--baseline-rev`` runs the same script as it was at that revision against the
+current modules.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+streamlit_seconds = time.perf_counter() - started
+modules_before = len(sys.modules)
+app = AppTest.from_file({script!r}, default_timeout=300)
+app.secrets["MISTRAL_API_KEY"] = "bench"
+started = time.perf_counter()
+app.run()
+first_run = time.perf_counter() - started
+started = time.perf_counter()
+app.run()
+rerun = time.perf_counter() - started
+print(json.dumps({{"streamlit": streamlit_seconds, "first_run": first_run, "rerun": rerun,
+                  "modules": len(sys.modules) - modules_before}}))
+"""
+
+
+def measure(script: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD.format(root=REPO_ROOT, script=script)],
+        check=True, capture_output=True, text=True, cwd=REPO_ROOT,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--script", default="app_streamlit.py", help="App script relative to the repo root")
+    parser.add_argument("--baseline-rev", help="Also measure the script as it was at this git revision")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters per script (median is reported)")
+    args = parser.parse_args()
+
+    scripts = {"current": os.path.join(REPO_ROOT, args.script)}
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.baseline_rev:
+            baseline = os.path.join(tmp, os.path.basename(args.script))
+            with open(baseline, "wb") as f:
+                f.write(subprocess.run(["git", "show", f"{args.baseline_rev}:{args.script}"],
+                                       check=True, capture_output=True, cwd=REPO_ROOT).stdout)
+            scripts = {"baseline": baseline, **scripts}
+
+        results = {}
+        for name, script in scripts.items():
+            runs = [measure(script) for _ in range(args.runs)]
+            results[name] = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+    print(f"{'script':<9} {'first run s':>12} {'rerun s':>8} {'modules':>8}   (streamlit import excluded)")
+    for name, r in results.items():
+        print(f"{name:<9} {r['first_run']:>12.3f} {r['rerun']:>8.3f} {r['modules']:>8.0f}")
+    if "baseline" in results:
+        before, after = results["baseline"], results["current"]
+        print(f"first run {before['first_run'] / after['first_run']:.1f}x faster, "
+              f"rerun {before['rerun'] / after['rerun']:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+How many pages the text-layer triage keeps away from OCR, and the OCR time it saves.
+
+    python -m benchmarks.bench_text_layer --docs 20 --pages 30 --born-digital 0.6
+    python -m benchmarks.bench_text_layer --dir corpus/            # your PDFs, fake Mistral
+    python -m benchmarks.bench_text_layer --dir corpus/ --live     # your PDFs, real Mistral (billable)
+
+Every document is OCR'd twice with ``ocr.process_pdf`` and chunked OCR: once
+as-is and once through ``text_layer.with_text_layer``. Offline, Mistral is a
+``FakeMistralServer`` taking ``--ocr-latency`` per request plus
+``--ocr-latency-per-page`` per page, so the saving follows from the pages not
+sent. ``--live`` uses the real API with ``MISTRAL_API_KEY``.
+
+The synthetic corpus mixes born-digital pages (a text layer, no image) with
+scanned ones (a page image, no text layer), ``--born-digital`` of them
+born-digital; there the report also counts pages the triage routed wrongly.
+Provider quotas are off unless the ``*_PER_MINUTE`` variables are set.
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import re
+import time
+from io import BytesIO
+
+os.environ.setdefault("MISTRAL_REQUESTS_PER_MINUTE", "0")
+os.environ.setdefault("TRACE_LOG", "0")
+
+from mistralai import Mistral
+from PyPDF2 import PdfReader, PdfWriter
+
+import ocr
+from async_services import MistralService
+from benchmarks.fake_mistral_server import FakeMistralServer
+from benchmarks.sample_pages import TEMPLATES, sample_page
+from benchmarks.synthetic_pdf import build_pdf
+from chunked_ocr import run_ocr_chunked
+from text_layer import triage_page, with_text_layer
+
+_IMAGE_LINE_RE = re.compile(r"^!\[[^\]]*\]\([^)]*\)$", re.MULTILINE)
+
+
+def synthetic_bundle(pages, born_digital, image_kb, seed):
+    """Return ``(pdf_bytes, [is_born_digital per page])`` for a bundle mixing both kinds of page."""
+    rng = random.Random(seed)
+    categories = [category for category in TEMPLATES if category != "unknown"]
+    texts = [_IMAGE_LINE_RE.sub("", sample_page(rng.choice(categories), rng)) for _ in range(pages)]
+    digital = [rng.random() < born_digital for _ in range(pages)]
+    text_pdf = PdfReader(BytesIO(build_pdf(pages, image_kb=0, text=lambda index: texts[index], seed=seed)))
+    scan_pdf = PdfReader(BytesIO(build_pdf(pages, image_kb=image_kb, seed=seed)))
+    pdf_writer = PdfWriter()
+    for index in range(pages):
+        pdf_writer.add_page((text_pdf if digital[index] else scan_pdf).pages[index])
+    output_buffer = BytesIO()
+    pdf_writer.write(output_buffer)
+    return output_buffer.getvalue(), digital
+
+
+def find_pdfs(directory):
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if name.lower().endswith(".pdf"):
+                yield os.path.join(root, name)
+
+
+def timed_ocr(client, pdf_bytes, file_name, runner):
+    """Return ``(seconds, pages sent to OCR)``."""
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        response = ocr.process_pdf(client, pdf_bytes, file_name, runner=runner, include_images=False)
+    return time.perf_counter() - started, response.usage_info.pages_processed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=20, help="Synthetic bundles")
+    parser.add_argument("--pages", type=int, default=30, help="Pages per synthetic bundle")
+    parser.add_argument("--born-digital", type=float, default=0.6, help="Fraction of born-digital synthetic pages")
+    parser.add_argument("--image-kb", type=int, default=150, help="Scanned image size per synthetic page")
+    parser.add_argument("--dir", help="Triage the PDFs under this directory instead")
+    parser.add_argument("--live", action="store_true", help="OCR with the real Mistral API (needs MISTRAL_API_KEY)")
+    parser.add_argument("--ocr-latency", type=float, default=0.5, help="Fake Mistral seconds per OCR request")
+    parser.add_argument("--ocr-latency-per-page", type=float, default=0.1, help="Extra fake OCR seconds per page")
+    args = parser.parse_args()
+
+    if args.dir:
+        corpus = ((os.path.relpath(path, args.dir), path, None) for path in find_pdfs(args.dir))
+    else:
+        corpus = ((f"synthetic-{n}.pdf", None, synthetic_bundle(args.pages, args.born_digital, args.image_kb, n))
+                  for n in range(args.docs))
+
+    if args.live:
+        from dotenv import find_dotenv, load_dotenv
+        load_dotenv(find_dotenv())
+        client = MistralService(os.environ["MISTRAL_API_KEY"])
+        runner = client.runner()
+    else:
+        server = FakeMistralServer(latency=args.ocr_latency, latency_per_page=args.ocr_latency_per_page).start()
+        client = Mistral(api_key="fake", server_url=server.url)
+        runner = run_ocr_chunked
+    triaged_runner = with_text_layer(runner)
+
+    totals = {"docs": 0, "pages": 0, "text": 0, "misrouted": 0, "triage": 0.0, "full": 0.0, "triaged": 0.0}
+    print(f"{'document':<32} {'pages':>6} {'text':>5} {'triage ms':>10} {'full OCR s':>11} {'triaged s':>10}")
+    for name, path, synthetic in corpus:
+        if synthetic is None:
+            with open(path, "rb") as f:
+                pdf_bytes, digital = f.read(), None
+        else:
+            pdf_bytes, digital = synthetic
+
+        started = time.perf_counter()
+        verdicts = [triage_page(page, index) for index, page in enumerate(PdfReader(BytesIO(pdf_bytes)).pages)]
+        triage_seconds = time.perf_counter() - started
+        text_pages = sum(1 for verdict in verdicts if not verdict.needs_ocr)
+        if digital is not None:
+            totals["misrouted"] += sum(1 for verdict, is_digital in zip(verdicts, digital)
+                                       if verdict.needs_ocr == is_digital)
+
+        full_seconds, _ = timed_ocr(client, pdf_bytes, name, runner)
+        triaged_seconds, _ = timed_ocr(client, pdf_bytes, name, triaged_runner)
+        print(f"{name[-32:]:<32} {len(verdicts):>6} {text_pages:>5} {triage_seconds * 1000:>10.1f} "
+              f"{full_seconds:>11.2f} {triaged_seconds:>10.2f}")
+        totals["docs"] += 1
+        totals["pages"] += len(verdicts)
+        totals["text"] += text_pages
+        totals["triage"] += triage_seconds
+        totals["full"] += full_seconds
+        totals["triaged"] += triaged_seconds
+
+    if not totals["pages"]:
+        print("No pages")
+        return
+    saved = totals["full"] - totals["triaged"]
+    print(f"\n{totals['docs']} documents, {totals['pages']} pages: {totals['text']} "
+          f"({totals['text'] / totals['pages']:.0%}) answered from the text layer")
+    print(f"OCR time {totals['full']:.1f}s -> {totals['triaged']:.1f}s, saving {saved:.1f}s "
+          f"({saved / totals['full']:.0%}); triage costs {totals['triage'] / totals['pages'] * 1000:.1f} ms/page")
+    if not args.dir:
+        print(f"Misrouted pages: {totals['misrouted']}")
+
+
+if __name__ == "__main__":
+    main()
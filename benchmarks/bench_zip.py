@@ -0,0 +1,118 @@
+"""
+Compare peak RSS and wall time of the ZIP export paths.
+
+    python -m benchmarks.bench_zip --pages 100 300 --image-kb 150
+
+Variants (each run in a fresh process so its peak RSS is its own):
+    legacy     split to memory, then deflate every PDF into an in-memory ZIP
+    memory     split to memory, then ``create_zip_from_pdfs`` (store/deflate probe)
+    file       ``zip_export.write_split_zip`` streaming into a file on disk
+    chunks     ``zip_export.iter_split_zip`` consumed chunk by chunk, as a download would
+"""
+import argparse
+import contextlib
+import io
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from io import BytesIO
+
+from benchmarks.bench_split import legacy_split
+from benchmarks.synthetic_pdf import build_pdf, category_layout
+from pipeline import create_zip_from_pdfs, splitPdfBasedOnCategories
+from zip_export import iter_split_zip, write_split_zip
+
+VARIANTS = ("legacy", "memory", "file", "chunks")
+
+
+def legacy_zip(split_pdfs):
+    """``create_zip_from_pdfs`` as it was: every entry deflated into an in-memory ZIP."""
+    zip_buffer = BytesIO()
+    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        for category, pdf_bytes in split_pdfs.items():
+            zip_file.writestr(f"{category}.pdf", pdf_bytes)
+    return zip_buffer.getvalue()
+
+
+def run_variant(variant, layout, pdf_bytes) -> int:
+    """Run one export path and return the ZIP size."""
+    if variant == "legacy":
+        return len(legacy_zip(legacy_split(layout, pdf_bytes)))
+    if variant == "memory":
+        return len(create_zip_from_pdfs(splitPdfBasedOnCategories(layout, pdf_bytes)))
+    if variant == "file":
+        with tempfile.TemporaryFile() as f:
+            write_split_zip(layout, pdf_bytes, f)
+            return f.tell()
+    return sum(len(chunk) for chunk in iter_split_zip(layout, pdf_bytes))
+
+
+def peak_rss_kb() -> int:
+    """Peak resident set size of this process in KiB."""
+    # ru_maxrss survives exec on Linux, so a child would inherit the parent's peak
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def child(args):
+    # The PDF is built by the parent so building it doesn't set this process's peak
+    with open(args.source, "rb") as f:
+        pdf_bytes = f.read()
+    layout = category_layout(args.pages[0], categories=args.categories)
+    baseline = peak_rss_kb()
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        zip_bytes = run_variant(args.child, layout, pdf_bytes)
+        seconds = time.perf_counter() - started
+    peak = peak_rss_kb()
+    print(json.dumps({"seconds": seconds, "peak_rss_mb": peak / 1024,
+                      "extra_rss_mb": (peak - baseline) / 1024, "zip_mb": zip_bytes / 1e6,
+                      "pdf_mb": len(pdf_bytes) / 1e6}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[100, 300])
+    parser.add_argument("--image-kb", type=int, default=150, help="Scanned image size per page")
+    parser.add_argument("--categories", type=int, default=8)
+    parser.add_argument("--child", choices=VARIANTS, help=argparse.SUPPRESS)
+    parser.add_argument("--source", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args)
+
+    print(f"{'pages':>5} {'variant':<8} {'seconds':>8} {'peak RSS MB':>12} {'+RSS MB':>8} {'zip MB':>7}")
+    for pages in args.pages:
+        results = {}
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as source:
+            source.write(build_pdf(pages, image_kb=args.image_kb, text=lambda i: f"Page {i} " * 40))
+            source.flush()
+            for variant in VARIANTS:
+                output = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.bench_zip", "--child", variant, "--pages", str(pages),
+                     "--categories", str(args.categories), "--source", source.name],
+                    check=True, capture_output=True, text=True,
+                ).stdout
+                results[variant] = json.loads(output.strip().splitlines()[-1])
+        for variant, r in results.items():
+            print(f"{pages:>5} {variant:<8} {r['seconds']:>8.3f} {r['peak_rss_mb']:>12.1f} "
+                  f"{r['extra_rss_mb']:>8.1f} {r['zip_mb']:>7.2f}")
+        legacy = results["legacy"]
+        for variant in VARIANTS[1:]:
+            r = results[variant]
+            print(f"{'':>5} {variant}: {legacy['seconds'] / r['seconds']:.2f}x speed, "
+                  f"{r['extra_rss_mb'] / max(legacy['extra_rss_mb'], 0.1):.0%} of legacy extra RSS")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Offline evaluation of prompt compaction (``page_features.compact_page``).
+
+    python -m benchmarks.eval_prompt_compaction
+    python -m benchmarks.eval_prompt_compaction --samples labelled_pages.jsonl --head-lines 4
+    python -m benchmarks.eval_prompt_compaction --llm --limit 60     # also ask Gemini (needs credentials)
+
+Samples are JSON lines of ``{"markdown": ..., "category": ...}`` (the format
+``fast_classifier train`` takes) or, by default, ``benchmarks.sample_pages``.
+
+Reported per variant (full markdown vs compacted):
+  tokens     estimated prompt tokens of the page data, as ``classify_pages`` sends it
+  tfidf      accuracy of a TF-IDF nearest-centroid model, k-fold cross-validated,
+             trained and tested on that variant: a cheap offline proxy for how much
+             category signal survives compaction
+  rules      pages the fast-path rules label, and how many of those correctly
+  gemini     accuracy of ``classify_pages`` (only with ``--llm``)
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from benchmarks.sample_pages import sample_pages
+from classification import build_classification_prompt, estimate_tokens
+from fast_classifier import TfidfCentroidModel, local_label
+from page_features import (
+    PAGE_FEATURE_HEAD_LINES,
+    PAGE_FEATURE_KEY_LINES,
+    PAGE_FEATURE_MAX_CHARS,
+    PAGE_FEATURE_MAX_LINE_CHARS,
+    compact_page,
+)
+
+
+def load_samples(path):
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return [(record["markdown"], record["category"]) for record in records]
+
+
+def tfidf_accuracy(samples, folds, seed):
+    """k-fold cross-validated accuracy of a nearest-centroid model on ``samples``."""
+    order = list(range(len(samples)))
+    random.Random(seed).shuffle(order)
+    correct = 0
+    for fold in range(folds):
+        test = set(order[fold::folds])
+        model = TfidfCentroidModel.train(samples[i] for i in order if i not in test)
+        for i in test:
+            similarities = model.similarities(samples[i][0])
+            correct += max(similarities, key=similarities.get) == samples[i][1]
+    return correct / len(samples)
+
+
+def rule_coverage(samples):
+    """``(pages labelled, pages labelled correctly)`` by the fast-path rules."""
+    labelled = correct = 0
+    for markdown, category in samples:
+        label = local_label(markdown)
+        if label is not None:
+            labelled += 1
+            correct += label == category
+    return labelled, correct
+
+
+def gemini_accuracy(samples, batch_size):
+    """Accuracy of ``classify_pages`` with prompts built from ``samples`` as given."""
+    from classification import classify_pages
+    from pipeline import make_llm
+
+    llm = make_llm()
+    correct = 0
+    for start in range(0, len(samples), batch_size):
+        batch = samples[start:start + batch_size]
+        result = classify_pages(llm, {i: {"markdown": markdown} for i, (markdown, _) in enumerate(batch)})
+        labels = {page_num: category for category, pages in result.items() for page_num in pages}
+        correct += sum(labels.get(i) == category for i, (_, category) in enumerate(batch))
+    return correct / len(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", help="JSON lines of labelled pages (default: synthetic sample_pages)")
+    parser.add_argument("--per-category", type=int, default=20, help="Synthetic pages per category")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--head-lines", type=int, default=PAGE_FEATURE_HEAD_LINES)
+    parser.add_argument("--key-lines", type=int, default=PAGE_FEATURE_KEY_LINES)
+    parser.add_argument("--max-line-chars", type=int, default=PAGE_FEATURE_MAX_LINE_CHARS)
+    parser.add_argument("--max-chars", type=int, default=PAGE_FEATURE_MAX_CHARS)
+    parser.add_argument("--llm", action="store_true", help="Also measure Gemini accuracy on both variants")
+    parser.add_argument("--limit", type=int, default=0, help="Pages sent to Gemini per variant (0: all)")
+    parser.add_argument("--batch-size", type=int, default=20, help="Pages per Gemini prompt")
+    args = parser.parse_args()
+
+    samples = load_samples(args.samples) if args.samples else sample_pages(args.per_category, args.seed)
+    started = time.perf_counter()
+    compacted = [(compact_page(markdown, head_lines=args.head_lines, key_lines=args.key_lines,
+                               max_line_chars=args.max_line_chars, max_chars=args.max_chars), category)
+                 for markdown, category in samples]
+    compact_ms = (time.perf_counter() - started) * 1000 / len(samples)
+    print(f"{len(samples)} pages in {len({category for _, category in samples})} categories, "
+          f"compaction {compact_ms:.2f} ms/page")
+
+    results = {}
+    for name, variant in (("full", samples), ("compact", compacted)):
+        page_tokens = [estimate_tokens(repr({0: {"markdown": markdown}})) for markdown, _ in variant]
+        prompt = build_classification_prompt({i: {"markdown": markdown} for i, (markdown, _) in enumerate(variant)})
+        labelled, correct = rule_coverage(variant)
+        results[name] = {
+            "tokens": estimate_tokens(prompt),
+            "median": statistics.median(page_tokens),
+            "p95": sorted(page_tokens)[int(0.95 * (len(page_tokens) - 1))],
+            "tfidf": tfidf_accuracy(variant, args.folds, args.seed),
+            "rules": f"{labelled}/{correct}",
+        }
+        if args.llm:
+            subset = variant[:args.limit] if args.limit else variant
+            results[name]["gemini"] = gemini_accuracy(subset, args.batch_size)
+
+    print(f"{'variant':<8} {'prompt tokens':>14} {'median/page':>12} {'p95/page':>9} {'tfidf acc':>10} "
+          f"{'rules lab/ok':>13}" + (f" {'gemini acc':>11}" if args.llm else ""))
+    for name, r in results.items():
+        print(f"{name:<8} {r['tokens']:>14} {r['median']:>12.0f} {r['p95']:>9} {r['tfidf']:>10.1%} {r['rules']:>13}"
+              + (f" {r['gemini']:>11.1%}" if args.llm else ""))
+    full, compact = results["full"], results["compact"]
+    print(f"Compaction saves {1 - compact['tokens'] / full['tokens']:.1%} of prompt tokens; "
+          f"TF-IDF accuracy {compact['tfidf'] - full['tfidf']:+.1%}"
+          + (f", Gemini accuracy {compact['gemini'] - full['gemini']:+.1%}" if args.llm else ""))
+
+
+if __name__ == "__main__":
+    main()
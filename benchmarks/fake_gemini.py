@@ -0,0 +1,76 @@
+"""
+Offline stand-in for the Gemini chat model, for benchmarks.
+
+``FakeGemini`` answers classification prompts the way Gemini does with
+structured output: a JSON array of ``{"page", "category"}`` records, streamed
+in small chunks that carry ``usage_metadata``. Labels come from a recorded
+``{page_index: category}`` mapping (pages missing from it are "unknown").
+
+Simulated latency is ``latency`` seconds to the first chunk plus
+``seconds_per_1k_tokens`` for every 1000 estimated prompt tokens, then the
+reply is spread over ``stream_seconds``.
+"""
+import ast
+import asyncio
+import json
+import time
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from classification import estimate_tokens
+
+PAGE_DATA_MARKER = "Here is the page data to classify:"
+
+
+class FakeGemini:
+    """Chat model with ``invoke``/``stream`` and their async twins, like ``ChatVertexAI``."""
+
+    def __init__(self, labels=None, latency=1.0, seconds_per_1k_tokens=0.0, stream_seconds=0.0, chunk_chars=64):
+        self.labels = labels or {}
+        self.latency = latency
+        self.seconds_per_1k_tokens = seconds_per_1k_tokens
+        self.stream_seconds = stream_seconds
+        self.chunk_chars = chunk_chars
+        self.calls = 0
+
+    def _reply(self, prompt):
+        self.calls += 1
+        page_data = ast.literal_eval(prompt.split(PAGE_DATA_MARKER, 1)[1].strip())
+        reply = json.dumps([{"page": page_num, "category": self.labels.get(page_num, "unknown")}
+                            for page_num in page_data])
+        usage = {"input_tokens": estimate_tokens(prompt), "output_tokens": estimate_tokens(reply)}
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+        delay = self.latency + usage["input_tokens"] / 1000 * self.seconds_per_1k_tokens
+        return reply, usage, delay
+
+    def _chunks(self, reply, usage):
+        pieces = [reply[start:start + self.chunk_chars] for start in range(0, len(reply), self.chunk_chars)]
+        for n, piece in enumerate(pieces):
+            # Like Vertex, usage arrives as per-chunk deltas; here all of it on the last chunk
+            yield AIMessageChunk(content=piece, usage_metadata=usage if n == len(pieces) - 1 else None)
+
+    def invoke(self, prompt, **kwargs):
+        reply, usage, delay = self._reply(prompt)
+        time.sleep(delay + self.stream_seconds)
+        return AIMessage(content=reply, usage_metadata=usage)
+
+    async def ainvoke(self, prompt, **kwargs):
+        reply, usage, delay = self._reply(prompt)
+        await asyncio.sleep(delay + self.stream_seconds)
+        return AIMessage(content=reply, usage_metadata=usage)
+
+    def stream(self, prompt, **kwargs):
+        reply, usage, delay = self._reply(prompt)
+        time.sleep(delay)
+        chunks = list(self._chunks(reply, usage))
+        for chunk in chunks:
+            time.sleep(self.stream_seconds / len(chunks))
+            yield chunk
+
+    async def astream(self, prompt, **kwargs):
+        reply, usage, delay = self._reply(prompt)
+        await asyncio.sleep(delay)
+        chunks = list(self._chunks(reply, usage))
+        for chunk in chunks:
+            await asyncio.sleep(self.stream_seconds / len(chunks))
+            yield chunk
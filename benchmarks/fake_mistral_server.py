@@ -0,0 +1,174 @@
+"""
+Local fake of the Mistral file and OCR endpoints, for offline benchmarks.
+
+    python -m benchmarks.fake_mistral_server --port 8765 --latency 0.2
+
+Point a client at it with ``Mistral(api_key="fake", server_url="http://127.0.0.1:8765")``.
+Uploaded PDFs are kept in memory; OCR returns one synthetic markdown page per
+PDF page after ``latency`` seconds (plus ``latency_per_page`` per page).
+Page ``i`` of the whole document gets ``pages_markdown[i % len(pages_markdown)]``
+if given (e.g. recorded OCR output; chunk uploads named like
+``chunked_ocr.chunk_name`` are offset by their first page), and with ``image_kb`` one scanned image of that size,
+whose base64 data is only sent when the request asks for images.
+With ``throttle_every=N`` every Nth OCR request is answered with a 429 and a
+``Retry-After`` of ``retry_after`` seconds, to exercise the rate limiter.
+"""
+import argparse
+import base64
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+from PyPDF2 import PdfReader
+
+
+class FakeMistralHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_POST(self):
+        server = self.server
+        server.count("requests")
+        if self.path.startswith("/v1/files"):
+            form = BytesParser(policy=HTTP).parsebytes(
+                f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("latin-1") + self._read_body()
+            )
+            upload = next(part for part in form.iter_parts() if part.get_filename())
+            content = upload.get_payload(decode=True)
+            file_id = str(uuid.uuid4())
+            # Chunk uploads are named "<name>_p<first>-<last>.pdf"
+            match = re.search(r"_p(\d+)-\d+\.pdf$", upload.get_filename() or "")
+            with server.lock:
+                server.files[file_id] = (content, int(match.group(1)) - 1 if match else 0)
+            return self._send_json(200, {
+                "id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+                "filename": upload.get_filename(), "purpose": "ocr", "sample_type": "ocr_input",
+                "source": "upload",
+            })
+        if self.path.startswith("/v1/ocr"):
+            request = json.loads(self._read_body())
+            file_id = request["document"]["document_url"].rsplit("/", 1)[-1]
+            with server.lock:
+                content, first_page = server.files.get(file_id, (None, 0))
+            if content is None:
+                return self._send_json(404, {"detail": "unknown document"})
+            if server.throttle_every and server.count("ocr_requests") % server.throttle_every == 0:
+                server.count("throttled")
+                return self._send_json(429, {"detail": "rate limited"},
+                                       headers={"Retry-After": f"{server.retry_after:g}"})
+            page_count = len(PdfReader(BytesIO(content)).pages)
+            time.sleep(server.latency + server.latency_per_page * page_count)
+            server.count("ocr_pages", page_count)
+            include_images = bool(request.get("include_image_base64"))
+            return self._send_json(200, {
+                "pages": [server.page(index, first_page + index, include_images) for index in range(page_count)],
+                "model": request.get("model", "mistral-ocr-latest"),
+                "usage_info": {"pages_processed": page_count, "doc_size_bytes": len(content)},
+            })
+        self._send_json(404, {"detail": "not found"})
+
+    def do_GET(self):
+        self.server.count("requests")
+        match = re.match(r"^/v1/files/([^/]+)/url", self.path)
+        if match:
+            host, port = self.server.server_address[:2]
+            return self._send_json(200, {"url": f"http://{host}:{port}/signed/{match.group(1)}"})
+        self._send_json(404, {"detail": "not found"})
+
+
+class FakeMistralServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.0, latency_per_page=0.0, throttle_every=0, retry_after=1.0,
+                 pages_markdown=None, image_kb=0):
+        super().__init__(("127.0.0.1", port), FakeMistralHandler)
+        self.latency = latency
+        self.latency_per_page = latency_per_page
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.pages_markdown = pages_markdown
+        self.image_base64 = ("data:image/jpeg;base64,"
+                             + base64.b64encode(random.Random(0).randbytes(image_kb * 1024)).decode("ascii")
+                             if image_kb else None)
+        self.files = {}
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def handle_error(self, request, client_address):
+        # Clients that time out close the connection mid-response; that's expected here
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+    def page(self, index, document_index, include_images) -> dict:
+        """OCR result of page ``index`` of the upload, page ``document_index`` of the whole document."""
+        if self.pages_markdown:
+            markdown = self.pages_markdown[document_index % len(self.pages_markdown)]
+        else:
+            markdown = f"# Page {document_index + 1}\n\nSynthetic OCR text."
+        images = []
+        if self.image_base64 is not None:
+            markdown = f"![img-0.jpeg](img-0.jpeg)\n\n{markdown}"
+            image = {"id": "img-0.jpeg", "top_left_x": 0, "top_left_y": 0,
+                     "bottom_right_x": 1654, "bottom_right_y": 2339}
+            if include_images:
+                image["image_base64"] = self.image_base64
+            images.append(image)
+        return {"index": index, "markdown": markdown, "images": images,
+                "dimensions": {"dpi": 200, "height": 2339, "width": 1654}}
+
+    def count(self, name, amount=1) -> int:
+        with self.lock:
+            self.stats[name] = self.stats.get(name, 0) + amount
+            return self.stats[name]
+
+    def start(self) -> "FakeMistralServer":
+        """Serve from a daemon thread and return self."""
+        threading.Thread(target=self.serve_forever, name="fake-mistral", daemon=True).start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per OCR request")
+    parser.add_argument("--latency-per-page", type=float, default=0.0, help="Extra seconds per OCR'd page")
+    parser.add_argument("--throttle-every", type=int, default=0, help="Answer every Nth OCR request with a 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with each 429")
+    parser.add_argument("--image-kb", type=int, default=0, help="Size of the scanned image returned per page")
+    args = parser.parse_args()
+    server = FakeMistralServer(args.port, args.latency, args.latency_per_page, args.throttle_every,
+                               args.retry_after, image_kb=args.image_kb)
+    print(f"Fake Mistral API on {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
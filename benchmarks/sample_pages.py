@@ -0,0 +1,191 @@
+"""
+Synthetic labelled OCR pages for offline classification experiments.
+
+Each page looks like Mistral OCR markdown of a real upload: a heading or
+letterhead, image links, the lines that identify the document, tables for
+marksheets and score reports, and a variable amount of generic filler before
+and after, so the identifying text is not always near the top.
+
+    sample_pages(per_category=20, seed=0) -> [(markdown, category), ...]
+"""
+import random
+
+FILLER = [
+    "This document is issued subject to the rules and regulations in force at the time of issue.",
+    "Any alteration or overwriting renders this document invalid and liable for legal action.",
+    "The information provided herein is true to the best of our knowledge and records.",
+    "Verification of this document can be requested through the official website or by email.",
+    "Please retain this document for future reference and produce it whenever required.",
+    "The candidate is advised to check all particulars carefully and report discrepancies promptly.",
+    "Signature of the issuing authority and official seal appear at the bottom of the page.",
+    "Address: Plot No. 12, Sector 5, Institutional Area, New Delhi 110001, India.",
+    "Phone: +91 11 2345 6789 | Email: info@example.org | Website: www.example.org",
+    "Date of issue and place of issue are recorded in the register maintained for this purpose.",
+]
+
+NAMES = ["Rohan Kumar", "Priya Sharma", "Aditya Verma", "Sneha Iyer", "Arjun Mehta", "Kavya Nair"]
+SUBJECTS = ["English", "Mathematics", "Physics", "Chemistry", "Computer Science", "Economics", "Biology"]
+COURSES = ["Data Structures", "Operating Systems", "Database Systems", "Machine Learning", "Signals and Systems",
+           "Engineering Mathematics", "Computer Networks", "Compiler Design"]
+
+
+def _table(header, rows):
+    lines = ["| " + " | ".join(header) + " |", "| " + " | ".join("---" for _ in header) + " |"]
+    lines += ["| " + " | ".join(str(cell) for cell in row) + " |" for row in rows]
+    return "\n".join(lines)
+
+
+def _marks_table(rng, subjects):
+    return _table(["Subject", "Theory", "Practical", "Total", "Grade"],
+                  [(s, rng.randint(50, 80), rng.randint(15, 20), rng.randint(65, 100), rng.choice("ABC"))
+                   for s in subjects])
+
+
+def _semester_table(rng):
+    return _table(["Course Code", "Course Title", "Credits", "Grade", "Grade Points"],
+                  [(f"CS{rng.randint(100, 499)}", c, rng.randint(2, 4), rng.choice(["A", "A+", "B"]),
+                    rng.randint(7, 10)) for c in rng.sample(COURSES, 5)])
+
+
+def _score_table(rng, sections):
+    return _table(["Section", "Score"], [(s, rng.randint(20, 30)) for s in sections])
+
+
+def _letter(rng, name, body):
+    return "\n\n".join([f"Date: {rng.randint(1, 28)}/{rng.randint(1, 12)}/2023", *body,
+                        f"Sincerely,\n{rng.choice(NAMES)}"])
+
+
+TEMPLATES = {
+    "tenth-marksheet": lambda rng, name: [
+        "# CENTRAL BOARD OF SECONDARY EDUCATION", "Marks Statement cum Certificate",
+        "SECONDARY SCHOOL EXAMINATION (CLASS X) 2015", f"This is to certify that {name}",
+        _marks_table(rng, rng.sample(SUBJECTS, 5)), "Result: PASS"],
+    "twelfth-marksheet": lambda rng, name: [
+        "# COUNCIL FOR THE INDIAN SCHOOL CERTIFICATE EXAMINATIONS", "Statement of Marks",
+        "SENIOR SCHOOL CERTIFICATE EXAMINATION (CLASS XII) 2017", f"Name of Candidate: {name}",
+        _marks_table(rng, rng.sample(SUBJECTS, 5)), "Higher Secondary result: PASSED"],
+    "passport": lambda rng, name: [
+        "REPUBLIC OF INDIA", "Type P  Country Code IND  Passport No. " + f"Z{rng.randint(1000000, 9999999)}",
+        f"Surname / Given Name: {name}", "Nationality: INDIAN", "Place of Issue: MUMBAI",
+        f"Date of Expiry: {rng.randint(1, 28)}/{rng.randint(1, 12)}/2031",
+        f"P<IND{name.upper().replace(' ', '<<')}<<<<<<<<<<<<<<<<<<"],
+    "passport-receipt": lambda rng, name: [
+        "# Passport Seva", "Online Appointment Receipt / Acknowledgement",
+        f"File Number: MU{rng.randint(10**9, 10**10)}", f"Applicant Name: {name}",
+        "Application Type: Fresh Passport", "Appointment Date: 12/06/2023, Passport Seva Kendra, Lower Parel"],
+    "english-test-toefl": lambda rng, name: [
+        "# TOEFL iBT Test Taker Score Report", "Test of English as a Foreign Language, ETS",
+        f"Name: {name}", f"Appointment Number: {rng.randint(10**15, 10**16)}", _score_table(rng, ["Reading", "Listening", "Speaking", "Writing"]),
+        f"Total Score: {rng.randint(90, 118)}"],
+    "english-test-ielts": lambda rng, name: [
+        "# IELTS Test Report Form", "International English Language Testing System, Academic",
+        f"Candidate Name: {name}", f"TRF Number: 23IN{rng.randint(10**6, 10**7)}SHAR001A", _score_table(rng, ["Listening", "Reading", "Writing", "Speaking"]),
+        f"Overall Band Score: {rng.choice(['6.5', '7.0', '7.5', '8.0'])}"],
+    "english-test-pte": lambda rng, name: [
+        "# Pearson Test of English", "PTE Academic Score Report", f"Test Taker: {name}",
+        f"Test Taker ID: PTE{rng.randint(10**8, 10**9)}",
+        _score_table(rng, ["Listening", "Reading", "Speaking", "Writing"]), f"Overall Score: {rng.randint(58, 85)}"],
+    "english-test-duolingo": lambda rng, name: [
+        "# Duolingo English Test", "Official Certificate", f"{name}",
+        f"Certificate ID: {rng.randint(10**7, 10**8):x}",
+        _score_table(rng, ["Literacy", "Comprehension", "Conversation", "Production"]),
+        f"Overall score {rng.randint(110, 150)}"],
+    "proficiency-test-gre": lambda rng, name: [
+        "# GRE General Test Examinee Score Report", "Graduate Record Examinations, ETS", f"Name: {name}",
+        f"Registration Number: {rng.randint(10**6, 10**7)}",
+        _score_table(rng, ["Verbal Reasoning", "Quantitative Reasoning", "Analytical Writing"])],
+    "proficiency-test-gmat": lambda rng, name: [
+        "# GMAT Official Score Report", "Graduate Management Admission Council", f"Name: {name}",
+        f"Appointment Number: {rng.randint(10**7, 10**8)}",
+        _score_table(rng, ["Quantitative Reasoning", "Verbal Reasoning", "Data Insights"]),
+        f"Total Score: {rng.randint(555, 805)}"],
+    "under-graduate-degree-provisional-certificate": lambda rng, name: [
+        "# UNIVERSITY OF MUMBAI", "PROVISIONAL CERTIFICATE",
+        f"This is to certify that {name} has passed the Bachelor of Engineering (B.E.) examination",
+        "held in May 2019 and is eligible for the award of the degree at the next convocation.",
+        "This certificate is valid until the original degree is issued."],
+    "undergraduate-degree-original-certificate": lambda rng, name: [
+        "# ANNA UNIVERSITY", f"This is to certify that {name}",
+        "having fulfilled all the requirements has been conferred the degree of", "BACHELOR OF TECHNOLOGY",
+        "in Information Technology with First Class", "Given under the seal of the University at the convocation"],
+    "under-graduate-marksheets-semester-wise-or-year-wise": lambda rng, name: [
+        "# VISVESVARAYA TECHNOLOGICAL UNIVERSITY", f"Grade Card - B.Tech Semester {rng.randint(1, 8)}",
+        f"Name: {name}", _semester_table(rng), f"SGPA: {rng.randint(70, 95) / 10}"],
+    "post-graduate-degree-provisional-certificate": lambda rng, name: [
+        "# UNIVERSITY OF DELHI", "PROVISIONAL CERTIFICATE",
+        f"Certified that {name} has passed the Master of Science (M.Sc.) examination",
+        "held in 2021 and is eligible for the award of the degree at the next convocation."],
+    "postgraduate-degree-original-certificate": lambda rng, name: [
+        "# INDIAN INSTITUTE OF TECHNOLOGY BOMBAY", f"{name}",
+        "has been conferred the degree of MASTER OF TECHNOLOGY", "in Computer Science and Engineering",
+        "at the Convocation held in August 2020"],
+    "post-graduate-marksheets-semester-wise-or-year-wise": lambda rng, name: [
+        "# JAWAHARLAL NEHRU UNIVERSITY", f"Statement of Marks - M.Tech Semester {rng.randint(1, 4)}",
+        f"Name: {name}", _semester_table(rng), f"CGPA: {rng.randint(70, 95) / 10}"],
+    "resume": lambda rng, name: [
+        f"# {name}", f"{name.split()[0].lower()}@example.com | +91 98{rng.randint(10**7, 10**8)}",
+        "## Work Experience", "Software Engineer, Infosys (2019 - 2023)", "- Built data pipelines in Python",
+        "## Education", "B.Tech, Computer Science", "## Skills", "Python, SQL, Machine Learning, Docker"],
+    "work-experience-letter": lambda rng, name: [
+        "# TATA CONSULTANCY SERVICES", "EXPERIENCE CERTIFICATE", "TO WHOM IT MAY CONCERN",
+        f"This is to certify that {name} was employed with us from July 2018 to March 2023.",
+        "Designation at the time of relieving: Senior Systems Engineer.",
+        "We wish them success in their future endeavours."],
+    "aadhaar-card": lambda rng, name: [
+        "Government of India", "Unique Identification Authority of India", f"{name}",
+        f"DOB: {rng.randint(1, 28)}/{rng.randint(1, 12)}/1998",
+        f"{rng.randint(1000, 9999)} {rng.randint(1000, 9999)} {rng.randint(1000, 9999)}",
+        "Aadhaar - Aam Aadmi ka Adhikar"],
+    "lor-academic": lambda rng, name: [_letter(rng, name, [
+        "Department of Computer Science, Professor and Head",
+        f"I am pleased to recommend {name}, who was a student in my Operating Systems course.",
+        "In my class they ranked among the top five students and completed a research project under my guidance.",
+        "I strongly recommend them for admission to your graduate program."])],
+    "lor-professional": lambda rng, name: [_letter(rng, name, [
+        "Engineering Manager, Wipro Technologies",
+        f"I have supervised {name} for three years as their reporting manager.",
+        "They led the migration of our billing platform and mentored two junior engineers.",
+        "I recommend them without reservation for your master's program."])],
+    "statement-of-purpose": lambda rng, name: [
+        "# Statement of Purpose", f"{name}",
+        "My interest in machine learning began during my undergraduate project on crop yield prediction.",
+        "Through this graduate program I hope to deepen my understanding of statistical learning.",
+        # SOPs quote test scores, which the fast path must not take for a score report
+        f"I scored {rng.randint(100, 118)} in the TOEFL iBT (Test of English as a Foreign Language) and "
+        f"{rng.randint(310, 335)} in the GRE General Test (Graduate Record Examinations).",
+        "My goal is to build systems that make healthcare accessible in rural India."],
+    "letter-of-recommendation": lambda rng, name: [_letter(rng, name, [
+        "Letter of Recommendation",
+        f"It is my pleasure to recommend {name} for admission to your university.",
+        "I have known them for four years in various capacities.",
+        "I am confident they will excel in their chosen field."])],
+    "unknown": lambda rng, name: [
+        rng.choice(["Fee Receipt", "Hostel Allotment", "Bank Statement", "Medical Certificate",
+                    "Admission Form"]),
+        f"Received from {name} the sum of Rs. {rng.randint(1000, 90000)}", "Payment mode: Online",
+        # Forms quote the applicant's Aadhaar number, which the fast path must not take for the card
+        f"Aadhaar No. (Unique Identification Authority of India): "
+        f"{rng.randint(1000, 9999)} {rng.randint(1000, 9999)} {rng.randint(1000, 9999)}",
+        _table(["Date", "Description", "Amount"],
+               [(f"0{d}/05/2023", "Payment", rng.randint(100, 9000)) for d in range(1, 4)])],
+}
+
+
+def sample_page(category: str, rng: random.Random) -> str:
+    """One synthetic OCR page of ``category``."""
+    name = rng.choice(NAMES)
+    lines = ["![img-0.jpeg](img-0.jpeg)"] if rng.random() < 0.7 else []
+    # Sometimes the identifying text comes after a long preamble, sometimes right away
+    lines += rng.sample(FILLER, rng.randint(0, 6))
+    lines += TEMPLATES[category](rng, name)
+    lines += rng.sample(FILLER, rng.randint(2, 8))
+    if rng.random() < 0.5:
+        lines.append("![img-1.jpeg](img-1.jpeg)")
+    return "\n\n".join(lines)
+
+
+def sample_pages(per_category=20, seed=0) -> list:
+    """Return ``[(markdown, category)]`` with ``per_category`` pages of every category."""
+    rng = random.Random(seed)
+    return [(sample_page(category, rng), category) for category in TEMPLATES for _ in range(per_category)]
@@ -0,0 +1,117 @@
+"""
+Synthetic PDFs for offline benchmarks.
+
+Pages look like scans (one JPEG-filtered image per page, random bytes so they
+don't compress) with an optional text layer in a shared embedded font, which
+is what applicant bundles are mostly made of.
+"""
+import random
+import zlib
+
+
+# Pixel size of the page scans (A4 at 200 dpi)
+SCAN_WIDTH, SCAN_HEIGHT = 1654, 2339
+
+
+def build_pdf(pages, image_kb=150, text=None, font_kb=40, repeat_every=0, seed=0, image=None) -> bytes:
+    """
+    Build a PDF in memory.
+
+    Args:
+        pages: Number of pages
+        image_kb: Size of the scanned image on each page (0 for no image)
+        text: Optional ``function(page_index) -> str`` giving each page's text layer
+        font_kb: Size of the embedded font program shared by every page
+        repeat_every: If > 0, page ``i`` gets a byte-identical copy of the image of page
+            ``i % repeat_every`` in its own object (the same scan included twice in a bundle)
+        seed: Seed for the random image bytes
+        image: Optional ``function(page_index) -> bytes`` giving each page's scan as a
+            ``SCAN_WIDTH`` x ``SCAN_HEIGHT`` grayscale JPEG instead of random bytes
+
+    Returns:
+        PDF bytes
+    """
+    rng = random.Random(seed)
+    objects = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    def stream(dictionary: str, data: bytes) -> bytes:
+        return (f"<< {dictionary} /Length {len(data)} >>\nstream\n".encode("latin-1")
+                + data + b"\nendstream")
+
+    catalog = add(b"")
+    pages_id = add(b"")
+    font_file = add(stream("", rng.randbytes(font_kb * 1024)))
+    descriptor = add(
+        f"<< /Type /FontDescriptor /FontName /BenchSans /Flags 32 /FontBBox [0 0 1000 1000]"
+        f" /ItalicAngle 0 /Ascent 800 /Descent -200 /CapHeight 700 /StemV 80 /FontFile2 {font_file} 0 R >>"
+        .encode("latin-1")
+    )
+    font = add(
+        f"<< /Type /Font /Subtype /TrueType /BaseFont /BenchSans /FirstChar 32 /LastChar 126"
+        f" /Widths [{' '.join(['500'] * 95)}] /FontDescriptor {descriptor} 0 R >>".encode("latin-1")
+    )
+
+    page_ids = []
+    for index in range(pages):
+        resources = f"/Font << /F1 {font} 0 R >>"
+        content = b""
+        if image_kb or image is not None:
+            source = index % repeat_every if repeat_every else index
+            if image is not None:
+                data = image(source)
+            else:
+                data = random.Random(seed * 100003 + source).randbytes(image_kb * 1024)
+            scan = add(stream(
+                f"/Type /XObject /Subtype /Image /Width {SCAN_WIDTH} /Height {SCAN_HEIGHT} /ColorSpace /DeviceGray"
+                " /BitsPerComponent 8 /Filter /DCTDecode",
+                data,
+            ))
+            resources += f" /XObject << /Im0 {scan} 0 R >>"
+            content += b"q 595 0 0 842 0 0 cm /Im0 Do Q\n"
+        if text is not None:
+            lines = text(index).splitlines() or [""]
+            content += b"BT /F1 11 Tf 14 TL 56 780 Td\n"
+            for line in lines:
+                escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+                content += f"({escaped}) Tj T*\n".encode("latin-1", "replace")
+            content += b"ET\n"
+        contents = add(stream("/Filter /FlateDecode", zlib.compress(content)))
+        page_ids.append(add(
+            f"<< /Type /Page /Parent {pages_id} 0 R /MediaBox [0 0 595 842]"
+            f" /Resources << {resources} >> /Contents {contents} 0 R >>".encode("latin-1")
+        ))
+
+    objects[catalog - 1] = f"<< /Type /Catalog /Pages {pages_id} 0 R >>".encode("latin-1")
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects[pages_id - 1] = f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode("latin-1")
+
+    out = bytearray(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode("latin-1") + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode("latin-1")
+    out += (f"trailer\n<< /Size {len(objects) + 1} /Root {catalog} 0 R >>\n"
+            f"startxref\n{xref}\n%%EOF\n").encode("latin-1")
+    return bytes(out)
+
+
+def category_layout(pages, categories=8, seed=0) -> dict:
+    """Assign consecutive page runs to categories, like a real applicant bundle."""
+    rng = random.Random(seed)
+    names = [f"category-{n}" for n in range(categories)]
+    layout = {name: [] for name in names}
+    page = 0
+    while page < pages:
+        run = rng.randint(1, max(1, pages // categories))
+        name = rng.choice(names)
+        layout[name].extend(range(page, min(page + run, pages)))
+        page += run
+    return layout
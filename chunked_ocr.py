@@ -0,0 +1,117 @@
+"""
+Chunked, concurrent OCR for large PDFs.
+
+The document is split into page ranges of ``chunk_size`` pages, each range is
+OCR'd as its own small PDF on a bounded thread pool, and the pages are put back
+together in order with their global page indices. Every request goes through
+the Mistral ``ProviderLimiter``, which paces uploads and schedules retries.
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from io import BytesIO
+
+from mistralai.models import OCRResponse, OCRUsageInfo
+from PyPDF2 import PdfReader
+
+from ocr import OCR_MODEL, pages_pdf, run_ocr
+from rate_limiter import RATE_LIMIT_RETRIES, get_limiter
+from tracing import log_event
+
+OCR_CHUNK_SIZE = int(os.environ.get("OCR_CHUNK_SIZE", 25))
+OCR_CHUNK_CONCURRENCY = int(os.environ.get("OCR_CHUNK_CONCURRENCY", 4))
+OCR_CHUNK_RETRIES = int(os.environ.get("OCR_CHUNK_RETRIES", RATE_LIMIT_RETRIES))
+# Upload, signed URL and OCR: requests charged to the limiter per attempt
+OCR_REQUESTS_PER_CALL = 3
+
+
+@dataclass
+class ChunkTiming:
+    """Outcome of OCR on one page range (``start`` inclusive, ``end`` exclusive)."""
+    start: int
+    end: int
+    seconds: float
+    attempts: int
+
+
+def chunk_name(file_name, start, end) -> str:
+    return f"{file_name.rsplit('.', 1)[0]}_p{start + 1}-{end}.pdf"
+
+
+def _ocr_chunk(client, chunk_bytes, start, end, upload_name, model, include_images, retries, limiter):
+    started = time.perf_counter()
+    for attempt in range(1, retries + 2):
+        try:
+            with limiter.slot(requests=OCR_REQUESTS_PER_CALL, tokens=end - start):
+                response = run_ocr(client, chunk_bytes, upload_name, model=model, include_images=include_images)
+            return response, ChunkTiming(start, end, time.perf_counter() - started, attempt)
+        except Exception as e:
+            delay = limiter.retry_delay(e, attempt) if attempt <= retries else None
+            if delay is None:
+                raise
+            log_event("ocr_retry", pages=f"{start + 1}-{end}", error=f"{type(e).__name__}: {e}", attempt=attempt,
+                      delay_seconds=round(delay, 1))
+            time.sleep(delay)
+
+
+def run_ocr_chunked(client, pdf_bytes, file_name, model=OCR_MODEL, include_images=True,
+                    chunk_size=OCR_CHUNK_SIZE, concurrency=OCR_CHUNK_CONCURRENCY,
+                    retries=OCR_CHUNK_RETRIES, on_chunk=None, limiter=None):
+    """
+    OCR a PDF in concurrent page-range chunks.
+
+    Args:
+        client: Mistral client (or a compatible fake)
+        pdf_bytes: Raw PDF bytes
+        file_name: Name used for the uploads
+        model: OCR model name
+        include_images: Whether to fetch base64 page images
+        chunk_size: Pages per OCR request; documents that fit in one chunk are sent as-is
+        concurrency: Maximum number of chunks in flight
+        retries: Extra attempts per chunk before giving up on the document; only
+            throttling, server errors and network failures are retried
+        on_chunk: Optional ``callback(done, total, ChunkTiming)``, called from the
+            calling thread as each chunk finishes
+        limiter: ``ProviderLimiter`` pacing the requests (default: the shared Mistral one)
+
+    Returns:
+        OCRResponse for the whole document with global page indices
+    """
+    limiter = limiter or get_limiter("mistral")
+    pdf_reader = PdfReader(BytesIO(pdf_bytes))
+    total_pages = len(pdf_reader.pages)
+    if chunk_size <= 0 or total_pages <= chunk_size:
+        response, _ = _ocr_chunk(client, pdf_bytes, 0, total_pages, file_name, model, include_images,
+                                 retries, limiter)
+        return response
+
+    ranges = [(start, min(start + chunk_size, total_pages)) for start in range(0, total_pages, chunk_size)]
+    log_event("ocr_chunks", file_name=file_name, pages=total_pages, chunks=len(ranges), chunk_size=chunk_size)
+
+    pages = []
+    pages_processed = 0
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        # Chunks are cut on this thread (PdfReader is not thread-safe) and submitted
+        # as soon as each one is ready, so uploads overlap with the remaining cuts
+        futures = [
+            pool.submit(_ocr_chunk, client, pages_pdf(pdf_reader, range(start, end)), start, end,
+                        chunk_name(file_name, start, end), model, include_images, retries, limiter)
+            for start, end in ranges
+        ]
+        for done, future in enumerate(as_completed(futures), start=1):
+            response, timing = future.result()
+            log_event("ocr_chunk", pages=f"{timing.start + 1}-{timing.end}", seconds=round(timing.seconds, 2),
+                      attempts=timing.attempts)
+            for page in response.pages:
+                pages.append(page.model_copy(update={"index": timing.start + page.index}))
+            pages_processed += response.usage_info.pages_processed
+            if on_chunk is not None:
+                on_chunk(done, len(ranges), timing)
+
+    pages.sort(key=lambda page: page.index)
+    return OCRResponse(
+        pages=pages,
+        model=model,
+        usage_info=OCRUsageInfo(pages_processed=pages_processed, doc_size_bytes=len(pdf_bytes)),
+    )
@@ -0,0 +1,310 @@
+"""
+Gemini page classification: category list, prompt and response parsing.
+
+Gemini answers with a schema-constrained JSON array of per-page records,
+``[{"page": 3, "category": "passport"}, ...]``. The reply is streamed and each
+record is parsed as soon as its closing brace arrives, so labels are available
+before the call finishes and a reply cut short or broken halfway still yields
+the pages before the break. Pages missing from the reply are asked for again
+on their own instead of rerunning the whole prompt; those still missing are
+labelled "unknown" and reported to ``record_fallback_labels`` so the label is
+not mistaken for Gemini's answer.
+"""
+import contextvars
+import json
+import os
+import time
+from contextlib import contextmanager
+
+from rate_limiter import get_limiter
+from tracing import log_event, trace_span
+
+# Rough characters-per-token ratio for Gemini on English text
+CHARS_PER_TOKEN = 4
+# Follow-up requests for pages missing from a reply before they are labelled "unknown"
+CLASSIFY_REPAIR_ATTEMPTS = int(os.environ.get("CLASSIFY_REPAIR_ATTEMPTS", 2))
+
+CATEGORIES = [
+    "tenth-marksheet", "twelfth-marksheet", "passport", "passport-receipt",
+    "english-test-toefl", "english-test-ielts", "english-test-pte", "english-test-duolingo",
+    "proficiency-test-gre", "proficiency-test-gmat",
+    "under-graduate-degree-provisional-certificate", "undergraduate-degree-original-certificate",
+    "under-graduate-marksheets-semester-wise-or-year-wise",
+    "post-graduate-degree-provisional-certificate", "postgraduate-degree-original-certificate",
+    "post-graduate-marksheets-semester-wise-or-year-wise",
+    "resume", "work-experience-letter", "aadhaar-card",
+    "lor-academic", "lor-professional", "statement-of-purpose", "letter-of-recommendation", "unknown",
+]
+
+# Response schema passed to Gemini; one record per page, category restricted to CATEGORIES
+PAGE_LABELS_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "page": {"type": "integer"},
+            "category": {"type": "string", "enum": CATEGORIES},
+        },
+        "required": ["page", "category"],
+    },
+}
+STRUCTURED_OUTPUT = {"response_mime_type": "application/json", "response_schema": PAGE_LABELS_SCHEMA}
+
+# Set of page indices collected by record_fallback_labels, if any
+_fallback_pages = contextvars.ContextVar("fallback_pages", default=None)
+
+
+def build_classification_prompt(page_data: dict) -> str:
+    """Build the classification prompt for ``{page_index: {"markdown": ...}}``."""
+    return f"""
+    You are an expert document classification AI.
+    Task:
+    Classify each page into one of the following categories:
+
+    {json.dumps(CATEGORIES)}
+
+    Rules:
+    1. Only use one category per page.
+    2. If a page doesn't match any category, classify it as "unknown".
+    3. Ignore images, tables, or decorative content; classify based on textual content.
+    4. Output **strictly** a JSON array with one record per page, in page order, where "page" is the page
+       number (integer) exactly as given in the page data and "category" is one of the categories above.
+
+    Example Output:
+    [
+    {{"page": 1, "category": "twelfth-marksheet"}},
+    {{"page": 2, "category": "passport"}},
+    {{"page": 3, "category": "passport"}},
+    {{"page": 9, "category": "unknown"}}
+    ]
+
+    Here is the page data to classify:
+    {page_data}
+    """
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate, good enough for sizing prompt windows and rate limiting."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class PageRecordParser:
+    """
+    Incremental parser for a streamed JSON array of page records.
+
+    ``feed`` takes the next piece of the reply and returns the records
+    completed by it. Text before the first ``[`` (e.g. a code fence) is
+    skipped, and a malformed record is dropped without affecting the others.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._stack = []
+        self._in_string = False
+        self._escaped = False
+        self._record_start = None
+
+    def feed(self, text: str) -> list:
+        self._buffer += text
+        records = []
+        buffer = self._buffer
+        for pos in range(self._pos, len(buffer)):
+            char = buffer[pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif not self._stack:
+                if char == "[":
+                    self._stack.append(char)
+            elif char == '"':
+                self._in_string = True
+            elif char in "[{":
+                if char == "{" and self._stack[-1] == "[":
+                    self._record_start = pos
+                self._stack.append(char)
+            elif char in "]}":
+                self._stack.pop()
+                if char == "}" and self._record_start is not None and self._stack and self._stack[-1] == "[":
+                    try:
+                        record = json.loads(buffer[self._record_start:pos + 1])
+                    except ValueError:
+                        record = None
+                    if isinstance(record, dict):
+                        records.append(record)
+                    self._record_start = None
+        # Keep only the unfinished record, if any
+        keep_from = self._record_start if self._record_start is not None else len(buffer)
+        self._buffer = buffer[keep_from:]
+        self._pos = len(buffer) - keep_from
+        if self._record_start is not None:
+            self._record_start = 0
+        return records
+
+
+def parse_classification_response(response_text: str) -> dict:
+    """Parse a ``{category: [pages]}`` JSON reply (the pre-schema format), tolerating code fences."""
+    response_text = response_text.strip()
+
+    # Remove markdown code blocks if present
+    if response_text.startswith("```json"):
+        response_text = response_text[7:].strip()
+    elif response_text.startswith("```"):
+        response_text = response_text[3:].strip()
+
+    if response_text.endswith("```"):
+        response_text = response_text[:-3].strip()
+
+    return json.loads(response_text)
+
+
+def _page_label(record, pending):
+    """Return ``(page_num, category)`` for a valid record about a pending page, else None."""
+    try:
+        page_num = int(record.get("page"))
+    except (TypeError, ValueError):
+        return None
+    category = record.get("category")
+    if page_num not in pending or category not in CATEGORIES:
+        return None
+    return page_num, category
+
+
+def _iter_reply(llm, prompt):
+    """Yield the reply message chunk by chunk, streaming when the model supports it."""
+    if hasattr(llm, "stream"):
+        yield from llm.stream(prompt, **STRUCTURED_OUTPUT)
+    else:
+        yield llm.invoke(prompt)
+
+
+def _request_labels(llm, page_data, labels, on_label, limiter):
+    """
+    Ask for the labels of ``page_data`` once, adding each valid record to ``labels``
+    as it streams in. Records already received are kept if the stream fails.
+    """
+    prompt = build_classification_prompt(page_data)
+    parser = PageRecordParser()
+    reply = []
+    found = 0
+    usage = {"input_tokens": 0, "output_tokens": 0}
+
+    def accept(record):
+        nonlocal found
+        label = _page_label(record, page_data)
+        if label is not None and label[0] not in labels:
+            labels[label[0]] = label[1]
+            found += 1
+            if on_label is not None:
+                on_label(*label)
+
+    with trace_span("gemini_request", pages=len(page_data), prompt_chars=len(prompt)) as span, \
+            limiter.slot(tokens=estimate_tokens(prompt)):
+        for message in _iter_reply(llm, prompt):
+            # Streamed chunks carry per-chunk token deltas; sum them
+            for key, value in (getattr(message, "usage_metadata", None) or {}).items():
+                if key in usage:
+                    usage[key] += value
+            reply.append(message.content)
+            for record in parser.feed(message.content):
+                accept(record)
+        if not found:
+            # A model that ignored the schema may still have answered in the old shape
+            try:
+                legacy = parse_classification_response("".join(reply))
+            except ValueError:
+                legacy = None
+            if isinstance(legacy, dict):
+                for category, pages in legacy.items():
+                    for page_num in pages if isinstance(pages, list) else []:
+                        accept({"page": page_num, "category": category})
+        # Estimates stand in when the model reports no usage
+        reply_text = "".join(reply)
+        span.set(labelled=found, bytes_out=len(reply_text), tokens_estimated=not usage["input_tokens"],
+                 tokens_in=usage["input_tokens"] or estimate_tokens(prompt),
+                 tokens_out=usage["output_tokens"] or estimate_tokens(reply_text))
+    if not found:
+        log_event("gemini_reply_unusable", pages=len(page_data), reply=reply_text)
+
+
+@contextmanager
+def record_fallback_labels():
+    """
+    Yield the set of pages labelled "unknown" inside the block because no reply
+    labelled them, including pages of windows classified on other threads with
+    ``contextvars.copy_context().run``.
+    """
+    pages = set()
+    token = _fallback_pages.set(pages)
+    try:
+        yield pages
+    finally:
+        _fallback_pages.reset(token)
+
+
+def mark_fallback_labels(page_nums) -> None:
+    """Report pages labelled "unknown" for want of an answer to ``record_fallback_labels``."""
+    pages = _fallback_pages.get()
+    if pages is not None:
+        pages.update(page_nums)
+
+
+def classify_pages(llm, page_data: dict, limiter=None, on_label=None,
+                   repair_attempts=CLASSIFY_REPAIR_ATTEMPTS) -> dict:
+    """
+    Classify all pages in ``page_data``, streaming per-page labels from Gemini.
+
+    Each request waits for Gemini quota and transient failures are retried by
+    ``limiter`` (default: the shared Gemini ``ProviderLimiter``). Pages missing
+    from a reply, or given an invalid label, are re-asked on their own up to
+    ``repair_attempts`` times and then labelled "unknown".
+
+    Args:
+        llm: LangChain chat model (or a ``GeminiService``)
+        page_data: ``{page_index: {"markdown": ...}}``
+        limiter: ``ProviderLimiter`` for the requests
+        on_label: Optional ``callback(page_index, category)``, called from this
+            thread as each label arrives
+        repair_attempts: Follow-up requests for missing pages
+
+    Returns:
+        ``{category: [pages]}``; raises ValueError if no page could be labelled
+    """
+    limiter = limiter or get_limiter("gemini")
+    labels = {}
+    pending = dict(page_data)
+    failures = repairs = 0
+    while pending:
+        try:
+            _request_labels(llm, pending, labels, on_label, limiter)
+        except Exception as e:
+            failures += 1
+            delay = limiter.retry_delay(e, failures) if failures <= limiter.retries else None
+            if delay is None:
+                raise
+            print(f"Gemini call failed ({e}) with {len(labels)} pages labelled, retrying in {delay:.1f}s")
+            time.sleep(delay)
+            pending = {page_num: page for page_num, page in pending.items() if page_num not in labels}
+            continue
+        pending = {page_num: page for page_num, page in pending.items() if page_num not in labels}
+        if not pending or repairs >= repair_attempts:
+            break
+        repairs += 1
+        print(f"Asking again for {len(pending)} pages missing from the reply (repair {repairs}/{repair_attempts})")
+
+    if not labels:
+        raise ValueError(f"Gemini returned no valid page labels for {len(page_data)} pages")
+    mark_fallback_labels(pending)
+    for page_num in pending:
+        labels[page_num] = "unknown"
+        if on_label is not None:
+            on_label(page_num, "unknown")
+
+    categories = {}
+    for page_num in sorted(labels):
+        categories.setdefault(labels[page_num], []).append(page_num)
+    return categories
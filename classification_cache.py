@@ -0,0 +1,184 @@
+"""
+Cache of page classifications keyed by normalized page text.
+
+The key is a SHA-256 of the page markdown with whitespace collapsed and case
+folded, plus the category list and the LLM model name, so the same passport
+scan or LOR template is only ever classified once per model and category set.
+Storage is pluggable: ``MemoryBackend`` (LRU + TTL, per process) and
+``SQLiteBackend`` (LRU + TTL, shared across processes and restarts).
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from classification import CATEGORIES, record_fallback_labels
+
+CLASSIFICATION_CACHE_BACKEND = os.environ.get("CLASSIFICATION_CACHE_BACKEND", "sqlite")
+CLASSIFICATION_CACHE_PATH = os.environ.get("CLASSIFICATION_CACHE_PATH", ".classification_cache.sqlite3")
+CLASSIFICATION_CACHE_MAX_ENTRIES = int(os.environ.get("CLASSIFICATION_CACHE_MAX_ENTRIES", 100000))
+CLASSIFICATION_CACHE_TTL_SECONDS = int(os.environ.get("CLASSIFICATION_CACHE_TTL_SECONDS", 30 * 24 * 3600))
+
+
+def normalize_page_text(markdown: str) -> str:
+    """Collapse whitespace and fold case so trivially different OCR output matches."""
+    return " ".join(markdown.split()).casefold()
+
+
+def classification_cache_key(markdown: str, categories, model: str) -> str:
+    """Return the cache key for one page classified by ``model`` into ``categories``."""
+    digest = hashlib.sha256()
+    digest.update(model.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(json.dumps(list(categories)).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(normalize_page_text(markdown).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class MemoryBackend:
+    """In-process LRU cache with a time-to-live."""
+
+    def __init__(self, max_entries=CLASSIFICATION_CACHE_MAX_ENTRIES, ttl_seconds=CLASSIFICATION_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            category, created = entry
+            if self.ttl_seconds and time.time() - created > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return category
+
+    def set(self, key: str, category: str) -> None:
+        with self._lock:
+            self._entries[key] = (category, time.time())
+            self._entries.move_to_end(key)
+            while self.max_entries and len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SQLiteBackend:
+    """SQLite-backed LRU cache with a time-to-live."""
+
+    def __init__(self, path=CLASSIFICATION_CACHE_PATH, max_entries=CLASSIFICATION_CACHE_MAX_ENTRIES,
+                 ttl_seconds=CLASSIFICATION_CACHE_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS page_classification ("
+                " key TEXT PRIMARY KEY, category TEXT NOT NULL,"
+                " created REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS page_classification_last_used"
+                " ON page_classification (last_used)"
+            )
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT category, created FROM page_classification WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            category, created = row
+            if self.ttl_seconds and now - created > self.ttl_seconds:
+                self._conn.execute("DELETE FROM page_classification WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE page_classification SET last_used = ? WHERE key = ?", (now, key))
+            return category
+
+    def set(self, key: str, category: str) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO page_classification (key, category, created, last_used)"
+                " VALUES (?, ?, ?, ?)",
+                (key, category, now, now),
+            )
+            if self.ttl_seconds:
+                self._conn.execute(
+                    "DELETE FROM page_classification WHERE created < ?", (now - self.ttl_seconds,)
+                )
+            if self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM page_classification WHERE key IN ("
+                    " SELECT key FROM page_classification ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+
+
+class ClassificationCache:
+    """Per-page classification cache on top of a ``MemoryBackend`` or ``SQLiteBackend``."""
+
+    def __init__(self, backend, model: str, categories=CATEGORIES):
+        self.backend = backend
+        self.model = model
+        self.categories = list(categories)
+
+    def _key(self, markdown: str) -> str:
+        return classification_cache_key(markdown, self.categories, self.model)
+
+    def classify(self, llm, page_data: dict, classify) -> dict:
+        """
+        Classify pages, sending only cache misses to ``classify``.
+
+        Args:
+            llm: LangChain chat model, passed through to ``classify``
+            page_data: ``{page_index: {"markdown": ...}}``
+            classify: ``function(llm, page_data) -> {category: [pages]}`` for the misses
+
+        Returns:
+            ``{category: [pages]}`` for all pages
+        """
+        keys = {page_num: self._key(page["markdown"]) for page_num, page in page_data.items()}
+        categories = {}
+        misses = {}
+        for page_num in sorted(page_data):
+            category = self.backend.get(keys[page_num])
+            if category is None:
+                misses[page_num] = page_data[page_num]
+            else:
+                categories.setdefault(category, []).append(page_num)
+
+        print(f"Classification cache: {len(page_data) - len(misses)} hits, {len(misses)} misses")
+        if not misses:
+            return categories
+
+        with record_fallback_labels() as fallback:
+            classified = classify(llm, misses)
+        for category, pages in classified.items():
+            for page_num in pages:
+                # "unknown" for want of an answer would otherwise stick for the whole TTL
+                if page_num in misses and not (category == "unknown" and page_num in fallback):
+                    self.backend.set(keys[page_num], category)
+                categories.setdefault(category, []).append(page_num)
+        for pages in categories.values():
+            pages.sort()
+        return categories
+
+
+def make_classification_cache(model: str, backend=CLASSIFICATION_CACHE_BACKEND):
+    """Build the cache configured by ``CLASSIFICATION_CACHE_BACKEND``, or None if disabled."""
+    if backend == "sqlite":
+        return ClassificationCache(SQLiteBackend(), model)
+    if backend == "memory":
+        return ClassificationCache(MemoryBackend(), model)
+    return None
@@ -0,0 +1,45 @@
+"""
+Per-run document state passed explicitly through OCR, classification and splitting.
+
+Each processed upload gets its own ``DocumentState`` instead of sharing a
+module-level page dict, so concurrent sessions never see each other's pages
+and prompt size is bounded by the document being processed.
+"""
+from dataclasses import dataclass, field
+
+
+@dataclass(slots=True)
+class PageState:
+    """OCR text of one page plus references to its images (loaded on demand)."""
+    index: int
+    markdown: str
+    image_ids: tuple = ()
+
+
+@dataclass(slots=True)
+class DocumentState:
+    """Everything one pipeline run knows about one uploaded PDF."""
+    file_name: str
+    pdf_bytes: bytes
+    pages: list = field(default_factory=list)
+
+    @classmethod
+    def from_ocr_response(cls, file_name, pdf_bytes, ocr_response):
+        """Build the state from an ``OCRResponse``, keeping only image ids, not payloads."""
+        pages = [
+            PageState(
+                index=page.index,
+                markdown=page.markdown,
+                image_ids=tuple(img.id for img in page.images),
+            )
+            for page in ocr_response.pages
+        ]
+        return cls(file_name=file_name, pdf_bytes=pdf_bytes, pages=pages)
+
+    @property
+    def page_count(self) -> int:
+        return len(self.pages)
+
+    def page_data(self) -> dict:
+        """Return ``{page_index: {"markdown": ...}}``, the shape the classifiers take."""
+        return {page.index: {"markdown": page.markdown} for page in self.pages}
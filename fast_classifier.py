@@ -0,0 +1,338 @@
+"""
+Local fast-path page classifier that runs before Gemini.
+
+Pages that are trivially identifiable (Aadhaar cards, passports, English test
+and GRE/GMAT score reports) are labelled by a keyword/regex rule index, and
+optionally by a small TF-IDF nearest-centroid model trained on labelled pages.
+Keywords alone are not enough: a label also needs the document's own evidence
+(a passport MRZ line, a score report's registration or ID number, the Aadhaar
+card layout), and pages that read like an SOP, a resume or a form always go
+to the LLM, since those mention test names and ID numbers too. Only the pages
+the local classifier is confident about skip the LLM.
+Everything here is pure Python and runs offline on CPU.
+
+Train a TF-IDF model from JSON lines of ``{"markdown": ..., "category": ...}``:
+    python -m fast_classifier train labelled_pages.jsonl fast_classifier_model.json
+"""
+import json
+import math
+import os
+import re
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+from page_features import PROMPT_COMPACTION, compact_page_data
+from windowed_classifier import classify_windowed, estimate_tokens
+
+FAST_CLASSIFIER_ENABLED = os.environ.get("FAST_CLASSIFIER_ENABLED", "1") == "1"
+FAST_CLASSIFIER_MODEL = os.environ.get("FAST_CLASSIFIER_MODEL", "fast_classifier_model.json")
+RULE_MIN_SCORE = 3.0
+RULE_MIN_MARGIN = 2.0
+TFIDF_MIN_SIMILARITY = 0.5
+TFIDF_MIN_MARGIN = 0.15
+
+# (pattern, weight) per category; a page is labelled when its best category
+# scores at least RULE_MIN_SCORE, beats the runner-up by RULE_MIN_MARGIN and
+# has the category's EVIDENCE
+RULES = {
+    "aadhaar-card": [
+        (r"\baa?dhaa?r\b", 2.0),
+        (r"unique identification authority of india", 2.0),
+        (r"\buidai\b", 1.5),
+        (r"\b\d{4} \d{4} \d{4}\b", 1.5),
+        (r"\bvid\s*:?\s*\d{4} \d{4} \d{4} \d{4}\b", 1.0),
+        (r"mera aadhaar,? meri pehchan", 2.0),
+    ],
+    "passport": [
+        (r"^p<[a-z]{3}[a-z<]+", 3.0),
+        (r"\bpassport no\.?\b", 1.5),
+        (r"republic of india", 1.0),
+        (r"\bdate of expiry\b", 1.0),
+        (r"\bplace of issue\b", 1.0),
+        (r"\bnationality\b", 0.5),
+    ],
+    "english-test-toefl": [
+        (r"\btoefl\b", 2.0),
+        (r"test of english as a foreign language", 2.0),
+        (r"\bets\b", 0.5),
+        (r"\b(reading|listening|speaking|writing)\b.*\b\d{1,2}\b", 0.5),
+    ],
+    "english-test-ielts": [
+        (r"\bielts\b", 2.0),
+        (r"international english language testing system", 2.0),
+        (r"\btest report form\b", 1.5),
+        (r"\boverall band score\b", 1.5),
+    ],
+    "english-test-pte": [
+        (r"pearson test of english", 2.5),
+        (r"\bpte academic\b", 2.5),
+        (r"\bscore report\b", 0.5),
+    ],
+    "english-test-duolingo": [
+        (r"\bduolingo english test\b", 3.0),
+        (r"\bduolingo\b", 1.5),
+    ],
+    "proficiency-test-gre": [
+        (r"\bgre\b", 1.5),
+        (r"graduate record examinations?", 2.0),
+        (r"\bverbal reasoning\b", 1.0),
+        (r"\bquantitative reasoning\b", 1.0),
+        (r"\banalytical writing\b", 1.0),
+    ],
+    "proficiency-test-gmat": [
+        (r"\bgmat\b", 2.0),
+        (r"graduate management admission", 2.0),
+        (r"\bintegrated reasoning\b", 1.0),
+        (r"\bdata insights\b", 1.0),
+    ],
+}
+
+# Score report identifiers: registration/appointment numbers, TRF numbers, certificate IDs
+_SCORE_REPORT_ID = (r"\b(registration|appointment|candidate|test taker|trf|certificate|score report)"
+                    r"\s*(id|number|no\.?|code)\s*:?\s*(?=[a-z-]*\d)[a-z0-9-]{6,}")
+
+# Patterns a page must all match before it is labelled locally with the category;
+# the keywords of RULES also appear on pages that merely mention the document
+EVIDENCE = {
+    # The card prints the number on a line of its own under the issuer's name
+    "aadhaar-card": [
+        r"unique identification authority of india|\buidai\b|government of india",
+        r"^\W*\d{4} \d{4} \d{4}\W*$",
+    ],
+    # Either line of the machine readable zone
+    "passport": [r"^p<[a-z]{3}[a-z<]+$|^[a-z0-9<]{9}\d[a-z]{3}\d{6}\d[mf<]\d{6}"],
+    "english-test-toefl": [_SCORE_REPORT_ID],
+    "english-test-ielts": [_SCORE_REPORT_ID],
+    "english-test-pte": [_SCORE_REPORT_ID],
+    "english-test-duolingo": [_SCORE_REPORT_ID],
+    "proficiency-test-gre": [_SCORE_REPORT_ID],
+    "proficiency-test-gmat": [_SCORE_REPORT_ID],
+}
+
+# Pages matching any of these are left to the LLM whatever the rules score
+NEGATIVE_CUES = [
+    # Statements of purpose, personal statements and letters are written in the first person
+    r"\bstatement of purpose\b|\bpersonal statement\b",
+    r"\bi (am|was|have|had|hope|want|wish|believe|scored|took|wrote)\b",
+    # Resume section headings
+    r"^\W*(curriculum vitae|r[eé]sum[eé]|work experience|professional experience|education|skills|projects)\W*$",
+    # Application and registration forms
+    r"\b(application|registration|enrolment|enrollment|admission|declaration) form\b",
+    r"\bfor office use only\b|\bsignature of (the )?(applicant|candidate|student|parent)\b",
+    r"_{5,}|\[ \]|☐",
+]
+
+_COMPILED_RULES = {
+    category: [(re.compile(pattern, re.IGNORECASE | re.MULTILINE), weight) for pattern, weight in patterns]
+    for category, patterns in RULES.items()
+}
+_COMPILED_EVIDENCE = {
+    category: [re.compile(pattern, re.IGNORECASE | re.MULTILINE) for pattern in patterns]
+    for category, patterns in EVIDENCE.items()
+}
+_COMPILED_NEGATIVE_CUES = [re.compile(pattern, re.IGNORECASE | re.MULTILINE) for pattern in NEGATIVE_CUES]
+_TOKEN_RE = re.compile(r"[a-z][a-z0-9]+")
+
+
+def rule_scores(markdown: str) -> dict:
+    """Return ``{category: score}`` for every category with at least one matching rule."""
+    scores = {}
+    for category, patterns in _COMPILED_RULES.items():
+        score = sum(weight for pattern, weight in patterns if pattern.search(markdown))
+        if score:
+            scores[category] = score
+    return scores
+
+
+def has_evidence(category: str, markdown: str) -> bool:
+    """Whether ``markdown`` carries the evidence ``EVIDENCE`` requires for ``category`` (if any)."""
+    return all(pattern.search(markdown) for pattern in _COMPILED_EVIDENCE.get(category, []))
+
+
+def has_negative_cue(markdown: str) -> bool:
+    """Whether the page reads like an SOP, a resume or a form, which only the LLM labels."""
+    return any(pattern.search(markdown) for pattern in _COMPILED_NEGATIVE_CUES)
+
+
+def local_label(markdown: str, model=None):
+    """The category the fast path is confident about for one page, or None to ask the LLM."""
+    if has_negative_cue(markdown):
+        return None
+    category = _confident(rule_scores(markdown), RULE_MIN_SCORE, RULE_MIN_MARGIN)
+    if category is None and model is not None:
+        category = _confident(model.similarities(markdown), TFIDF_MIN_SIMILARITY, TFIDF_MIN_MARGIN)
+    if category is None or category == "unknown" or not has_evidence(category, markdown):
+        return None
+    return category
+
+
+def _confident(scores: dict, min_score, min_margin):
+    if not scores:
+        return None
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    best_category, best_score = ranked[0]
+    runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+    if best_score >= min_score and best_score - runner_up >= min_margin:
+        return best_category
+    return None
+
+
+def _tokenize(text: str) -> list:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class TfidfCentroidModel:
+    """Nearest-centroid classifier over TF-IDF vectors of page markdown."""
+
+    def __init__(self, idf: dict, centroids: dict):
+        self.idf = idf
+        self.centroids = centroids
+
+    @classmethod
+    def train(cls, samples):
+        """Train from an iterable of ``(markdown, category)`` pairs."""
+        samples = [(Counter(_tokenize(markdown)), category) for markdown, category in samples]
+        document_frequency = Counter()
+        for counts, _ in samples:
+            document_frequency.update(counts.keys())
+        idf = {term: math.log((1 + len(samples)) / (1 + df)) + 1 for term, df in document_frequency.items()}
+
+        model = cls(idf, {})
+        sums = {}
+        for counts, category in samples:
+            centroid = sums.setdefault(category, Counter())
+            centroid.update(model._vector(counts))
+        model.centroids = {category: _normalize(vector) for category, vector in sums.items()}
+        return model
+
+    def _vector(self, counts: Counter) -> dict:
+        return _normalize({term: tf * self.idf[term] for term, tf in counts.items() if term in self.idf})
+
+    def similarities(self, markdown: str) -> dict:
+        """Return cosine similarity of ``markdown`` to every category centroid."""
+        vector = self._vector(Counter(_tokenize(markdown)))
+        return {
+            category: sum(weight * centroid.get(term, 0.0) for term, weight in vector.items())
+            for category, centroid in self.centroids.items()
+        }
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"idf": self.idf, "centroids": self.centroids}, f)
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["idf"], data["centroids"])
+
+
+def _normalize(vector: dict) -> dict:
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    if not norm:
+        return dict(vector)
+    return {term: weight / norm for term, weight in vector.items()}
+
+
+def load_default_model():
+    """Load the TF-IDF model from ``FAST_CLASSIFIER_MODEL`` if it exists."""
+    if FAST_CLASSIFIER_MODEL and os.path.exists(FAST_CLASSIFIER_MODEL):
+        return TfidfCentroidModel.load(FAST_CLASSIFIER_MODEL)
+    return None
+
+
+def pre_classify(page_data: dict, model=None):
+    """
+    Label the pages the local classifier is confident about.
+
+    Args:
+        page_data: ``{page_index: {"markdown": ...}}``
+        model: Optional ``TfidfCentroidModel`` consulted when no rule is confident
+
+    Returns:
+        ``(labels, remaining)``: ``{page_index: category}`` for confident pages and
+        the list of page indices that still need the LLM
+    """
+    labels = {}
+    remaining = []
+    for page_num in sorted(page_data):
+        category = local_label(page_data[page_num]["markdown"], model)
+        if category is None:
+            remaining.append(page_num)
+        else:
+            labels[page_num] = category
+    return labels, remaining
+
+
+@dataclass
+class FastPathReport:
+    """How much LLM work the fast path avoided for one document."""
+    pages_total: int
+    pages_local: int
+    tokens_saved: int
+    seconds_saved: float | None
+
+    def summary(self) -> str:
+        seconds = "n/a" if self.seconds_saved is None else f"~{self.seconds_saved:.1f}s"
+        return (f"Local classifier labelled {self.pages_local}/{self.pages_total} pages, "
+                f"saving ~{self.tokens_saved} LLM tokens and {seconds}")
+
+
+def classify_with_fast_path(llm, page_data: dict, model=None, llm_classify=classify_windowed, on_label=None):
+    """
+    Classify pages locally where possible and send only the rest to the LLM.
+
+    Args:
+        llm: LangChain chat model
+        page_data: ``{page_index: {"markdown": ...}}``
+        model: Optional ``TfidfCentroidModel``
+        llm_classify: ``function(llm, page_data, on_label=None) -> {category: [pages]}`` for the rest
+        on_label: Optional ``callback(page_index, category)``; local labels are reported
+            first, then the LLM's as they arrive
+
+    Returns:
+        ``({category: [pages]}, FastPathReport)``
+    """
+    labels, remaining = pre_classify(page_data, model=model)
+    if on_label is not None:
+        for page_num, category in labels.items():
+            on_label(page_num, category)
+    # Count tokens as the LLM would have seen them
+    prompt_data = compact_page_data(page_data) if PROMPT_COMPACTION else page_data
+    tokens_saved = sum(estimate_tokens(repr({page_num: prompt_data[page_num]})) for page_num in labels)
+
+    categories = {}
+    seconds_saved = None
+    if remaining:
+        remaining_data = {page_num: page_data[page_num] for page_num in remaining}
+        started = time.perf_counter()
+        categories = llm_classify(llm, remaining_data, on_label=on_label)
+        llm_seconds = time.perf_counter() - started
+        # Extrapolate from what this document's LLM calls cost per token
+        llm_tokens = estimate_tokens(repr({page_num: prompt_data[page_num] for page_num in remaining}))
+        seconds_saved = llm_seconds * tokens_saved / llm_tokens
+
+    for page_num, category in labels.items():
+        categories.setdefault(category, []).append(page_num)
+    for pages in categories.values():
+        pages.sort()
+
+    report = FastPathReport(len(page_data), len(labels), tokens_saved, seconds_saved)
+    print(report.summary())
+    return categories, report
+
+
+def _train_main(samples_path, model_path):
+    with open(samples_path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    samples = [(record["markdown"], record["category"]) for record in records]
+    TfidfCentroidModel.train(samples).save(model_path)
+    print(f"Trained TF-IDF model on {len(samples)} pages -> {model_path}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] != "train":
+        sys.exit("usage: python -m fast_classifier train labelled_pages.jsonl model.json")
+    _train_main(sys.argv[2], sys.argv[3])
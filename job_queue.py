@@ -0,0 +1,326 @@
+"""
+Local background jobs for long documents: OCR -> classify -> split off the
+Streamlit script thread.
+
+Jobs are rows of a SQLite table (``JOBS_DIR/jobs.sqlite3``) and run on a pool
+of ``JOB_WORKERS`` threads owned by the ``JobQueue``, which lives as long as
+the server process, so a browser refresh doesn't stop them. Each job gets its
+own directory ``JOBS_DIR/<job_id>/``:
+
+    input.pdf                    the upload
+    ocr.json.gz                  OCR response (for previews and reloading the result)
+    categories.json              ``{category: [pages]}``
+    split/<category>.pdf         split PDFs
+    <name>_categorized.zip       ZIP of the split PDFs
+
+The table records each job's status and per-stage progress (chunks OCR'd,
+pages labelled, categories written), which the UI polls. Jobs still queued or
+running when the process stopped are restarted from ``input.pdf`` the next
+time a ``JobQueue`` opens the table. Jobs finished more than
+``JOBS_MAX_AGE_SECONDS`` ago are deleted with their directories, when the
+table is opened and then at most every ``JOBS_CLEANUP_INTERVAL_SECONDS`` as
+jobs are submitted.
+"""
+import gzip
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from mistralai.models import OCRResponse
+
+from document_state import DocumentState
+from pdf_splitter import directory_sink, split_pdf, tee_sink
+from results_store import DocumentResult
+from tracing import log_event, trace
+from zip_export import zip_sink
+
+JOBS_DIR = os.environ.get("JOBS_DIR", ".jobs")
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 4))
+JOBS_MAX_AGE_SECONDS = int(os.environ.get("JOBS_MAX_AGE_SECONDS", 7 * 24 * 3600))
+JOBS_CLEANUP_INTERVAL_SECONDS = float(os.environ.get("JOBS_CLEANUP_INTERVAL_SECONDS", 60))
+# Progress is written at most this often per job (stage changes are always written)
+JOB_PROGRESS_INTERVAL_SECONDS = float(os.environ.get("JOB_PROGRESS_INTERVAL_SECONDS", 0.5))
+
+STAGES = ("ocr", "classify", "split")
+FINISHED = ("done", "failed")
+
+
+@dataclass(slots=True)
+class Job:
+    """One row of the job table."""
+    job_id: str
+    file_name: str
+    file_key: str
+    status: str
+    stage: str = None
+    stage_done: int = 0
+    stage_total: int = 0
+    pages: int = None
+    error: str = None
+    created: float = None
+    started: float = None
+    finished_at: float = None
+    timings: dict = field(default_factory=dict)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    @property
+    def progress(self) -> float:
+        """Overall progress in [0, 1], each stage counting for an equal share."""
+        if self.status == "done":
+            return 1.0
+        if self.stage not in STAGES:
+            return 0.0
+        stage_share = self.stage_done / self.stage_total if self.stage_total else 0.0
+        return (STAGES.index(self.stage) + stage_share) / len(STAGES)
+
+    def describe(self) -> str:
+        if self.status == "queued":
+            return f"{self.file_name}: queued"
+        if self.status == "failed":
+            return f"{self.file_name}: failed ({self.error})"
+        if self.status == "done":
+            return f"{self.file_name}: done, {self.pages} pages in {sum(self.timings.values()):.1f}s"
+        if self.stage not in STAGES:
+            return f"{self.file_name}: starting"
+        units = {"ocr": "chunks", "classify": "pages labelled", "split": "categories written"}[self.stage]
+        return f"{self.file_name}: {self.stage} {self.stage_done}/{self.stage_total or '?'} {units}"
+
+
+class JobQueue:
+    """SQLite job table plus the worker pool running its jobs."""
+
+    def __init__(self, ocr_fn, classify_fn, jobs_dir=JOBS_DIR, workers=JOB_WORKERS,
+                 max_age_seconds=JOBS_MAX_AGE_SECONDS):
+        """
+        Args:
+            ocr_fn: ``function(pdf_bytes, file_name, on_chunk=...) -> OCRResponse``,
+                e.g. a partial of ``pipeline.process_pdf``
+            classify_fn: ``function(document, on_label=...) -> {category: [pages]}``,
+                e.g. a partial of ``pipeline.categorize_documents``
+            jobs_dir: Directory holding the job table and the job directories
+            workers: Jobs run at once
+            max_age_seconds: Jobs finished longer ago than this are deleted (0 keeps them)
+        """
+        self.ocr_fn = ocr_fn
+        self.classify_fn = classify_fn
+        self.jobs_dir = jobs_dir
+        self.max_age_seconds = max_age_seconds
+        os.makedirs(jobs_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._last_cleanup = 0.0
+        self._conn = sqlite3.connect(os.path.join(jobs_dir, "jobs.sqlite3"), check_same_thread=False, timeout=30)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " job_id TEXT PRIMARY KEY, file_name TEXT NOT NULL, file_key TEXT NOT NULL,"
+                " status TEXT NOT NULL, stage TEXT, stage_done INTEGER NOT NULL DEFAULT 0,"
+                " stage_total INTEGER NOT NULL DEFAULT 0, pages INTEGER, error TEXT,"
+                " created REAL NOT NULL, started REAL, finished_at REAL, timings TEXT NOT NULL DEFAULT '{}')"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_file_key ON jobs (file_key, created)")
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="job")
+        self.cleanup()
+        self._resume()
+
+    def job_dir(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, job_id)
+
+    def submit(self, file_name: str, pdf_bytes: bytes, file_key: str) -> str:
+        """Queue a document; returns its job id."""
+        # The queue lives as long as the server, so expired jobs are swept here too
+        if time.monotonic() - self._last_cleanup >= JOBS_CLEANUP_INTERVAL_SECONDS:
+            self.cleanup()
+        job_id = uuid.uuid4().hex
+        os.makedirs(self.job_dir(job_id))
+        with open(os.path.join(self.job_dir(job_id), "input.pdf"), "wb") as f:
+            f.write(pdf_bytes)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, file_name, file_key, status, created) VALUES (?, ?, ?, 'queued', ?)",
+                (job_id, file_name, file_key, time.time()),
+            )
+        self._pool.submit(self._run, job_id)
+        return job_id
+
+    def get(self, job_id: str):
+        """Return the ``Job`` or None."""
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_COLUMNS} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return _job(row) if row else None
+
+    def latest(self, file_key: str):
+        """The most recent job for a file, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM jobs WHERE file_key = ? ORDER BY created DESC LIMIT 1", (file_key,)
+            ).fetchone()
+        return _job(row) if row else None
+
+    def recent(self, limit=20) -> list:
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {_COLUMNS} FROM jobs ORDER BY created DESC LIMIT ?", (limit,)).fetchall()
+        return [_job(row) for row in rows]
+
+    def load_result(self, job_id: str) -> DocumentResult:
+        """Read a finished job's artifacts back as a ``DocumentResult``."""
+        job = self.get(job_id)
+        job_dir = self.job_dir(job_id)
+        with open(os.path.join(job_dir, "input.pdf"), "rb") as f:
+            pdf_bytes = f.read()
+        with gzip.open(os.path.join(job_dir, "ocr.json.gz"), "rt", encoding="utf-8") as f:
+            ocr_response = OCRResponse.model_validate_json(f.read())
+        with open(os.path.join(job_dir, "categories.json"), encoding="utf-8") as f:
+            categories = json.load(f)
+        split_pdfs = {}
+        for category, pages in categories.items():
+            path = os.path.join(job_dir, "split", f"{category}.pdf")
+            if pages and os.path.exists(path):
+                with open(path, "rb") as f:
+                    split_pdfs[category] = f.read()
+        zip_path = os.path.join(job_dir, _zip_name(job.file_name))
+        zip_bytes = None
+        if os.path.exists(zip_path):
+            with open(zip_path, "rb") as f:
+                zip_bytes = f.read()
+        return DocumentResult(
+            document=DocumentState.from_ocr_response(job.file_name, pdf_bytes, ocr_response),
+            ocr_response=ocr_response,
+            categories=categories,
+            split_pdfs=split_pdfs,
+            zip_bytes=zip_bytes,
+            timings=job.timings,
+        )
+
+    def cleanup(self) -> None:
+        """Delete jobs finished more than ``max_age_seconds`` ago and their directories."""
+        self._last_cleanup = time.monotonic()
+        if not self.max_age_seconds:
+            return
+        cutoff = time.time() - self.max_age_seconds
+        with self._lock, self._conn:
+            expired = [row[0] for row in self._conn.execute(
+                "SELECT job_id FROM jobs WHERE status IN ('done', 'failed') AND COALESCE(finished_at, created) < ?",
+                (cutoff,)
+            )]
+            self._conn.executemany("DELETE FROM jobs WHERE job_id = ?", [(job_id,) for job_id in expired])
+        for job_id in expired:
+            shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+
+    def shutdown(self, wait=True) -> None:
+        self._pool.shutdown(wait=wait)
+
+    def _resume(self) -> None:
+        # Work interrupted by a restart starts over from its saved input
+        with self._lock, self._conn:
+            pending = [row[0] for row in self._conn.execute(
+                "SELECT job_id FROM jobs WHERE status IN ('queued', 'running') ORDER BY created"
+            )]
+            self._conn.execute("UPDATE jobs SET status = 'queued', stage = NULL WHERE status = 'running'")
+        for job_id in pending:
+            self._pool.submit(self._run, job_id)
+
+    def _update(self, job_id: str, **values) -> None:
+        if "timings" in values:
+            values["timings"] = json.dumps(values["timings"])
+        assignments = ", ".join(f"{column} = ?" for column in values)
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", (*values.values(), job_id))
+
+    def _progress(self, job_id: str):
+        """Return ``callback(done, total)`` recording progress of the current stage, rate-limited."""
+        last_written = 0.0
+
+        def report(done, total):
+            nonlocal last_written
+            now = time.monotonic()
+            if done >= total or now - last_written >= JOB_PROGRESS_INTERVAL_SECONDS:
+                last_written = now
+                self._update(job_id, stage_done=done, stage_total=total)
+
+        return report
+
+    def _start_stage(self, job_id, stage, total=0):
+        self._update(job_id, stage=stage, stage_done=0, stage_total=total)
+        return time.perf_counter()
+
+    def _run(self, job_id: str) -> None:
+        job = self.get(job_id)
+        if job is None or job.status != "queued":
+            return
+        job_dir = self.job_dir(job_id)
+        timings = {}
+        # The stage is set with the status so a running job always has one
+        self._update(job_id, status="running", started=time.time(), stage="ocr", stage_done=0, stage_total=0)
+        try:
+            with trace(job_id):
+                with open(os.path.join(job_dir, "input.pdf"), "rb") as f:
+                    pdf_bytes = f.read()
+
+                started = time.perf_counter()
+                report = self._progress(job_id)
+                ocr_response = self.ocr_fn(pdf_bytes, job.file_name,
+                                           on_chunk=lambda done, total, timing: report(done, total))
+                document = DocumentState.from_ocr_response(job.file_name, pdf_bytes, ocr_response)
+                with gzip.open(os.path.join(job_dir, "ocr.json.gz"), "wt", encoding="utf-8") as f:
+                    f.write(ocr_response.model_dump_json(exclude_none=True))
+                timings["ocr"] = time.perf_counter() - started
+
+                started = self._start_stage(job_id, "classify", document.page_count)
+                self._update(job_id, pages=document.page_count)
+                report = self._progress(job_id)
+                labelled = set()
+
+                def on_label(page_num, category):
+                    labelled.add(page_num)
+                    report(len(labelled), document.page_count)
+
+                categories = self.classify_fn(document, on_label=on_label)
+                with open(os.path.join(job_dir, "categories.json"), "w", encoding="utf-8") as f:
+                    json.dump(categories, f)
+                timings["classify"] = time.perf_counter() - started
+
+                non_empty = [category for category, pages in categories.items() if pages]
+                started = self._start_stage(job_id, "split", len(non_empty))
+                report = self._progress(job_id)
+                written = 0
+
+                def open_output(category):
+                    nonlocal written
+                    written += 1
+                    report(written, len(non_empty))
+                    return sink(category)
+
+                if non_empty:
+                    with zipfile.ZipFile(os.path.join(job_dir, _zip_name(job.file_name)), "w") as zip_file:
+                        sink = tee_sink(directory_sink(os.path.join(job_dir, "split")), zip_sink(zip_file))
+                        split_pdf(categories, pdf_bytes, open_output)
+                timings["split"] = time.perf_counter() - started
+            self._update(job_id, status="done", finished_at=time.time(), timings=timings)
+        except Exception as e:
+            log_event("job_failed", job_id=job_id, file_name=job.file_name, error=f"{type(e).__name__}: {e}")
+            self._update(job_id, status="failed", error=f"{type(e).__name__}: {e}", finished_at=time.time(),
+                         timings=timings)
+
+
+_COLUMNS = ("job_id, file_name, file_key, status, stage, stage_done, stage_total, pages, error,"
+            " created, started, finished_at, timings")
+
+
+def _job(row) -> Job:
+    *values, timings = row
+    return Job(*values, timings=json.loads(timings))
+
+
+def _zip_name(file_name: str) -> str:
+    return f"{os.path.splitext(file_name)[0]}_categorized.zip"
@@ -0,0 +1,126 @@
+"""
+Mistral OCR calls shared by the Streamlit app and headless tools.
+
+The Mistral client is passed in explicitly so these helpers can be driven by a
+local fake client as well as the real one.
+"""
+from io import BytesIO
+
+from mistralai import DocumentURLChunk
+from mistralai.models import OCRResponse, OCRUsageInfo
+from PyPDF2 import PdfReader, PdfWriter
+
+from ocr_cache import pdf_cache_key
+from page_cache import page_fingerprint
+
+OCR_MODEL = "mistral-ocr-latest"
+
+
+def pages_pdf(pdf_reader, page_nums) -> bytes:
+    """Copy the given pages of a ``PdfReader`` into a new PDF, in that order."""
+    pdf_writer = PdfWriter()
+    for page_num in page_nums:
+        pdf_writer.add_page(pdf_reader.pages[page_num])
+    output_buffer = BytesIO()
+    pdf_writer.write(output_buffer)
+    return output_buffer.getvalue()
+
+
+def run_ocr(client, pdf_bytes, file_name, model=OCR_MODEL, include_images=True):
+    """Upload a PDF to Mistral and run OCR on it, with or without base64 page images."""
+    uploaded_file = client.files.upload(
+        file={"file_name": file_name, "content": pdf_bytes},
+        purpose="ocr",
+    )
+    signed_url = client.files.get_signed_url(file_id=uploaded_file.id, expiry=1)
+    pdf_response = client.ocr.process(
+        document=DocumentURLChunk(document_url=signed_url.url),
+        model=model,
+        include_image_base64=include_images,
+    )
+
+    if isinstance(pdf_response, dict):
+        pdf_response = OCRResponse(**pdf_response)
+
+    return pdf_response
+
+
+def process_pdf(client, pdf_bytes, file_name, cache=None, model=OCR_MODEL, runner=run_ocr,
+                include_images=True):
+    """
+    Run OCR on a PDF, serving repeat documents from ``cache``.
+
+    Args:
+        client: Mistral client (or a compatible fake)
+        pdf_bytes: Raw PDF bytes
+        file_name: Name used for the upload
+        cache: Optional ``OCRCache``; checked before anything is uploaded
+        model: OCR model name, part of the cache key
+        runner: Function doing the actual OCR, e.g. ``chunked_ocr.run_ocr_chunked``
+        include_images: Whether to fetch base64 page images; text-only results are
+            much smaller and are cached separately
+
+    Returns:
+        OCRResponse for the whole document
+    """
+    if cache is None:
+        return runner(client, pdf_bytes, file_name, model=model, include_images=include_images)
+
+    key = pdf_cache_key(pdf_bytes, model, include_images=include_images)
+    cached = cache.get(key)
+    if cached is not None:
+        print(f"OCR cache hit for {file_name} ({key[:12]})")
+        return cached
+
+    pdf_response = runner(client, pdf_bytes, file_name, model=model, include_images=include_images)
+    cache.put(key, pdf_response)
+    return pdf_response
+
+
+def process_pdf_by_page(client, pdf_bytes, file_name, page_cache, model=OCR_MODEL, runner=run_ocr,
+                        include_images=True):
+    """
+    Run OCR only on the pages of a PDF that are not already in ``page_cache``.
+
+    Missing pages are copied into a smaller PDF and sent to Mistral in one call;
+    their results are cached and merged with the cached pages.
+
+    Args:
+        client: Mistral client (or a compatible fake)
+        pdf_bytes: Raw PDF bytes
+        file_name: Name used for the upload
+        page_cache: ``PageCache`` holding results of previously seen pages
+        model: OCR model name, part of each page fingerprint
+        runner: Function doing the actual OCR of the missing pages
+        include_images: Whether to fetch base64 page images
+
+    Returns:
+        OCRResponse for the whole document with the original page indices
+    """
+    pdf_reader = PdfReader(BytesIO(pdf_bytes))
+    fingerprints = [page_fingerprint(page, model, include_images=include_images) for page in pdf_reader.pages]
+
+    pages = {}
+    missing = []
+    for page_num, fingerprint in enumerate(fingerprints):
+        cached = page_cache.get(fingerprint)
+        if cached is None:
+            missing.append(page_num)
+        else:
+            pages[page_num] = cached.model_copy(update={"index": page_num})
+
+    print(f"Page cache: {len(pages)} hits, {len(missing)} pages to OCR for {file_name}")
+
+    if missing:
+        partial_response = runner(client, pages_pdf(pdf_reader, missing), file_name, model=model,
+                                  include_images=include_images)
+        for page in partial_response.pages:
+            page_num = missing[page.index]
+            page_cache.put(fingerprints[page_num], page)
+            pages[page_num] = page.model_copy(update={"index": page_num})
+
+    return OCRResponse(
+        pages=[pages[page_num] for page_num in sorted(pages)],
+        model=model,
+        usage_info=OCRUsageInfo(pages_processed=len(missing), doc_size_bytes=len(pdf_bytes)),
+    )
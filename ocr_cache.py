@@ -0,0 +1,127 @@
+"""
+On-disk OCR result cache keyed by a SHA-256 of the PDF bytes and the OCR model.
+
+Entries are stored as gzip-compressed JSON, one file per document, and are
+evicted when they get older than ``max_age_seconds`` or when the cache grows
+past ``max_bytes`` (least recently used entries go first).
+"""
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from mistralai.models import OCRResponse
+
+DEFAULT_CACHE_DIR = os.environ.get("OCR_CACHE_DIR", ".ocr_cache")
+DEFAULT_MAX_BYTES = int(os.environ.get("OCR_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+DEFAULT_MAX_AGE_SECONDS = int(os.environ.get("OCR_CACHE_MAX_AGE_SECONDS", 7 * 24 * 3600))
+
+ENTRY_SUFFIX = ".json.gz"
+
+
+def pdf_cache_key(pdf_bytes: bytes, model: str, include_images: bool = True) -> str:
+    """Return the cache key for a PDF processed with the given OCR model."""
+    digest = hashlib.sha256()
+    digest.update(model.encode("utf-8"))
+    digest.update(b"\0" if include_images else b"\0text\0")
+    digest.update(pdf_bytes)
+    return digest.hexdigest()
+
+
+class OCRCache:
+    """Persistent cache of ``OCRResponse`` objects."""
+
+    model_class = OCRResponse
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES,
+                 max_age_seconds=DEFAULT_MAX_AGE_SECONDS):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ENTRY_SUFFIX)
+
+    def get(self, key: str):
+        """Return the cached object for ``key`` or None on a miss."""
+        path = self._path(key)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        if self.max_age_seconds and time.time() - stat.st_mtime > self.max_age_seconds:
+            self._remove(path)
+            return None
+
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Discarding unreadable OCR cache entry {key}: {e}")
+            self._remove(path)
+            return None
+
+        # Bump the access time (keeping mtime as the creation age) so size-based
+        # eviction drops the least recently used entries first
+        os.utime(path, (time.time(), stat.st_mtime))
+        return self.model_class.model_validate(data)
+
+    def put(self, key: str, value) -> None:
+        """Store ``value`` under ``key`` and enforce the size limit."""
+        payload = json.dumps(
+            value.model_dump(mode="json", exclude_none=True),
+            separators=(",", ":"),
+        )
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                f.write(payload.encode("utf-8"))
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self) -> None:
+        """Drop expired entries, then least recently used ones until under ``max_bytes``."""
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(ENTRY_SUFFIX):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if self.max_age_seconds and now - stat.st_mtime > self.max_age_seconds:
+                self._remove(path)
+                continue
+            entries.append((stat.st_atime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        if not self.max_bytes or total <= self.max_bytes:
+            return
+
+        for _, size, path in sorted(entries):
+            self._remove(path)
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self) -> None:
+        """Remove every entry from the cache."""
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(ENTRY_SUFFIX):
+                self._remove(os.path.join(self.cache_dir, name))
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
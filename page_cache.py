@@ -0,0 +1,89 @@
+"""
+Per-page OCR cache so re-submitted bundles only send new or changed pages to OCR.
+
+Pages are fingerprinted from their content stream and the XObjects (scanned
+images, forms) they draw, so the same page keeps its fingerprint when it moves
+to a different position or a different bundle.
+"""
+import hashlib
+import os
+
+from mistralai.models import OCRPageObject
+
+from ocr_cache import DEFAULT_CACHE_DIR, OCRCache
+
+
+def _stream_bytes(obj) -> bytes:
+    """Return the raw (still encoded) data of a PDF stream object."""
+    data = getattr(obj, "_data", None)
+    if data is None:
+        data = obj.get_data()
+    return data if isinstance(data, bytes) else data.encode("latin-1")
+
+
+def _hash_xobjects(digest, resources, seen) -> None:
+    if resources is not None:
+        resources = resources.get_object()
+    if not resources or "/XObject" not in resources:
+        return
+    xobjects = resources["/XObject"].get_object()
+    for name in sorted(xobjects):
+        ref = xobjects[name]
+        xobject = ref.get_object()
+        ref_id = getattr(ref, "idnum", None)
+        if ref_id is not None:
+            if ref_id in seen:
+                continue
+            seen.add(ref_id)
+        digest.update(name.encode("utf-8"))
+        digest.update(_stream_bytes(xobject))
+        # Form XObjects can draw nested images of their own
+        if xobject.get("/Subtype") == "/Form":
+            _hash_xobjects(digest, xobject.get("/Resources"), seen)
+
+
+def page_fingerprint(page, model: str, include_images: bool = True) -> str:
+    """
+    Fingerprint a PyPDF2 page for the page cache.
+
+    Args:
+        page: PyPDF2 ``PageObject``
+        model: OCR model name, part of the fingerprint
+        include_images: Whether the cached result carries base64 images
+
+    Returns:
+        Hex SHA-256 of the page size, content stream and drawn XObjects
+    """
+    digest = hashlib.sha256()
+    digest.update(model.encode("utf-8"))
+    digest.update(b"\0" if include_images else b"\0text\0")
+    _hash_page(digest, page)
+    return digest.hexdigest()
+
+
+def page_content_hash(page) -> str:
+    """Hex SHA-256 of a PyPDF2 page's size, content stream and drawn XObjects, independent of OCR settings."""
+    digest = hashlib.sha256()
+    _hash_page(digest, page)
+    return digest.hexdigest()
+
+
+def _hash_page(digest, page) -> None:
+    digest.update(repr([float(v) for v in page.mediabox]).encode("ascii"))
+    digest.update(str(page.get("/Rotate", 0)).encode("ascii"))
+
+    contents = page.get_contents()
+    if contents is not None:
+        digest.update(contents.get_data())
+
+    resources = page.get("/Resources")
+    _hash_xobjects(digest, resources, set())
+
+
+class PageCache(OCRCache):
+    """Persistent cache of single ``OCRPageObject`` results keyed by page fingerprint."""
+
+    model_class = OCRPageObject
+
+    def __init__(self, cache_dir=os.path.join(DEFAULT_CACHE_DIR, "pages"), **kwargs):
+        super().__init__(cache_dir=cache_dir, **kwargs)
@@ -0,0 +1,147 @@
+"""
+Duplicate pages inside one bundle: OCR and classify each unique page once.
+
+Applicants often include the same marksheet or passport page two or three
+times. Before OCR, pages are grouped by content: the page cache's hash of the
+page size, content stream and drawn images, so only byte-identical copies
+match. Scans are not matched by how they look: same-template sheets (the
+semester 1 to 4 marksheets of one university) are near-identical images with
+different text, and a copy given the wrong page's OCR text would be
+misclassified. The same sheet scanned twice is OCR'd twice and then caught by
+its identical text.
+
+``with_dedup(runner)`` OCRs the first page of each group and copies its
+result to the others. Before classification, ``collapse_duplicate_pages``
+drops pages whose OCR text repeats an earlier page's (at least
+``PAGE_DEDUP_MIN_CHARS`` long, so blank and near-empty pages keep their own
+labels), and ``fan_out`` gives the dropped pages their original's category, so
+the split still receives every page. Both steps return a ``DedupReport``
+naming the collapsed pages.
+"""
+import os
+import time
+from dataclasses import dataclass, field
+from io import BytesIO
+
+from mistralai.models import OCRResponse, OCRUsageInfo
+from PyPDF2 import PdfReader
+
+from ocr import OCR_MODEL, pages_pdf
+from page_cache import page_content_hash
+from tracing import log_event, trace_span
+
+# "1" OCRs and classifies repeated pages once, "0" processes every copy
+PAGE_DEDUP = os.environ.get("PAGE_DEDUP", "1") == "1"
+PAGE_DEDUP_MIN_CHARS = int(os.environ.get("PAGE_DEDUP_MIN_CHARS", 50))
+
+
+@dataclass(slots=True)
+class DedupReport:
+    """Which pages of one document were collapsed onto which."""
+    total_pages: int
+    # Duplicate page -> the earlier page it repeats
+    duplicates: dict = field(default_factory=dict)
+    # Duplicate page -> "content" or "text", how it was matched
+    matches: dict = field(default_factory=dict)
+
+    def groups(self) -> dict:
+        """``{original page: [its duplicates]}``."""
+        groups = {}
+        for page_num, original in sorted(self.duplicates.items()):
+            groups.setdefault(original, []).append(page_num)
+        return groups
+
+    def summary(self) -> str:
+        if not self.duplicates:
+            return f"No duplicate pages among {self.total_pages}"
+        parts = [f"{', '.join(str(page_num) for page_num in copies)} → {original}"
+                 f" ({'/'.join(sorted({self.matches[page_num] for page_num in copies}))})"
+                 for original, copies in self.groups().items()]
+        return f"Collapsed {len(self.duplicates)} of {self.total_pages} pages: {'; '.join(parts)}"
+
+
+def find_duplicates(pdf_reader):
+    """Group the pages of a ``PdfReader`` by content hash."""
+    report = DedupReport(len(pdf_reader.pages))
+    by_content = {}
+    for page_num, page in enumerate(pdf_reader.pages):
+        original = by_content.setdefault(page_content_hash(page), page_num)
+        if original != page_num:
+            report.duplicates[page_num] = original
+            report.matches[page_num] = "content"
+    return report
+
+
+def with_dedup(runner):
+    """
+    Wrap an OCR ``runner`` so byte-identical pages are OCR'd once.
+
+    Args:
+        runner: Function with the ``ocr.run_ocr`` signature doing the actual OCR
+
+    Returns:
+        Runner with the same signature whose responses have a page for every
+        input page; ``usage_info.pages_processed`` counts the unique pages OCR'd
+    """
+    def run(client, pdf_bytes, file_name, model=OCR_MODEL, include_images=True):
+        with trace_span("page_dedup", file_name=file_name) as span:
+            started = time.perf_counter()
+            pdf_reader = PdfReader(BytesIO(pdf_bytes))
+            report = find_duplicates(pdf_reader)
+            span.set(pages=report.total_pages, pages_duplicate=len(report.duplicates),
+                     dedup_seconds=round(time.perf_counter() - started, 3))
+        if not report.duplicates:
+            return runner(client, pdf_bytes, file_name, model=model, include_images=include_images)
+
+        log_event("page_dedup", file_name=file_name, stage="ocr", collapsed=report.groups())
+        unique = [page_num for page_num in range(report.total_pages) if page_num not in report.duplicates]
+        partial_response = runner(client, pages_pdf(pdf_reader, unique), file_name, model=model,
+                                  include_images=include_images)
+        pages = {unique[page.index]: page.model_copy(update={"index": unique[page.index]})
+                 for page in partial_response.pages}
+        for page_num, original in report.duplicates.items():
+            pages[page_num] = pages[original].model_copy(update={"index": page_num})
+        return OCRResponse(
+            pages=[pages[page_num] for page_num in sorted(pages)],
+            model=model,
+            usage_info=OCRUsageInfo(pages_processed=partial_response.usage_info.pages_processed,
+                                    doc_size_bytes=len(pdf_bytes)),
+        )
+    return run
+
+
+def collapse_duplicate_pages(page_data: dict, min_chars=PAGE_DEDUP_MIN_CHARS):
+    """
+    Drop pages whose markdown repeats an earlier page's, before classification.
+
+    Args:
+        page_data: ``{page_index: {"markdown": ...}}``
+        min_chars: Shortest markdown (stripped) a page needs to be collapsed
+
+    Returns:
+        ``(page_data of the unique pages, DedupReport)``
+    """
+    report = DedupReport(len(page_data))
+    first = {}
+    unique = {}
+    for page_num in sorted(page_data):
+        markdown = page_data[page_num]["markdown"]
+        if len(markdown.strip()) >= min_chars and markdown in first:
+            report.duplicates[page_num] = first[markdown]
+            report.matches[page_num] = "text"
+            continue
+        first.setdefault(markdown, page_num)
+        unique[page_num] = page_data[page_num]
+    return unique, report
+
+
+def fan_out(categories: dict, report: DedupReport) -> dict:
+    """Add every collapsed page to its original's category in ``{category: [pages]}``."""
+    if not report.duplicates:
+        return categories
+    category_of = {page_num: category for category, pages in categories.items() for page_num in pages}
+    fanned = {category: list(pages) for category, pages in categories.items()}
+    for page_num, original in report.duplicates.items():
+        if original in category_of:
+            fanned[category_of[original]].append(page_num)
+    return {category: sorted(pages) for category, pages in fanned.items()}
@@ -0,0 +1,112 @@
+"""
+Page feature extraction for compact classification prompts.
+
+OCR markdown carries image links, whole tables and long body text that don't
+help tell a passport from a marksheet, yet every character of it is paid for
+in prompt tokens. ``compact_page`` trims a page to a bounded summary:
+
+* image links and base64 payloads are dropped,
+* tables are reduced to their header row and a row count,
+* headings, the first ``head_lines`` lines and up to ``key_lines`` lines with
+  a key phrase (board, semester, "to whom it may concern", ...) are kept in
+  page order, each cut to ``max_line_chars``,
+* the summary is capped at ``max_chars``.
+
+Offline evaluation on labelled pages: ``python -m benchmarks.eval_prompt_compaction``.
+"""
+import os
+import re
+
+PROMPT_COMPACTION = os.environ.get("PROMPT_COMPACTION", "1") == "1"
+PAGE_FEATURE_HEAD_LINES = int(os.environ.get("PAGE_FEATURE_HEAD_LINES", 8))
+PAGE_FEATURE_KEY_LINES = int(os.environ.get("PAGE_FEATURE_KEY_LINES", 8))
+PAGE_FEATURE_MAX_LINE_CHARS = int(os.environ.get("PAGE_FEATURE_MAX_LINE_CHARS", 160))
+PAGE_FEATURE_MAX_CHARS = int(os.environ.get("PAGE_FEATURE_MAX_CHARS", 1200))
+
+# Phrases that tell the document categories apart; lines containing one are kept
+KEY_PHRASES = [
+    r"secondary school", r"\bclass (x|xii|10|12)\b", r"\b(10|12)th\b", r"\bboard of\b", r"\bcbse\b", r"\bicse\b",
+    r"higher secondary", r"senior school", r"\bpassport\b", r"\bfile number\b", r"\bappointment\b",
+    r"passport seva", r"\backnowledg(e)?ment\b", r"\btoefl\b", r"\bielts\b", r"\bpte\b", r"\bduolingo\b",
+    r"\bgre\b", r"\bgmat\b", r"\bscore report\b", r"\bband score\b", r"\btest taker\b", r"\bprovisional\b",
+    r"\bdegree\b", r"\bbachelor", r"\bmaster", r"\bb\.?\s?tech\b", r"\bm\.?\s?tech\b", r"\bb\.?\s?e\.?\b",
+    r"\bm\.?\s?sc\b", r"\bb\.?\s?sc\b", r"\bmba\b", r"\bconvocation\b", r"\bconferred\b", r"\bsemester\b",
+    r"\byear\s+(i|ii|iii|iv|1|2|3|4)\b", r"\bgrade card\b", r"\bmarks? (sheet|statement|memo)\b",
+    r"\bsgpa\b", r"\bcgpa\b", r"\bresume\b", r"\bcurriculum vitae\b", r"\bwork experience\b",
+    r"\bskills\b", r"\bemployment\b", r"\bexperience (letter|certificate)\b", r"\brelieving\b",
+    r"\bdesignation\b", r"\bwas employed\b", r"\baadhaa?r\b", r"\buidai\b", r"\bgovernment of india\b",
+    r"\brecommend", r"to whom it may concern", r"\bprofessor\b", r"\bmanager\b", r"\bsupervisor\b",
+    r"\bstatement of purpose\b", r"\bpersonal statement\b", r"\bgraduate program\b", r"\bmy goal",
+]
+_KEY_PHRASE_RE = re.compile("|".join(KEY_PHRASES), re.IGNORECASE)
+_IMAGE_LINK_RE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+_TABLE_SEPARATOR_RE = re.compile(r"^\|?\s*:?-{2,}:?\s*(\|\s*:?-{2,}:?\s*)*\|?$")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _clip(line: str, max_line_chars: int) -> str:
+    return line if len(line) <= max_line_chars else line[:max_line_chars].rstrip() + "…"
+
+
+def _content_lines(markdown: str):
+    """Yield ``(line, kind)`` with image links removed and tables collapsed; kind is "heading", "table" or "text"."""
+    table_rows = 0
+    table_header = None
+    for raw_line in _IMAGE_LINK_RE.sub("", markdown).splitlines():
+        line = _WHITESPACE_RE.sub(" ", raw_line).strip()
+        if line.startswith("|"):
+            if table_header is None:
+                table_header = line
+            elif not _TABLE_SEPARATOR_RE.match(line):
+                table_rows += 1
+            continue
+        if table_header is not None:
+            yield f"{table_header} [table: {table_rows} rows]", "table"
+            table_header, table_rows = None, 0
+        if line:
+            yield line, "heading" if line.startswith("#") else "text"
+    if table_header is not None:
+        yield f"{table_header} [table: {table_rows} rows]", "table"
+
+
+def compact_page(markdown: str, head_lines=PAGE_FEATURE_HEAD_LINES, key_lines=PAGE_FEATURE_KEY_LINES,
+                 max_line_chars=PAGE_FEATURE_MAX_LINE_CHARS, max_chars=PAGE_FEATURE_MAX_CHARS) -> str:
+    """
+    Reduce one page of OCR markdown to the lines that matter for classification.
+
+    Args:
+        markdown: OCR markdown of the page
+        head_lines: Leading content lines always kept
+        key_lines: Further lines kept because they contain a key phrase
+        max_line_chars: Each kept line is cut to this length
+        max_chars: Cap on the whole summary
+
+    Returns:
+        The kept lines in page order; "…" marks where lines were left out
+    """
+    kept = []
+    keys_left = key_lines
+    skipped = False
+    for position, (line, kind) in enumerate(_content_lines(markdown)):
+        keep = position < head_lines or kind in ("heading", "table")
+        if not keep and keys_left > 0 and _KEY_PHRASE_RE.search(line):
+            keep = True
+            keys_left -= 1
+        if keep:
+            if skipped:
+                kept.append("…")
+                skipped = False
+            kept.append(_clip(line, max_line_chars))
+        else:
+            skipped = True
+    if skipped:
+        kept.append("…")
+
+    summary = "\n".join(kept)
+    return summary if len(summary) <= max_chars else summary[:max_chars].rstrip() + "…"
+
+
+def compact_page_data(page_data: dict, **options) -> dict:
+    """Return ``page_data`` with every page's markdown replaced by ``compact_page(markdown, **options)``."""
+    return {page_num: {**page, "markdown": compact_page(page["markdown"], **options)}
+            for page_num, page in page_data.items()}
@@ -0,0 +1,260 @@
+"""
+Single-pass PDF splitter.
+
+The source is parsed once. Category outputs are built one at a time, in the
+order their last page appears in the source, each with its pages in the
+requested order, and written to their sink as soon as they are built, so
+finished outputs don't stay in memory. Identical image streams in the source
+(the same scan included twice) are pointed at one copy before any output is
+built, so each output stores them once. Invalid and repeated page numbers are
+reported instead of silently dropped or copied twice.
+
+Outputs go to whatever ``open_output(category)`` returns: a file, a directory
+(``directory_sink``), a ZIP entry (``zip_export.zip_sink``) or memory
+(``split_pdf_to_memory``). ``iter_split_pdf`` hands out the finished writers instead.
+"""
+import os
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from io import BytesIO
+
+from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2.generic import IndirectObject, NameObject, StreamObject
+
+
+@dataclass
+class SplitReport:
+    """What the splitter did with the requested page lists."""
+    total_pages: int
+    pages_written: dict = field(default_factory=dict)
+    out_of_range: dict = field(default_factory=dict)
+    duplicates: dict = field(default_factory=dict)
+    multi_category_pages: dict = field(default_factory=dict)
+    deduplicated_objects: int = 0
+
+    @property
+    def has_issues(self) -> bool:
+        return bool(self.out_of_range or self.duplicates)
+
+
+def plan_split(documentsData: dict, total_pages: int, strict=False):
+    """
+    Validate ``{category: [pages]}`` against the document.
+
+    Args:
+        documentsData: Requested page numbers per category
+        total_pages: Number of pages in the source PDF
+        strict: Raise ``ValueError`` instead of reporting invalid pages
+
+    Returns:
+        ``(plan, report)`` where ``plan`` maps each non-empty category to its valid
+        page numbers in the requested order, repeats dropped
+    """
+    report = SplitReport(total_pages=total_pages)
+    plan = {}
+    owners = {}
+    for category, pages in documentsData.items():
+        seen = set()
+        valid = []
+        for page_num in pages:
+            try:
+                page_num = int(page_num)
+            except (TypeError, ValueError):
+                report.out_of_range.setdefault(category, []).append(page_num)
+                continue
+            if not 0 <= page_num < total_pages:
+                report.out_of_range.setdefault(category, []).append(page_num)
+            elif page_num in seen:
+                report.duplicates.setdefault(category, []).append(page_num)
+            else:
+                seen.add(page_num)
+                valid.append(page_num)
+                owners.setdefault(page_num, []).append(category)
+        if valid:
+            plan[category] = valid
+
+    report.multi_category_pages = {page: cats for page, cats in owners.items() if len(cats) > 1}
+    if strict and report.has_issues:
+        raise ValueError(
+            f"Invalid page numbers for a {total_pages}-page PDF: "
+            f"out of range {report.out_of_range}, duplicated {report.duplicates}"
+        )
+    for category, pages in report.out_of_range.items():
+        print(f"Warning: {category} lists pages {pages} that do not exist in the PDF (total pages: {total_pages})")
+    for category, pages in report.duplicates.items():
+        print(f"Warning: {category} lists pages {pages} more than once; keeping one copy")
+    return plan, report
+
+
+def _dedupe_images(pdf_reader: PdfReader, page_nums) -> int:
+    """
+    Point the source pages ``page_nums`` at one copy of each identical image
+    stream, before any writer copies them; return the copies no longer referenced.
+
+    Only the reader's in-memory objects change. ``PdfWriter`` copies each source
+    object once per output, so an output then holds a single copy of the image.
+    """
+    canonical = {}
+    replaced = {}
+    removed = 0
+    for page_num in page_nums:
+        resources = pdf_reader.pages[page_num].get("/Resources")
+        if resources is None:
+            continue
+        xobjects = resources.get_object().get("/XObject")
+        if xobjects is None:
+            continue
+        xobjects = xobjects.get_object()
+        for name in list(xobjects):
+            ref = xobjects.raw_get(name)
+            if not isinstance(ref, IndirectObject):
+                continue
+            if ref.idnum in replaced:
+                xobjects[NameObject(name)] = replaced[ref.idnum]
+                continue
+            obj = ref.get_object()
+            if not isinstance(obj, StreamObject) or obj.get("/Subtype") != "/Image":
+                continue
+            # Only streams with the same dictionary (length, size, filters) can be
+            # identical, so data is hashed only once a second one turns up
+            shape = repr(obj)
+            same_shape = canonical.get(shape)
+            if same_shape is None:
+                canonical[shape] = ref
+                continue
+            if isinstance(same_shape, IndirectObject):
+                same_shape = canonical[shape] = {same_shape.get_object().hash_value(): same_shape}
+            first = same_shape.setdefault(obj.hash_value(), ref)
+            if first.idnum != ref.idnum:
+                xobjects[NameObject(name)] = first
+                replaced[ref.idnum] = first
+                removed += 1
+    return removed
+
+
+class _PositionTrackingWriter:
+    """Adds ``tell()`` to write-only streams such as ZIP entries, which PdfWriter needs."""
+
+    def __init__(self, raw):
+        self._raw = raw
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._raw.write(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+
+def _open_reader(source) -> PdfReader:
+    if isinstance(source, (bytes, bytearray)):
+        source = BytesIO(source)
+    return PdfReader(source)
+
+
+def count_pages(source) -> int:
+    """Number of pages of a PDF given as bytes, a path or a binary file."""
+    return len(_open_reader(source).pages)
+
+
+def _completed_writers(pdf_reader: PdfReader, plan: dict, report: SplitReport, dedupe: bool):
+    """Yield ``(category, PdfWriter)`` in the order each category's last page appears in the source."""
+    if dedupe:
+        report.deduplicated_objects += _dedupe_images(pdf_reader, sorted({page_num for pages in plan.values()
+                                                                          for page_num in pages}))
+    for category in sorted(plan, key=lambda category: max(plan[category])):
+        writer = PdfWriter()
+        for page_num in plan[category]:
+            writer.add_page(pdf_reader.pages[page_num])
+        report.pages_written[category] = len(plan[category])
+        # The caller serialises the writer and lets it go before the next one is built
+        yield category, writer
+
+
+def iter_split_pdf(documentsData: dict, source, strict=False, dedupe=True):
+    """
+    Yield ``(category, PdfWriter)`` for each category as soon as it is complete.
+
+    Same arguments as ``split_pdf``; use this when the caller decides where and
+    when each writer is serialised (e.g. a streamed ZIP download).
+    """
+    pdf_reader = _open_reader(source)
+    plan, report = plan_split(documentsData, len(pdf_reader.pages), strict=strict)
+    yield from _completed_writers(pdf_reader, plan, report, dedupe)
+
+
+def split_pdf(documentsData: dict, source, open_output, strict=False, dedupe=True) -> SplitReport:
+    """
+    Split ``source`` into one PDF per category in a single pass.
+
+    Args:
+        documentsData: ``{category: [page numbers]}`` (0-based, as produced by classification)
+        source: PDF bytes, a path or a binary file object
+        open_output: ``function(category)`` returning a context manager that yields
+            a writable binary stream for that category's PDF
+        strict: Raise ``ValueError`` on out-of-range or duplicated page numbers
+        dedupe: Store identical image streams once per output
+
+    Returns:
+        SplitReport
+    """
+    pdf_reader = _open_reader(source)
+    plan, report = plan_split(documentsData, len(pdf_reader.pages), strict=strict)
+    for category, writer in _completed_writers(pdf_reader, plan, report, dedupe):
+        with open_output(category) as stream:
+            # PdfWriter writes in many small pieces; only wrap streams that can't tell() themselves
+            seekable = getattr(stream, "seekable", None)
+            writer.write(stream if seekable is not None and seekable() else _PositionTrackingWriter(stream))
+        print(f"✅ Created {category}.pdf with {report.pages_written[category]} pages")
+    return report
+
+
+def directory_sink(output_dir: str):
+    """``open_output`` writing ``<output_dir>/<category>.pdf``."""
+    os.makedirs(output_dir, exist_ok=True)
+    return lambda category: open(os.path.join(output_dir, f"{category}.pdf"), "wb")
+
+
+class _TeeOutput:
+    def __init__(self, streams):
+        self._stack = ExitStack()
+        self._streams = streams
+
+    def __enter__(self):
+        self._streams = [self._stack.enter_context(stream) for stream in self._streams]
+        return self
+
+    def __exit__(self, *exc_info):
+        return self._stack.__exit__(*exc_info)
+
+    def write(self, data) -> int:
+        for stream in self._streams:
+            stream.write(data)
+        return len(data)
+
+
+def tee_sink(*sinks):
+    """``open_output`` writing every category to all of ``sinks`` (e.g. a directory and a ZIP)."""
+    return lambda category: _TeeOutput([open_output(category) for open_output in sinks])
+
+
+class _MemoryOutput(BytesIO):
+    def __init__(self, results, category):
+        super().__init__()
+        self._results = results
+        self._category = category
+
+    def close(self):
+        if not self.closed:
+            self._results[self._category] = self.getvalue()
+        super().close()
+
+
+def split_pdf_to_memory(documentsData: dict, source, strict=False):
+    """Split into ``({category: pdf_bytes}, SplitReport)``, categories in request order."""
+    results = {}
+    report = split_pdf(documentsData, source, lambda category: _MemoryOutput(results, category), strict=strict)
+    ordered = {category: results[category] for category in documentsData if category in results}
+    return ordered, report
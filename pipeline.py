@@ -0,0 +1,267 @@
+"""
+Headless OCR -> classify -> split pipeline shared by the Streamlit app and batch tools.
+
+Nothing here touches Streamlit; clients, caches and UI callbacks are passed in.
+Every step runs in a ``tracing`` span recording its time, sizes and token usage.
+"""
+import os
+import re
+from functools import partial
+from io import BytesIO
+
+from mistralai.models import OCRResponse
+from PyPDF2 import PdfReader
+
+import ocr
+from async_services import ASYNC_SERVICES, GeminiService, MistralService
+from chunked_ocr import run_ocr_chunked
+from document_state import DocumentState
+from fast_classifier import FAST_CLASSIFIER_ENABLED, classify_with_fast_path
+from page_dedup import PAGE_DEDUP, collapse_duplicate_pages, fan_out, with_dedup
+from pdf_splitter import split_pdf_to_memory
+from text_layer import TEXT_LAYER_TRIAGE, with_text_layer
+from tracing import log_event, trace_span
+from windowed_classifier import classify_windowed
+from zip_export import write_zip
+
+# "document" caches whole PDFs, "page" re-OCRs only new or changed pages
+OCR_CACHE_MODE = os.environ.get("OCR_CACHE_MODE", "document")
+# "lazy" OCRs text only and fetches page images when the preview asks for them,
+# "eager" always downloads base64 images along with the text
+OCR_IMAGE_MODE = os.environ.get("OCR_IMAGE_MODE", "lazy")
+LLM_MODEL = "gemini-2.5-pro"
+# Markdown image links, ``![alt](target)``
+_IMAGE_LINK_RE = re.compile(r"!\[([^\]]*)\]\(([^)]*)\)")
+
+
+def make_mistral_client(api_key: str):
+    """Build the Mistral client (a pooled ``MistralService`` unless ``ASYNC_SERVICES=0``)."""
+    if ASYNC_SERVICES:
+        return MistralService(api_key)
+    from mistralai import Mistral
+    return Mistral(api_key=api_key)
+
+
+def make_llm(model: str = LLM_MODEL, temperature: float = 0.3):
+    """
+    Build the Gemini chat model, wrapped in a ``GeminiService`` unless ``ASYNC_SERVICES=0``.
+
+    ``langchain_google_vertexai`` takes seconds to import, so it is only
+    imported here, the first time a model is actually needed. Its own retries
+    are off: the Gemini ``ProviderLimiter`` retries and needs to see the 429s.
+    """
+    from langchain_google_vertexai import ChatVertexAI
+    llm = ChatVertexAI(model=model, temperature=temperature, max_retries=0)
+    return GeminiService(llm) if ASYNC_SERVICES else llm
+
+
+def process_pdf(client, pdf_bytes, file_name, ocr_cache=None, page_cache=None,
+                include_images=OCR_IMAGE_MODE == "eager", on_chunk=None):
+    """
+    Process a PDF using OCR, reusing cached results for previously seen PDFs or pages.
+
+    Pages with a usable text layer are answered from it unless ``TEXT_LAYER_TRIAGE=0``,
+    and byte-identical copies of a page are OCR'd once unless ``PAGE_DEDUP=0``; only the rest go to
+    Mistral. OCR requests are paced and retried by the shared
+    Mistral ``ProviderLimiter``.
+
+    Args:
+        client: ``MistralService``, Mistral client or a compatible fake
+        pdf_bytes: Raw PDF bytes
+        file_name: Name used for the upload
+        ocr_cache: ``OCRCache`` used when ``OCR_CACHE_MODE`` is "document"
+        page_cache: ``PageCache`` used when ``OCR_CACHE_MODE`` is "page"
+        include_images: Whether to fetch base64 page images
+        on_chunk: Optional progress ``callback(done, total, ChunkTiming)`` for chunked OCR
+
+    Returns:
+        OCRResponse for the whole document
+    """
+    if isinstance(client, MistralService):
+        # Chunks go through the shared event loop instead of a thread each
+        runner = client.runner(on_chunk)
+    else:
+        runner = partial(run_ocr_chunked, on_chunk=on_chunk)
+    if TEXT_LAYER_TRIAGE:
+        runner = with_text_layer(runner)
+    if PAGE_DEDUP:
+        # Outermost, so only unique pages are triaged and OCR'd
+        runner = with_dedup(runner)
+    with trace_span("process_pdf", file_name=file_name, bytes_in=len(pdf_bytes),
+                    include_images=include_images) as span:
+        if OCR_CACHE_MODE == "page" and page_cache is not None:
+            pdf_response = ocr.process_pdf_by_page(client, pdf_bytes, file_name, page_cache, runner=runner,
+                                                   include_images=include_images)
+        else:
+            pdf_response = ocr.process_pdf(client, pdf_bytes, file_name, cache=ocr_cache, runner=runner,
+                                           include_images=include_images)
+        span.set(pages=len(pdf_response.pages), bytes_out=ocr_payload_bytes(pdf_response),
+                 pages_ocred=pdf_response.usage_info.pages_processed)
+    return pdf_response
+
+
+def fetch_page_images(client, pdf_bytes, file_name, page_nums, ocr_cache=None, page_cache=None) -> dict:
+    """
+    OCR only ``page_nums`` of a PDF with base64 page images, e.g. the pages a preview shows.
+
+    The pages are copied into a smaller PDF that goes through ``process_pdf``, so
+    its caches answer pages (or page ranges) whose images were fetched before.
+
+    Returns:
+        ``{page_index: OCRPageObject}`` with the original page indices
+    """
+    page_nums = list(page_nums)
+    pdf_response = process_pdf(client, ocr.pages_pdf(PdfReader(BytesIO(pdf_bytes)), page_nums), file_name,
+                               ocr_cache=ocr_cache, page_cache=page_cache, include_images=True)
+    return {page_nums[page.index]: page.model_copy(update={"index": page_nums[page.index]})
+            for page in pdf_response.pages}
+
+
+def ocr_payload_bytes(ocr_response: OCRResponse) -> int:
+    """Characters of markdown plus base64 image data in an OCR response."""
+    return sum(
+        len(page.markdown) + sum(len(img.image_base64 or "") for img in page.images)
+        for page in ocr_response.pages
+    )
+
+
+def categorize_documents(llm, document: DocumentState, classification_cache=None,
+                         fast_classifier_model=None, on_report=None, on_label=None) -> dict:
+    """
+    Classify every page of ``document``.
+
+    Pages repeating an earlier page's text are classified once and get its
+    label (unless ``PAGE_DEDUP=0``). Cached pages are answered by
+    ``classification_cache``, obvious pages by the local fast-path classifier, and the rest by the windowed Gemini classifier,
+    whose calls are paced and retried by the shared Gemini ``ProviderLimiter``.
+
+    Args:
+        llm: LangChain chat model
+        document: The run's ``DocumentState``
+        classification_cache: Optional ``ClassificationCache``
+        fast_classifier_model: Optional TF-IDF model for the fast path
+        on_report: Optional ``callback(FastPathReport)``
+        on_label: Optional ``callback(page_index, category)``, called from this thread
+            as each page's label becomes known (streamed Gemini records included)
+
+    Returns:
+        ``{category: [pages]}``; raises if Gemini returns no usable labels
+    """
+    with trace_span("categorize_documents", file_name=document.file_name, pages=document.page_count) as span:
+        categories = _categorize(llm, document, classification_cache, fast_classifier_model, on_report, on_label)
+        span.set(categories=sum(1 for pages in categories.values() if pages))
+    log_event("categories", file_name=document.file_name,
+              pages={category: pages for category, pages in categories.items() if pages})
+    return categories
+
+
+def _categorize(llm, document, classification_cache, fast_classifier_model, on_report, on_label):
+    reported = {}
+
+    page_data = document.page_data()
+    dedup = None
+    if PAGE_DEDUP:
+        page_data, dedup = collapse_duplicate_pages(page_data)
+        if dedup.duplicates:
+            log_event("page_dedup", file_name=document.file_name, stage="classify", collapsed=dedup.groups())
+    copies = dedup.groups() if dedup is not None else {}
+
+    def label(page_num, category):
+        # Collapsed pages are labelled along with the page they repeat
+        for labelled in (page_num, *copies.get(page_num, ())):
+            if on_label is not None and reported.get(labelled) != category:
+                reported[labelled] = category
+                on_label(labelled, category)
+
+    def classify_uncached(llm, page_data):
+        if FAST_CLASSIFIER_ENABLED:
+            # Obvious pages are labelled locally; the rest go to Gemini
+            categories, report = classify_with_fast_path(llm, page_data, model=fast_classifier_model,
+                                                         on_label=label)
+            if on_report is not None:
+                on_report(report)
+            return categories
+        # Large documents are split into token-budgeted windows classified in parallel
+        return classify_windowed(llm, page_data, on_label=label)
+
+    if classification_cache is not None:
+        # Pages classified before (same text, categories and model) skip the LLM
+        categories = classification_cache.classify(llm, page_data, classify_uncached)
+    else:
+        categories = classify_uncached(llm, page_data)
+    if dedup is not None:
+        categories = fan_out(categories, dedup)
+    # Cache hits, and any label revised after it was first reported
+    for category, pages in categories.items():
+        for page_num in pages:
+            label(page_num, category)
+    return categories
+
+
+def replace_images_in_markdown(markdown_str: str, images_dict: dict) -> str:
+    """
+    Inline images into the ``![id](id)`` links Mistral OCR writes for them.
+
+    The markdown is scanned once, whatever the number of images, and only the
+    links whose id is in ``images_dict`` are rewritten.
+    """
+    if not images_dict:
+        return markdown_str
+
+    def inline(match):
+        img_name = match.group(1)
+        if img_name == match.group(2) and img_name in images_dict:
+            return f"![{img_name}]({images_dict[img_name]})"
+        return match.group(0)
+
+    return _IMAGE_LINK_RE.sub(inline, markdown_str)
+
+
+def iter_page_markdown(ocr_response: OCRResponse, start: int = 0, stop: int = None):
+    """Yield the markdown of ``ocr_response.pages[start:stop]`` with images inlined, one page at a time."""
+    for page in ocr_response.pages[start:stop]:
+        image_data = {img.id: img.image_base64 for img in page.images if img.image_base64}
+        yield replace_images_in_markdown(page.markdown, image_data)
+
+
+def get_combined_markdown(ocr_response: OCRResponse) -> str:
+    """
+    The whole document as one markdown string, images inlined.
+
+    Previews should page through ``iter_page_markdown`` instead; this builds
+    the full string, base64 images and all.
+    """
+    with trace_span("get_combined_markdown", pages=len(ocr_response.pages)) as span:
+        combined = "\n\n".join(iter_page_markdown(ocr_response))
+        span.set(images=sum(1 for page in ocr_response.pages for img in page.images if img.image_base64),
+                 bytes_out=len(combined))
+    return combined
+
+
+def splitPdfBasedOnCategories(documentsData, file_bytes):
+    """Split a PDF into multiple PDFs based on document categories."""
+    with trace_span("splitPdfBasedOnCategories", bytes_in=len(file_bytes)) as span:
+        # Single pass over the source; see pdf_splitter for streaming to files or ZIP entries
+        split_pdfs, report = split_pdf_to_memory(documentsData, file_bytes)
+        span.set(pages=report.total_pages, files=len(split_pdfs),
+                 bytes_out=sum(len(pdf_bytes) for pdf_bytes in split_pdfs.values()))
+    return split_pdfs
+
+
+def create_zip_from_pdfs(split_pdfs: dict) -> bytes:
+    """
+    Create a ZIP file containing all categorized PDFs.
+
+    Args:
+        split_pdfs: Dictionary with category names as keys and PDF bytes as values
+
+    Returns:
+        ZIP file as bytes
+    """
+    with trace_span("create_zip_from_pdfs", files=len(split_pdfs),
+                    bytes_in=sum(len(pdf_bytes) for pdf_bytes in split_pdfs.values())) as span:
+        zip_buffer = BytesIO()
+        # Already-compressed PDFs are stored rather than deflated again (see zip_export)
+        write_zip(((f"{category}.pdf", pdf_bytes) for category, pdf_bytes in split_pdfs.items()), zip_buffer)
+        span.set(bytes_out=zip_buffer.tell())
+    return zip_buffer.getvalue()
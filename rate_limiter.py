@@ -0,0 +1,336 @@
+"""
+Per-provider rate limiting and retry scheduling for Mistral and Gemini calls.
+
+Each provider gets a ``ProviderLimiter`` with two token buckets, one for
+requests per minute and one for tokens per minute (for Mistral OCR the "tokens"
+are pages). Callers take a slot before each attempt and wait while either
+bucket is empty or the provider is throttled.
+
+Failed attempts are retried with jittered exponential backoff, or after the
+provider's ``Retry-After`` when it sends one. A 429 throttles the whole
+provider until that delay is over and halves its refill rate. Successful calls
+recover 10% of the configured rate each.
+
+    limiter = get_limiter("gemini")
+    response = limiter.call(llm.invoke, prompt, tokens=estimate_tokens(prompt))
+
+``limiter_metrics()`` reports queue depth, in-flight calls and throttle state
+for every provider, to help size quotas.
+"""
+import asyncio
+import email.utils
+import os
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+import httpx
+
+MISTRAL_REQUESTS_PER_MINUTE = float(os.environ.get("MISTRAL_REQUESTS_PER_MINUTE", 300))
+# OCR has no token count; its second bucket is charged one token per page
+MISTRAL_PAGES_PER_MINUTE = float(os.environ.get("MISTRAL_PAGES_PER_MINUTE", 0))
+GEMINI_REQUESTS_PER_MINUTE = float(os.environ.get("GEMINI_REQUESTS_PER_MINUTE", 60))
+GEMINI_TOKENS_PER_MINUTE = float(os.environ.get("GEMINI_TOKENS_PER_MINUTE", 1_000_000))
+# Seconds of quota that can be spent in one burst
+RATE_LIMIT_BURST_SECONDS = float(os.environ.get("RATE_LIMIT_BURST_SECONDS", 10))
+RATE_LIMIT_RETRIES = int(os.environ.get("RATE_LIMIT_RETRIES", 4))
+RETRY_BASE_SECONDS = float(os.environ.get("RETRY_BASE_SECONDS", 1.0))
+RETRY_MAX_SECONDS = float(os.environ.get("RETRY_MAX_SECONDS", 60))
+
+# Statuses worth retrying; any other HTTP error (bad request, auth, ...) fails at once
+RETRYABLE_STATUSES = {408, 409, 425, 429, 500, 502, 503, 504}
+# Errors without a status worth retrying: timeouts and dropped or refused connections.
+# Anything else without a status (TypeError, KeyError, a bad reply, ...) is a bug or a
+# bad input and fails at once. Google errors carry a status (DeadlineExceeded is 504).
+RETRYABLE_EXCEPTIONS = (TimeoutError, ConnectionError, httpx.TimeoutException, httpx.NetworkError,
+                        httpx.RemoteProtocolError)
+# The refill rate never drops below this share of the configured quota
+MIN_RATE_SCALE = 0.1
+RATE_RECOVERY_STEP = 0.1
+
+
+def error_status(error):
+    """Return the HTTP status of a Mistral (``status_code``) or Google (``code``) error, if any."""
+    for attr in ("status_code", "code"):
+        status = getattr(error, attr, None)
+        if isinstance(status, int):
+            return status
+    return None
+
+
+def retry_after_seconds(error):
+    """Return the delay asked for by the error's ``Retry-After`` header, in seconds, if any."""
+    headers = getattr(error, "headers", None) or getattr(getattr(error, "response", None), "headers", None)
+    value = (headers.get("retry-after") or headers.get("Retry-After")) if headers is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def is_retryable(error) -> bool:
+    """Throttling, transient server errors, timeouts and dropped connections."""
+    status = error_status(error)
+    if status is None:
+        return isinstance(error, RETRYABLE_EXCEPTIONS)
+    return status in RETRYABLE_STATUSES
+
+
+class TokenBucket:
+    """
+    Refills at ``per_minute / 60`` per second up to ``burst_seconds`` worth of quota.
+
+    ``reserve`` always succeeds and may leave the bucket in debt; it returns
+    how long the caller has to wait, so callers are served in arrival order.
+    A ``per_minute`` of 0 means unlimited. Not thread-safe; ``ProviderLimiter``
+    holds the lock.
+    """
+
+    def __init__(self, per_minute, burst_seconds=RATE_LIMIT_BURST_SECONDS):
+        self.per_minute = per_minute
+        self.scale = 1.0
+        self._capacity = max(1.0, per_minute / 60 * burst_seconds)
+        self._level = self._capacity
+        self._updated = time.monotonic()
+
+    @property
+    def rate(self) -> float:
+        return self.per_minute * self.scale / 60
+
+    def _refill(self, now):
+        self._level = min(self._capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def set_scale(self, scale, now):
+        self._refill(now)
+        self.scale = scale
+
+    def reserve(self, amount, now) -> float:
+        if not self.per_minute or not amount:
+            return 0.0
+        self._refill(now)
+        self._level -= amount
+        return max(0.0, -self._level / self.rate)
+
+    def available(self, now) -> float:
+        if not self.per_minute:
+            return float("inf")
+        self._refill(now)
+        return self._level
+
+
+class ProviderLimiter:
+    """Rate limits, throttle state and retry policy for one provider; safe to share between threads."""
+
+    def __init__(self, name, requests_per_minute=0, tokens_per_minute=0, retries=RATE_LIMIT_RETRIES,
+                 base_delay=RETRY_BASE_SECONDS, max_delay=RETRY_MAX_SECONDS,
+                 burst_seconds=RATE_LIMIT_BURST_SECONDS):
+        """
+        Args:
+            name: Provider name used in logs and metrics
+            requests_per_minute: Request quota (0 for unlimited)
+            tokens_per_minute: Token quota (0 for unlimited)
+            retries: Default extra attempts for ``call`` and ``acall``
+            base_delay: First backoff delay in seconds, doubled on every attempt
+            max_delay: Cap on a single backoff delay
+            burst_seconds: Seconds of quota that can be spent at once
+        """
+        self.name = name
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._requests = TokenBucket(requests_per_minute, burst_seconds)
+        self._tokens = TokenBucket(tokens_per_minute, burst_seconds)
+        self._lock = threading.Lock()
+        self._throttled_until = 0.0
+        self._waiting = 0
+        self._in_flight = 0
+        self._stats = {"requests": 0, "tokens": 0, "retries": 0, "rate_limited": 0, "errors": 0, "wait_seconds": 0.0}
+
+    def _reserve(self, requests, tokens):
+        """Take quota; return ``(seconds to wait, whether the caller is queued)``."""
+        with self._lock:
+            now = time.monotonic()
+            self._stats["requests"] += requests
+            self._stats["tokens"] += tokens
+            wait = max(self._requests.reserve(requests, now), self._tokens.reserve(tokens, now))
+            queued = wait > 0 or self._throttled_until > now
+            if queued:
+                self._waiting += 1
+            return wait, queued
+
+    def _throttle_wait(self) -> float:
+        with self._lock:
+            return max(0.0, self._throttled_until - time.monotonic())
+
+    def _dequeue(self, waited, queued):
+        with self._lock:
+            if queued:
+                self._waiting -= 1
+            self._stats["wait_seconds"] += waited
+
+    def _start(self):
+        with self._lock:
+            self._in_flight += 1
+
+    def _finish(self, error=None):
+        with self._lock:
+            self._in_flight -= 1
+            now = time.monotonic()
+            if error is None:
+                scale = min(1.0, self._requests.scale + RATE_RECOVERY_STEP)
+            elif error_status(error) == 429:
+                self._stats["rate_limited"] += 1
+                scale = max(MIN_RATE_SCALE, self._requests.scale / 2)
+                pause = retry_after_seconds(error)
+                self._throttled_until = max(self._throttled_until,
+                                            now + (pause if pause is not None else self.base_delay))
+            else:
+                # Cancellations and interrupts are not provider errors
+                if isinstance(error, Exception):
+                    self._stats["errors"] += 1
+                return
+            self._requests.set_scale(scale, now)
+            self._tokens.set_scale(scale, now)
+
+    @contextmanager
+    def slot(self, requests=1, tokens=0):
+        """
+        Wait for quota, then run the block as one attempt.
+
+        An exception leaving the block is recorded (a 429 throttles the
+        provider) and re-raised; use ``retry_delay`` to decide on a retry.
+        """
+        started = time.monotonic()
+        wait, queued = self._reserve(requests, tokens)
+        try:
+            time.sleep(wait)
+            # Another caller may have hit a 429 while we slept
+            while (pause := self._throttle_wait()) > 0:
+                time.sleep(pause)
+        finally:
+            self._dequeue(time.monotonic() - started, queued)
+        self._start()
+        try:
+            yield
+        except BaseException as e:
+            self._finish(e)
+            raise
+        self._finish()
+
+    @asynccontextmanager
+    async def aslot(self, requests=1, tokens=0):
+        """``slot`` for coroutines; waits with ``asyncio.sleep``."""
+        started = time.monotonic()
+        wait, queued = self._reserve(requests, tokens)
+        try:
+            await asyncio.sleep(wait)
+            while (pause := self._throttle_wait()) > 0:
+                await asyncio.sleep(pause)
+        finally:
+            self._dequeue(time.monotonic() - started, queued)
+        self._start()
+        try:
+            yield
+        except BaseException as e:
+            self._finish(e)
+            raise
+        self._finish()
+
+    def retry_delay(self, error, attempt):
+        """
+        Seconds to wait before retrying after ``attempt`` (1-based) failed with
+        ``error``, or None if the error is not worth retrying.
+        """
+        if not is_retryable(error):
+            return None
+        with self._lock:
+            self._stats["retries"] += 1
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            # Spread out the callers that were all told the same delay
+            return min(self.max_delay, retry_after) + random.uniform(0, self.base_delay)
+        # Full jitter: anywhere between 0 and the exponential backoff cap
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def call(self, fn, *args, requests=1, tokens=0, retries=None, **kwargs):
+        """Call ``fn(*args, **kwargs)`` within the limits, retrying transient failures."""
+        retries = self.retries if retries is None else retries
+        for attempt in range(1, retries + 2):
+            try:
+                with self.slot(requests, tokens):
+                    return fn(*args, **kwargs)
+            except Exception as e:
+                delay = self.retry_delay(e, attempt) if attempt <= retries else None
+                if delay is None:
+                    raise
+                print(f"{self.name} call failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    async def acall(self, make_coro, requests=1, tokens=0, retries=None):
+        """Await ``make_coro()`` within the limits, retrying transient failures."""
+        retries = self.retries if retries is None else retries
+        for attempt in range(1, retries + 2):
+            try:
+                async with self.aslot(requests, tokens):
+                    return await make_coro()
+            except Exception as e:
+                delay = self.retry_delay(e, attempt) if attempt <= retries else None
+                if delay is None:
+                    raise
+                print(f"{self.name} call failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    def snapshot(self) -> dict:
+        """Current queue depth, throttle state, effective quotas and counters."""
+        with self._lock:
+            now = time.monotonic()
+            throttled_for = max(0.0, self._throttled_until - now)
+            return {
+                "provider": self.name,
+                "queue_depth": self._waiting,
+                "in_flight": self._in_flight,
+                "throttled": throttled_for > 0,
+                "throttle_seconds_left": round(throttled_for, 2),
+                "rate_scale": round(self._requests.scale, 2),
+                "requests_per_minute": round(self._requests.per_minute * self._requests.scale, 1),
+                "tokens_per_minute": round(self._tokens.per_minute * self._tokens.scale, 1),
+                "requests_available": round(self._requests.available(now), 1),
+                "tokens_available": round(self._tokens.available(now), 1),
+                **{key: round(value, 2) for key, value in self._stats.items()},
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def _default_limiter(name) -> ProviderLimiter:
+    if name == "mistral":
+        return ProviderLimiter(name, MISTRAL_REQUESTS_PER_MINUTE, MISTRAL_PAGES_PER_MINUTE)
+    if name == "gemini":
+        return ProviderLimiter(name, GEMINI_REQUESTS_PER_MINUTE, GEMINI_TOKENS_PER_MINUTE)
+    return ProviderLimiter(name)
+
+
+def get_limiter(name: str) -> ProviderLimiter:
+    """Return the process-wide limiter for ``name`` ("mistral" or "gemini"), configured from the environment."""
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = _default_limiter(name)
+        return _limiters[name]
+
+
+def limiter_metrics() -> list:
+    """``snapshot()`` of every limiter created so far."""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return [limiter.snapshot() for limiter in limiters]
@@ -0,0 +1,205 @@
+"""
+Per-session store of finished pipeline results, so Streamlit reruns (download
+clicks, widget changes) are served without redoing OCR, classification or
+splitting.
+
+Results are keyed by a SHA-256 of the uploaded PDF. They stay in memory until
+the store holds more than ``max_bytes``; then the least recently used ones are
+spilled to a private temporary directory (PDFs and ZIP as files, OCR pages as
+gzip-compressed JSON) and read back when they are shown again. Spilled results
+beyond ``max_disk_bytes`` are dropped, oldest first. The directory is removed
+when the store is garbage collected, i.e. when the Streamlit session ends.
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from mistralai.models import OCRResponse
+
+from document_state import DocumentState
+
+RESULTS_STORE_MAX_BYTES = int(os.environ.get("RESULTS_STORE_MAX_BYTES", 256 * 1024 * 1024))
+RESULTS_STORE_MAX_DISK_BYTES = int(os.environ.get("RESULTS_STORE_MAX_DISK_BYTES", 2 * 1024 * 1024 * 1024))
+# Parent of the per-session spill directories (default: the system temp dir)
+RESULTS_STORE_DIR = os.environ.get("RESULTS_STORE_DIR") or None
+
+
+def result_key(pdf_bytes: bytes) -> str:
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+@dataclass(slots=True)
+class DocumentResult:
+    """Everything shown for one processed upload."""
+    document: DocumentState
+    ocr_response: OCRResponse
+    categories: dict
+    split_pdfs: dict
+    zip_bytes: bytes = None
+    # Seconds per pipeline stage, when known
+    timings: dict = field(default_factory=dict)
+    # Spill directory holding a copy of this result, if it has been written out
+    spill_path: str = field(default=None, repr=False)
+
+    @property
+    def file_name(self) -> str:
+        return self.document.file_name
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held: PDF, OCR text and images, split PDFs and ZIP."""
+        ocr_bytes = sum(
+            len(page.markdown) + sum(len(img.image_base64 or "") for img in page.images)
+            for page in self.ocr_response.pages
+        )
+        return (len(self.document.pdf_bytes) + ocr_bytes + sum(len(pdf) for pdf in self.split_pdfs.values())
+                + len(self.zip_bytes or b""))
+
+
+class ResultsStore:
+    """LRU store of ``DocumentResult`` objects with a memory cap and spill to disk."""
+
+    def __init__(self, make_zip, max_bytes=RESULTS_STORE_MAX_BYTES, max_disk_bytes=RESULTS_STORE_MAX_DISK_BYTES,
+                 spill_root=RESULTS_STORE_DIR):
+        """
+        Args:
+            make_zip: ``function(split_pdfs) -> bytes`` building a result's ZIP on first request
+            max_bytes: Memory cap for results held in memory
+            max_disk_bytes: Cap for spilled results
+            spill_root: Directory the session's spill directory is created in
+        """
+        self.make_zip = make_zip
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.spill_dir = tempfile.mkdtemp(prefix="results-", dir=spill_root)
+        self._memory = OrderedDict()
+        # key -> bytes on disk, oldest first
+        self._spilled = OrderedDict()
+        # Download callbacks run outside the script thread
+        self._lock = threading.RLock()
+        weakref.finalize(self, shutil.rmtree, self.spill_dir, True)
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._memory or key in self._spilled
+
+    def put(self, key: str, result: DocumentResult) -> None:
+        with self._lock:
+            self._memory[key] = result
+            self._memory.move_to_end(key)
+            self._enforce_limits()
+
+    def discard(self, key: str) -> None:
+        """Forget the result for ``key``, in memory and on disk."""
+        with self._lock:
+            self._memory.pop(key, None)
+            if self._spilled.pop(key, None) is not None:
+                shutil.rmtree(os.path.join(self.spill_dir, key), ignore_errors=True)
+
+    def get(self, key: str):
+        """Return the result for ``key`` (reading it back from disk if spilled), or None."""
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                return result
+            if key not in self._spilled:
+                return None
+            result = self._load(key)
+            self._spilled.move_to_end(key)
+            # Results bigger than the whole cap are served from disk every time
+            if result.nbytes <= self.max_bytes:
+                self._memory[key] = result
+                self._enforce_limits()
+            return result
+
+    def zip_bytes(self, key: str) -> bytes:
+        """The result's ZIP of split PDFs, built once and then kept with the result."""
+        with self._lock:
+            result = self.get(key)
+            if result.zip_bytes is None:
+                result.zip_bytes = self.make_zip(result.split_pdfs)
+                if key in self._spilled:
+                    self._write(os.path.join(result.spill_path, "categorized.zip"), result.zip_bytes)
+                    self._spilled[key] += len(result.zip_bytes)
+                self._enforce_limits()
+            return result.zip_bytes
+
+    def split_pdf(self, key: str, category: str) -> bytes:
+        return self.get(key).split_pdfs[category]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_memory": len(self._memory),
+                "memory_bytes": sum(result.nbytes for result in self._memory.values()),
+                "spilled": len(self._spilled),
+                "disk_bytes": sum(self._spilled.values()),
+            }
+
+    def _enforce_limits(self) -> None:
+        total = sum(result.nbytes for result in self._memory.values())
+        while total > self.max_bytes and self._memory:
+            key, result = self._memory.popitem(last=False)
+            total -= result.nbytes
+            if result.spill_path is None:
+                self._spill(key, result)
+        while sum(self._spilled.values()) > self.max_disk_bytes and self._spilled:
+            key, _ = self._spilled.popitem(last=False)
+            shutil.rmtree(os.path.join(self.spill_dir, key), ignore_errors=True)
+            if key in self._memory:
+                # Still in memory: it is written out again if it gets evicted from there
+                self._memory[key].spill_path = None
+
+    def _spill(self, key: str, result: DocumentResult) -> None:
+        path = os.path.join(self.spill_dir, key)
+        os.makedirs(path, exist_ok=True)
+        size = self._write(os.path.join(path, "document.pdf"), result.document.pdf_bytes)
+        ocr_json = json.dumps(result.ocr_response.model_dump(mode="json", exclude_none=True), separators=(",", ":"))
+        size += self._write(os.path.join(path, "ocr.json.gz"), gzip.compress(ocr_json.encode("utf-8"), 1))
+        categories = list(result.split_pdfs)
+        for index, category in enumerate(categories):
+            size += self._write(os.path.join(path, f"split-{index}.pdf"), result.split_pdfs[category])
+        if result.zip_bytes is not None:
+            size += self._write(os.path.join(path, "categorized.zip"), result.zip_bytes)
+        meta = {"file_name": result.file_name, "categories": result.categories, "split": categories,
+                "timings": result.timings}
+        size += self._write(os.path.join(path, "result.json"), json.dumps(meta).encode("utf-8"))
+        result.spill_path = path
+        self._spilled[key] = size
+
+    def _load(self, key: str) -> DocumentResult:
+        path = os.path.join(self.spill_dir, key)
+        with open(os.path.join(path, "result.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        pdf_bytes = self._read(os.path.join(path, "document.pdf"))
+        ocr_response = OCRResponse.model_validate_json(gzip.decompress(self._read(os.path.join(path, "ocr.json.gz"))))
+        zip_path = os.path.join(path, "categorized.zip")
+        return DocumentResult(
+            document=DocumentState.from_ocr_response(meta["file_name"], pdf_bytes, ocr_response),
+            ocr_response=ocr_response,
+            categories=meta["categories"],
+            split_pdfs={category: self._read(os.path.join(path, f"split-{index}.pdf"))
+                        for index, category in enumerate(meta["split"])},
+            zip_bytes=self._read(zip_path) if os.path.exists(zip_path) else None,
+            timings=meta["timings"],
+            spill_path=path,
+        )
+
+    @staticmethod
+    def _write(path: str, data: bytes) -> int:
+        with open(path, "wb") as f:
+            f.write(data)
+        return len(data)
+
+    @staticmethod
+    def _read(path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
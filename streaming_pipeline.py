@@ -0,0 +1,207 @@
+"""
+Staged pipeline that overlaps OCR, classification and splitting across documents.
+
+Each stage has its own worker threads and hands documents to the next stage
+through a bounded queue, so document N+1 can be OCR'd while document N is
+classified and document N-1 is split. A full queue blocks the stage feeding
+it, which keeps memory bounded when one stage is slower than the others.
+Leaving the ``with`` block cancels whatever is still queued, so a caller that
+stops reading results early doesn't leave the workers blocked.
+
+    with StagedPipeline(ocr_fn, classify_fn) as staged:
+        for job in staged.process(jobs):
+            ...
+"""
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+
+from mistralai.models import OCRResponse
+
+from document_state import DocumentState
+from pipeline import create_zip_from_pdfs, splitPdfBasedOnCategories
+from tracing import trace
+
+PIPELINE_OCR_WORKERS = int(os.environ.get("PIPELINE_OCR_WORKERS", 4))
+PIPELINE_CLASSIFY_WORKERS = int(os.environ.get("PIPELINE_CLASSIFY_WORKERS", 4))
+PIPELINE_SPLIT_WORKERS = int(os.environ.get("PIPELINE_SPLIT_WORKERS", 2))
+PIPELINE_QUEUE_SIZE = int(os.environ.get("PIPELINE_QUEUE_SIZE", 4))
+# Longest __exit__ waits for jobs already inside a stage to finish after a cancel
+PIPELINE_EXIT_TIMEOUT_SECONDS = float(os.environ.get("PIPELINE_EXIT_TIMEOUT_SECONDS", 30))
+# How often blocked queue operations check for a cancel
+_POLL_SECONDS = 0.1
+
+_DONE = object()
+
+
+@dataclass
+class PipelineJob:
+    """One document moving through the pipeline, filled in stage by stage."""
+    job_id: str
+    file_name: str
+    pdf_bytes: bytes
+    ocr_response: OCRResponse | None = None
+    document: DocumentState | None = None
+    categories: dict | None = None
+    split_pdfs: dict | None = None
+    zip_bytes: bytes | None = None
+    error: str | None = None
+    timings: dict = field(default_factory=dict)
+
+
+class StagedPipeline:
+    """OCR -> classify -> split/zip stages joined by bounded queues."""
+
+    def __init__(self, ocr_fn, classify_fn, split_fn=splitPdfBasedOnCategories, zip_fn=create_zip_from_pdfs,
+                 ocr_workers=PIPELINE_OCR_WORKERS, classify_workers=PIPELINE_CLASSIFY_WORKERS,
+                 split_workers=PIPELINE_SPLIT_WORKERS, queue_size=PIPELINE_QUEUE_SIZE):
+        """
+        Args:
+            ocr_fn: ``function(pdf_bytes, file_name) -> OCRResponse``
+            classify_fn: ``function(DocumentState) -> {category: [pages]}``
+            split_fn: ``function(categories, pdf_bytes) -> {category: pdf_bytes}``
+            zip_fn: ``function(split_pdfs) -> bytes``, or None to skip the ZIP
+            ocr_workers, classify_workers, split_workers: Threads per stage
+            queue_size: Capacity of each queue between stages
+        """
+        self._stages = [
+            ("ocr", self._ocr, max(1, ocr_workers)),
+            ("classify", self._classify, max(1, classify_workers)),
+            ("split", self._split, max(1, split_workers)),
+        ]
+        self._ocr_fn = ocr_fn
+        self._classify_fn = classify_fn
+        self._split_fn = split_fn
+        self._zip_fn = zip_fn
+        self._queues = [queue.Queue(maxsize=max(1, queue_size)) for _ in self._stages]
+        self._results = queue.Queue(maxsize=max(1, queue_size))
+        self._threads = []
+        self._lock = threading.Lock()
+        self._running = {}
+        self._cancelled = threading.Event()
+        self._feed_error = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        # Workers of a drained pipeline have already exited; anything else is abandoned
+        self.cancel()
+        deadline = time.monotonic() + PIPELINE_EXIT_TIMEOUT_SECONDS
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+    def start(self) -> None:
+        """Start the worker threads of every stage."""
+        for position, (name, func, workers) in enumerate(self._stages):
+            self._running[name] = workers
+            for worker in range(workers):
+                thread = threading.Thread(
+                    target=self._work, args=(position,), name=f"pipeline-{name}-{worker}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, job: PipelineJob) -> None:
+        """Queue a document for OCR; blocks while the OCR queue is full (until cancelled)."""
+        self._put(self._queues[0], job)
+
+    def close(self) -> None:
+        """Signal that no more documents will be submitted."""
+        for _ in range(self._stages[0][2]):
+            self._put(self._queues[0], _DONE)
+
+    def cancel(self) -> None:
+        """
+        Stop the pipeline: queued jobs are dropped and workers exit once their
+        current job is done. Unread results are discarded.
+        """
+        self._cancelled.set()
+
+    def results(self):
+        """
+        Yield finished (or failed) jobs in completion order until the pipeline drains,
+        then re-raise the exception that stopped ``process`` feeding its jobs, if any.
+        """
+        while (job := self._get(self._results)) is not _DONE:
+            yield job
+        if self._feed_error is not None:
+            raise self._feed_error
+
+    def process(self, jobs):
+        """Feed ``jobs`` from a background thread and yield them as they finish."""
+        def feed():
+            try:
+                for job in jobs:
+                    if self._cancelled.is_set():
+                        break
+                    self.submit(job)
+            except Exception as e:
+                self._feed_error = e
+            finally:
+                self.close()
+
+        threading.Thread(target=feed, name="pipeline-feed", daemon=True).start()
+        yield from self.results()
+
+    def _put(self, q: queue.Queue, item) -> bool:
+        """``q.put(item)``, giving up (and returning False) once the pipeline is cancelled."""
+        while not self._cancelled.is_set():
+            try:
+                q.put(item, timeout=_POLL_SECONDS)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _get(self, q: queue.Queue):
+        """``q.get()``, returning ``_DONE`` once the pipeline is cancelled."""
+        while not self._cancelled.is_set():
+            try:
+                return q.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                pass
+        return _DONE
+
+    def _work(self, position: int) -> None:
+        name, func, _ = self._stages[position]
+        inbox = self._queues[position]
+        is_last = position == len(self._stages) - 1
+        outbox = self._results if is_last else self._queues[position + 1]
+
+        while (job := self._get(inbox)) is not _DONE:
+            if job.error is None:
+                started = time.perf_counter()
+                try:
+                    # Spans from every stage of a job share its trace id
+                    with trace(job.job_id):
+                        func(job)
+                except Exception as e:
+                    job.error = f"{name}: {type(e).__name__}: {e}"
+                    print(f"❌ {job.file_name} failed in {name} stage: {e}")
+                job.timings[name] = time.perf_counter() - started
+            # Failed jobs still flow downstream (untouched) so callers see them
+            if not self._put(outbox, job):
+                break
+
+        with self._lock:
+            self._running[name] -= 1
+            last_worker = self._running[name] == 0
+        if last_worker:
+            for _ in range(1 if is_last else self._stages[position + 1][2]):
+                self._put(outbox, _DONE)
+
+    def _ocr(self, job: PipelineJob) -> None:
+        job.ocr_response = self._ocr_fn(job.pdf_bytes, job.file_name)
+        job.document = DocumentState.from_ocr_response(job.file_name, job.pdf_bytes, job.ocr_response)
+
+    def _classify(self, job: PipelineJob) -> None:
+        job.categories = self._classify_fn(job.document)
+
+    def _split(self, job: PipelineJob) -> None:
+        job.split_pdfs = self._split_fn(job.categories, job.pdf_bytes)
+        if self._zip_fn is not None and job.split_pdfs:
+            job.zip_bytes = self._zip_fn(job.split_pdfs)
@@ -0,0 +1,35 @@
+"""
+Response model for structured image OCR (``client.chat.parse``).
+
+The ``Language`` enum has a member for every ISO 639-1 language in pycountry,
+so the model is built on first use instead of at import time.
+"""
+from enum import Enum
+from functools import lru_cache
+
+from pydantic import BaseModel
+
+
+@lru_cache(maxsize=None)
+def structured_ocr_model() -> type[BaseModel]:
+    """Return the ``StructuredOCR`` pydantic model, building it (and ``Language``) once."""
+    import pycountry
+
+    languages = {lang.alpha_2: lang.name for lang in pycountry.languages if hasattr(lang, 'alpha_2')}
+
+    class LanguageMeta(Enum.__class__):
+        def __new__(metacls, cls, bases, classdict):
+            for code, name in languages.items():
+                classdict[name.upper().replace(' ', '_')] = name
+            return super().__new__(metacls, cls, bases, classdict)
+
+    class Language(Enum, metaclass=LanguageMeta):
+        pass
+
+    class StructuredOCR(BaseModel):
+        file_name: str
+        topics: list[str]
+        languages: list[Language]
+        ocr_contents: dict
+
+    return StructuredOCR
@@ -0,0 +1,142 @@
+"""
+Text-layer triage: answer born-digital pages from the PDF's own text instead of OCR.
+
+Resumes, SOPs and letters are usually exported straight to PDF and carry a
+clean text layer; scans carry none, or a garbled one. Each page's text is
+extracted with PyPDF2 and scored:
+
+* density: at least ``TEXT_LAYER_MIN_CHARS`` non-space characters, and
+* quality: at least ``TEXT_LAYER_MIN_QUALITY`` of its characters ordinary text
+  characters and of its tokens words or numbers, with no undecodable glyphs
+  (``(cid:12)``, U+FFFD).
+
+Pages passing both become ``OCRPageObject`` results whose markdown is the
+extracted text (and which have no images); only the other pages are copied
+into a smaller PDF and sent to Mistral. ``with_text_layer(runner)`` wraps any
+OCR runner with the ``ocr.process_pdf`` runner signature, so caches, chunking
+and the async services work unchanged.
+"""
+import os
+import re
+import string
+import time
+import unicodedata
+from dataclasses import dataclass
+from io import BytesIO
+
+from mistralai.models import OCRPageDimensions, OCRPageObject, OCRResponse, OCRUsageInfo
+from PyPDF2 import PdfReader
+
+from ocr import OCR_MODEL, pages_pdf
+from tracing import trace_span
+
+# "1" answers born-digital pages from their text layer, "0" sends every page to OCR
+TEXT_LAYER_TRIAGE = os.environ.get("TEXT_LAYER_TRIAGE", "1") == "1"
+TEXT_LAYER_MIN_CHARS = int(os.environ.get("TEXT_LAYER_MIN_CHARS", 200))
+TEXT_LAYER_MIN_QUALITY = float(os.environ.get("TEXT_LAYER_MIN_QUALITY", 0.8))
+
+# Words (with inner hyphens, apostrophes or dots) and numbers (with separators)
+_TOKEN_RE = re.compile(r"[^\W\d_]+(?:[-'.][^\W\d_]+)*|\d+(?:[.,/:-]\d+)*")
+# Glyphs PyPDF2 could not map to text
+_UNDECODABLE_RE = re.compile(r"\(cid:\d+\)|\ufffd")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+
+@dataclass(slots=True)
+class PageTriage:
+    """Verdict on one page's text layer."""
+    index: int
+    chars: int
+    quality: float
+    needs_ocr: bool
+    text: str = ""
+
+
+def text_quality(text: str) -> float:
+    """
+    Score extracted text from 0 (garbage) to 1 (clean text).
+
+    The lower of two fractions: characters that are letters, digits,
+    punctuation or math and currency signs (symbol fonts and broken encodings
+    produce other glyphs), and tokens that read as words or numbers once
+    surrounding punctuation is stripped (table rules and bullets don't count).
+    """
+    if _UNDECODABLE_RE.search(text):
+        return 0.0
+    chars = [ch for ch in text if not ch.isspace()]
+    tokens = [token for token in (token.strip(string.punctuation) for token in text.split()) if token]
+    if not chars or not tokens:
+        return 0.0
+    clean = sum(1 for ch in chars if unicodedata.category(ch)[0] in "LNP"
+                or unicodedata.category(ch) in ("Sm", "Sc")) / len(chars)
+    wordlike = sum(1 for token in tokens if _TOKEN_RE.fullmatch(token)) / len(tokens)
+    return min(clean, wordlike)
+
+
+def triage_page(page, index: int, min_chars=TEXT_LAYER_MIN_CHARS, min_quality=TEXT_LAYER_MIN_QUALITY):
+    """Extract a PyPDF2 page's text and decide whether the page needs OCR."""
+    try:
+        text = page.extract_text() or ""
+    except Exception:
+        # Broken content streams and exotic fonts: let OCR read the page
+        text = ""
+    chars = sum(1 for ch in text if not ch.isspace())
+    quality = text_quality(text)
+    needs_ocr = chars < min_chars or quality < min_quality
+    return PageTriage(index, chars, quality, needs_ocr, "" if needs_ocr else text)
+
+
+def text_page(triage: PageTriage, page) -> OCRPageObject:
+    """The OCR result for a page answered from its text layer."""
+    lines = [line.rstrip() for line in triage.text.splitlines()]
+    markdown = _BLANK_LINES_RE.sub("\n\n", "\n".join(lines)).strip()
+    return OCRPageObject(
+        index=triage.index,
+        markdown=markdown,
+        images=[],
+        # PDF user space is 72 units per inch
+        dimensions=OCRPageDimensions(dpi=72, height=int(page.mediabox.height), width=int(page.mediabox.width)),
+    )
+
+
+def with_text_layer(runner, min_chars=TEXT_LAYER_MIN_CHARS, min_quality=TEXT_LAYER_MIN_QUALITY):
+    """
+    Wrap an OCR ``runner`` so it only OCRs pages without a usable text layer.
+
+    Args:
+        runner: Function with the ``ocr.run_ocr`` signature doing the actual OCR
+        min_chars: Fewest non-space characters a page's text layer needs
+        min_quality: Lowest ``text_quality`` a page's text layer needs
+
+    Returns:
+        Runner with the same signature; ``usage_info.pages_processed`` of its
+        responses counts only the pages that went to OCR
+    """
+    def run(client, pdf_bytes, file_name, model=OCR_MODEL, include_images=True):
+        with trace_span("text_layer_triage", file_name=file_name) as span:
+            started = time.perf_counter()
+            pdf_reader = PdfReader(BytesIO(pdf_bytes))
+            verdicts = [triage_page(page, index, min_chars, min_quality)
+                        for index, page in enumerate(pdf_reader.pages)]
+            scanned = [verdict.index for verdict in verdicts if verdict.needs_ocr]
+            span.set(pages=len(verdicts), pages_text=len(verdicts) - len(scanned), pages_scanned=len(scanned),
+                     triage_seconds=round(time.perf_counter() - started, 3))
+        if len(scanned) == len(verdicts):
+            return runner(client, pdf_bytes, file_name, model=model, include_images=include_images)
+
+        pages = {verdict.index: text_page(verdict, pdf_reader.pages[verdict.index])
+                 for verdict in verdicts if not verdict.needs_ocr}
+        pages_processed = 0
+        if scanned:
+            partial_response = runner(client, pages_pdf(pdf_reader, scanned), file_name, model=model,
+                                      include_images=include_images)
+            for page in partial_response.pages:
+                pages[scanned[page.index]] = page.model_copy(update={"index": scanned[page.index]})
+            pages_processed = partial_response.usage_info.pages_processed
+
+        return OCRResponse(
+            pages=[pages[page_num] for page_num in sorted(pages)],
+            model=model,
+            usage_info=OCRUsageInfo(pages_processed=pages_processed, doc_size_bytes=len(pdf_bytes)),
+        )
+    return run
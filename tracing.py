@@ -0,0 +1,263 @@
+"""
+Structured tracing for the OCR -> classify -> split pipeline.
+
+Each pipeline step runs inside a span that records wall time, bytes in/out,
+page counts and LLM token usage:
+
+    with trace_span("process_pdf", file_name=file_name, bytes_in=len(pdf_bytes)) as span:
+        response = ...
+        span.set(pages=len(response.pages))
+
+Finished spans are
+* logged as one size-bounded JSON line (``TRACE_LOG=0`` turns this off),
+* appended to ``TRACE_JSONL_PATH`` as JSON lines, if set,
+* aggregated per span name into Prometheus-style metrics (``prometheus_text()``),
+  rewritten to ``PROMETHEUS_TEXTFILE_PATH`` whenever a root span ends, if set.
+
+Spans nest through ``contextvars``; token counts of child spans (e.g. each
+Gemini request) are added to their parent. Work handed to other threads keeps
+its parent when run with ``contextvars.copy_context().run``.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+TRACE_LOG = os.environ.get("TRACE_LOG", "1") == "1"
+TRACE_JSONL_PATH = os.environ.get("TRACE_JSONL_PATH", "")
+PROMETHEUS_TEXTFILE_PATH = os.environ.get("PROMETHEUS_TEXTFILE_PATH", "")
+# Longest string, and most list items, a log record keeps per field
+LOG_FIELD_MAX_CHARS = int(os.environ.get("LOG_FIELD_MAX_CHARS", 300))
+LOG_FIELD_MAX_ITEMS = 20
+
+# Numeric attributes summed into Prometheus counters, and rolled up into the parent span
+COUNTED_FIELDS = ("bytes_in", "bytes_out", "pages", "tokens_in", "tokens_out")
+ROLLUP_FIELDS = ("tokens_in", "tokens_out")
+SECONDS_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+def _bounded(value, max_chars=LOG_FIELD_MAX_CHARS):
+    """Return ``value`` with long strings cut and long lists/dicts shortened, for logging."""
+    if isinstance(value, str):
+        return value if len(value) <= max_chars else f"{value[:max_chars]}…(+{len(value) - max_chars} chars)"
+    if isinstance(value, (bytes, bytearray)):
+        return f"<{len(value)} bytes>"
+    if isinstance(value, dict):
+        items = list(value.items())
+        bounded = {str(key): _bounded(item, max_chars) for key, item in items[:LOG_FIELD_MAX_ITEMS]}
+        if len(items) > LOG_FIELD_MAX_ITEMS:
+            bounded["…"] = f"+{len(items) - LOG_FIELD_MAX_ITEMS} more"
+        return bounded
+    if isinstance(value, (list, tuple, set)):
+        items = list(value)
+        bounded = [_bounded(item, max_chars) for item in items[:LOG_FIELD_MAX_ITEMS]]
+        if len(items) > LOG_FIELD_MAX_ITEMS:
+            bounded.append(f"…+{len(items) - LOG_FIELD_MAX_ITEMS} more")
+        return bounded
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    return _bounded(repr(value), max_chars)
+
+
+def log_event(event: str, **fields) -> None:
+    """Print one JSON log record; every field is size-bounded."""
+    print(json.dumps({"event": event, **{key: _bounded(value) for key, value in fields.items()}},
+                     ensure_ascii=False))
+
+
+class Span:
+    """One timed pipeline step and its attributes."""
+
+    def __init__(self, name, trace_id, parent=None, **attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent = parent
+        self.attributes = attributes
+        self.started_at = time.time()
+        self.seconds = None
+        self.error = None
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def set(self, **attributes) -> None:
+        with self._lock:
+            self.attributes.update(attributes)
+
+    def add(self, **counts) -> None:
+        """Add to numeric attributes (missing ones start at 0)."""
+        with self._lock:
+            for key, value in counts.items():
+                self.attributes[key] = self.attributes.get(key, 0) + value
+
+    def record(self) -> dict:
+        return {
+            "span": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent is not None else None,
+            "start": round(self.started_at, 3),
+            "seconds": round(self.seconds, 4) if self.seconds is not None else None,
+            "error": self.error,
+            **self.attributes,
+        }
+
+
+class PrometheusMetrics:
+    """Per-span-name counters and a latency histogram, rendered in the Prometheus text format."""
+
+    def __init__(self, buckets=SECONDS_BUCKETS):
+        self.buckets = buckets
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def observe(self, span: Span) -> None:
+        with self._lock:
+            stage = self._stages.setdefault(span.name, {
+                "count": 0, "errors": 0, "seconds": 0.0, "buckets": [0] * len(self.buckets),
+                **{field: 0 for field in COUNTED_FIELDS},
+            })
+            stage["count"] += 1
+            stage["errors"] += span.error is not None
+            stage["seconds"] += span.seconds
+            for i, bound in enumerate(self.buckets):
+                stage["buckets"][i] += span.seconds <= bound
+            for field in COUNTED_FIELDS:
+                value = span.attributes.get(field)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    stage[field] += value
+
+    def snapshot(self) -> dict:
+        """``{span name: {count, errors, seconds, bytes_in, ...}}`` (without histogram buckets)."""
+        with self._lock:
+            return {name: {key: value for key, value in stage.items() if key != "buckets"}
+                    for name, stage in self._stages.items()}
+
+    def render(self, limiter_snapshots=()) -> str:
+        with self._lock:
+            stages = {name: {**stage, "buckets": list(stage["buckets"])} for name, stage in self._stages.items()}
+        lines = [
+            "# HELP pipeline_stage_seconds Wall time of pipeline stages.",
+            "# TYPE pipeline_stage_seconds histogram",
+        ]
+        for name, stage in sorted(stages.items()):
+            for bound, count in zip(self.buckets, stage["buckets"]):
+                lines.append(f'pipeline_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+            lines.append(f'pipeline_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {stage["count"]}')
+            lines.append(f'pipeline_stage_seconds_sum{{stage="{name}"}} {stage["seconds"]:.6f}')
+            lines.append(f'pipeline_stage_seconds_count{{stage="{name}"}} {stage["count"]}')
+        counters = [("errors", "pipeline_stage_errors_total", "Stage runs that raised.")]
+        counters += [(field, f"pipeline_stage_{field}_total", f"Sum of {field} over stage runs.")
+                     for field in COUNTED_FIELDS]
+        for field, metric, help_text in counters:
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+            lines += [f'{metric}{{stage="{name}"}} {stage[field]}' for name, stage in sorted(stages.items())]
+        gauges = [("queue_depth", "Callers waiting for provider quota."),
+                  ("in_flight", "Provider calls in progress."),
+                  ("throttled", "1 while the provider is paused after a 429."),
+                  ("rate_scale", "Share of the configured quota currently used.")]
+        for field, help_text in gauges if limiter_snapshots else ():
+            metric = f"provider_{field}"
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} gauge"]
+            lines += [f'{metric}{{provider="{s["provider"]}"}} {float(s[field])}' for s in limiter_snapshots]
+        return "\n".join(lines) + "\n"
+
+
+class Tracer:
+    """Collects finished spans and sends them to the log, a JSONL file and the metrics."""
+
+    def __init__(self, jsonl_path=TRACE_JSONL_PATH, prometheus_path=PROMETHEUS_TEXTFILE_PATH, log=TRACE_LOG):
+        self.jsonl_path = jsonl_path
+        self.prometheus_path = prometheus_path
+        self.log = log
+        self.metrics = PrometheusMetrics()
+        self._write_lock = threading.Lock()
+
+    def finish(self, span: Span) -> None:
+        self.metrics.observe(span)
+        record = span.record()
+        if self.log:
+            log_event("span", **record)
+        if self.jsonl_path:
+            line = json.dumps({key: _bounded(value) for key, value in record.items()}, ensure_ascii=False)
+            with self._write_lock, open(self.jsonl_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        if self.prometheus_path and span.parent is None:
+            self.write_prometheus(self.prometheus_path)
+
+    def prometheus_text(self) -> str:
+        from rate_limiter import limiter_metrics
+        return self.metrics.render(limiter_metrics())
+
+    def write_prometheus(self, path: str) -> None:
+        """Atomically replace ``path`` with the current metrics (node_exporter textfile format)."""
+        text = self.prometheus_text()
+        with self._write_lock:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def prometheus_text() -> str:
+    """Current stage and provider metrics in the Prometheus text format."""
+    return _tracer.prometheus_text()
+
+
+def stage_metrics() -> dict:
+    """Aggregated ``{span name: {count, errors, seconds, bytes_in, ...}}`` so far."""
+    return _tracer.metrics.snapshot()
+
+
+@contextmanager
+def trace(trace_id=None):
+    """Group the spans started inside the block under ``trace_id`` (e.g. a job id)."""
+    token = _current_trace.set(trace_id or uuid.uuid4().hex[:16])
+    try:
+        yield
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def trace_span(name: str, **attributes):
+    """
+    Time the block as a span named ``name``; yields the ``Span`` so the block can
+    ``set``/``add`` attributes. Exceptions are recorded on the span and re-raised.
+    """
+    parent = _current_span.get()
+    trace_id = parent.trace_id if parent is not None else _current_trace.get() or uuid.uuid4().hex[:16]
+    span = Span(name, trace_id, parent, **attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        span.seconds = time.perf_counter() - span._started
+        if parent is not None:
+            rollup = {field: span.attributes[field] for field in ROLLUP_FIELDS
+                      if isinstance(span.attributes.get(field), (int, float))}
+            if rollup:
+                parent.add(**rollup)
+        _tracer.finish(span)
+
+
+def current_span():
+    """The innermost open span in this context, or None."""
+    return _current_span.get()
@@ -0,0 +1,136 @@
+"""
+Map-reduce page classification for documents that don't fit in one LLM prompt.
+
+Pages are packed into token-budgeted windows that overlap by a few pages, the
+windows are classified concurrently, and the per-page labels are merged back
+into the ``{category: [pages]}`` shape used by ``splitPdfBasedOnCategories``.
+
+A page seen by several windows keeps the label from the window where it sits
+furthest from an edge (it had the most surrounding context there); remaining
+ties prefer a real category over "unknown", then the earlier window.
+"""
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from classification import CATEGORIES, classify_pages, estimate_tokens, mark_fallback_labels
+from page_features import PROMPT_COMPACTION, compact_page_data
+
+CLASSIFY_WINDOW_TOKENS = int(os.environ.get("CLASSIFY_WINDOW_TOKENS", 30000))
+CLASSIFY_WINDOW_OVERLAP = int(os.environ.get("CLASSIFY_WINDOW_OVERLAP", 1))
+CLASSIFY_CONCURRENCY = int(os.environ.get("CLASSIFY_CONCURRENCY", 4))
+
+
+def build_windows(page_data: dict, max_tokens=CLASSIFY_WINDOW_TOKENS, overlap=CLASSIFY_WINDOW_OVERLAP) -> list:
+    """
+    Pack pages into windows of at most ``max_tokens`` estimated tokens.
+
+    Args:
+        page_data: ``{page_index: {"markdown": ...}}``
+        max_tokens: Token budget for the page data of one window
+        overlap: Number of pages from the end of one window repeated at the start
+            of the next
+
+    Returns:
+        List of windows, each a list of page indices in document order
+    """
+    page_nums = sorted(page_data)
+    sizes = {page_num: estimate_tokens(page_data[page_num]["markdown"]) for page_num in page_nums}
+
+    windows = []
+    start = 0
+    while start < len(page_nums):
+        # Lead in with up to ``overlap`` pages from the previous window for context
+        window = page_nums[max(0, start - overlap):start]
+        used = sum(sizes[page_num] for page_num in window)
+        end = start
+        # Always take at least one new page, even if it alone exceeds the budget
+        while end < len(page_nums) and (end == start or used + sizes[page_nums[end]] <= max_tokens):
+            used += sizes[page_nums[end]]
+            end += 1
+        windows.append(window + page_nums[start:end])
+        start = end
+    return windows
+
+
+def _edge_distance(window: list, page_num) -> int:
+    position = window.index(page_num)
+    return min(position, len(window) - 1 - position)
+
+
+def merge_window_labels(windows: list, window_results: list) -> dict:
+    """
+    Merge per-window ``{category: [pages]}`` results into one document result.
+
+    Args:
+        windows: Page indices of each window
+        window_results: Parsed classification of each window, in the same order
+
+    Returns:
+        ``{category: [pages]}`` with every page of every window labelled once
+    """
+    best = {}
+    for window_index, (window, result) in enumerate(zip(windows, window_results)):
+        in_window = set(window)
+        for category, pages in result.items():
+            for page_num in pages:
+                if page_num not in in_window:
+                    # The model answered for a page it wasn't shown
+                    continue
+                rank = (_edge_distance(window, page_num), category != "unknown", -window_index)
+                if page_num not in best or rank > best[page_num][0]:
+                    best[page_num] = (rank, category)
+
+    unanswered = [page_num for window in windows for page_num in window if page_num not in best]
+    mark_fallback_labels(unanswered)
+    for page_num in unanswered:
+        best.setdefault(page_num, ((0, False, 0), "unknown"))
+
+    categories = {category: [] for category in CATEGORIES}
+    for page_num in sorted(best):
+        categories.setdefault(best[page_num][1], []).append(page_num)
+    return categories
+
+
+def classify_windowed(llm, page_data: dict, max_tokens=CLASSIFY_WINDOW_TOKENS,
+                      overlap=CLASSIFY_WINDOW_OVERLAP, concurrency=CLASSIFY_CONCURRENCY, on_label=None,
+                      compact=PROMPT_COMPACTION) -> dict:
+    """
+    Classify pages window by window and merge the labels.
+
+    Args:
+        llm: LangChain chat model
+        page_data: ``{page_index: {"markdown": ...}}``
+        max_tokens: Token budget for the page data of one window
+        overlap: Pages shared between neighbouring windows
+        concurrency: Maximum number of windows classified at once
+        on_label: Optional ``callback(page_index, category)``, called from this thread
+            as labels stream in for a single window, or once the windows are merged
+        compact: Send ``page_features.compact_page`` summaries instead of the full
+            markdown (windows are then sized by the summaries)
+
+    Returns:
+        ``{category: [pages]}`` for the whole document
+    """
+    if compact:
+        page_data = compact_page_data(page_data)
+    windows = build_windows(page_data, max_tokens=max_tokens, overlap=overlap)
+    if len(windows) == 1:
+        return classify_pages(llm, page_data, on_label=on_label)
+
+    print(f"Classifying {len(page_data)} pages in {len(windows)} windows")
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        # Each window runs in a copy of this context so its Gemini spans nest under the caller's
+        futures = [
+            pool.submit(contextvars.copy_context().run, classify_pages, llm,
+                        {page_num: page_data[page_num] for page_num in window})
+            for window in windows
+        ]
+        window_results = [future.result() for future in futures]
+    categories = merge_window_labels(windows, window_results)
+    if on_label is not None:
+        # Overlapping windows can disagree, so labels are only final after the merge
+        for category, pages in categories.items():
+            for page_num in pages:
+                on_label(page_num, category)
+    return categories
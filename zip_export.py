@@ -0,0 +1,172 @@
+"""
+Streaming ZIP export for split PDFs.
+
+PDFs are mostly compressed already (DCT images, Flate content streams), so
+deflating them costs CPU for almost no size gain. Each entry is probed with a
+fast zlib pass over its first bytes and stored unless compression saves at
+least ``ZIP_MIN_SAVING``. Entries are written as they are produced, to a file
+or to a generator of chunks for downloads, so the archive is never held in
+memory alongside every split PDF.
+"""
+import os
+import time
+import zipfile
+import zlib
+from io import RawIOBase
+
+from pdf_splitter import iter_split_pdf, split_pdf
+
+# "auto" probes each entry, "store" never compresses, "deflate" always does
+ZIP_COMPRESSION = os.environ.get("ZIP_COMPRESSION", "auto")
+ZIP_PROBE_BYTES = int(os.environ.get("ZIP_PROBE_BYTES", 256 * 1024))
+ZIP_MIN_SAVING = float(os.environ.get("ZIP_MIN_SAVING", 0.1))
+ZIP_CHUNK_SIZE = int(os.environ.get("ZIP_CHUNK_SIZE", 1024 * 1024))
+
+
+def choose_compression(sample: bytes, mode=ZIP_COMPRESSION) -> int:
+    """Return ``ZIP_STORED`` or ``ZIP_DEFLATED`` for an entry starting with ``sample``."""
+    if mode == "store":
+        return zipfile.ZIP_STORED
+    if mode == "deflate":
+        return zipfile.ZIP_DEFLATED
+    if not sample:
+        return zipfile.ZIP_STORED
+    sample = sample[:ZIP_PROBE_BYTES]
+    saving = 1 - len(zlib.compress(sample, 1)) / len(sample)
+    return zipfile.ZIP_DEFLATED if saving >= ZIP_MIN_SAVING else zipfile.ZIP_STORED
+
+
+class _ProbingEntry:
+    """
+    Writable ZIP entry that buffers its first ``ZIP_PROBE_BYTES`` to pick the
+    compression, then streams the rest straight into the archive.
+    """
+
+    def __init__(self, zip_file: zipfile.ZipFile, name: str, mode=ZIP_COMPRESSION):
+        self._zip_file = zip_file
+        self._name = name
+        self._mode = mode
+        self._head = bytearray()
+        self._entry = None
+        self._position = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, data) -> int:
+        self._position += len(data)
+        if self._entry is not None:
+            return self._entry.write(data)
+        self._head += data
+        if len(self._head) >= ZIP_PROBE_BYTES or self._mode != "auto":
+            self._open()
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def close(self) -> None:
+        if self._entry is None:
+            self._open()
+        self._entry.close()
+
+    def _open(self) -> None:
+        info = zipfile.ZipInfo(self._name, date_time=time.localtime()[:6])
+        info.compress_type = choose_compression(bytes(self._head), self._mode)
+        self._entry = self._zip_file.open(info, "w")
+        self._entry.write(self._head)
+        self._head = bytearray()
+
+
+def zip_sink(zip_file: zipfile.ZipFile, mode=ZIP_COMPRESSION):
+    """``open_output`` for ``pdf_splitter.split_pdf`` writing ``<category>.pdf`` entries."""
+    return lambda category: _ProbingEntry(zip_file, f"{category}.pdf", mode)
+
+
+def write_zip(entries, target, mode=ZIP_COMPRESSION) -> None:
+    """
+    Write ``(name, bytes)`` entries to a ZIP.
+
+    Args:
+        entries: Iterable of ``(name, bytes)``, consumed lazily
+        target: Path or writable binary file object
+        mode: "auto", "store" or "deflate"
+    """
+    with zipfile.ZipFile(target, "w") as zip_file:
+        for name, data in entries:
+            with _ProbingEntry(zip_file, name, mode) as entry:
+                entry.write(data)
+
+
+def write_split_zip(documentsData: dict, source, target, mode=ZIP_COMPRESSION):
+    """Split ``source`` by category straight into a ZIP at ``target``; returns the ``SplitReport``."""
+    with zipfile.ZipFile(target, "w") as zip_file:
+        return split_pdf(documentsData, source, zip_sink(zip_file, mode))
+
+
+class _ChunkBuffer(RawIOBase):
+    """Unseekable sink collecting the archive bytes until the generator hands them out."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._size += len(data)
+        return len(data)
+
+    def drain(self, chunk_size: int = 0):
+        """Yield buffered bytes in ``chunk_size`` pieces and keep the short remainder (0: yield it all)."""
+        if not self._size or self._size < chunk_size:
+            return
+        data = b"".join(self._chunks)
+        end = len(data) - len(data) % chunk_size if chunk_size else len(data)
+        step = chunk_size or end
+        self._chunks = [data[end:]]
+        self._size = len(data) - end
+        for offset in range(0, end, step):
+            yield data[offset:offset + step]
+
+
+def _iter_chunks(add_entries, chunk_size):
+    buffer = _ChunkBuffer()
+    zip_file = zipfile.ZipFile(buffer, "w")
+    for _ in add_entries(zip_file):
+        yield from buffer.drain(chunk_size)
+    # Closing writes the central directory
+    zip_file.close()
+    yield from buffer.drain(0)
+
+
+def iter_zip_chunks(entries, mode=ZIP_COMPRESSION, chunk_size=ZIP_CHUNK_SIZE):
+    """
+    Yield a ZIP of ``(name, bytes)`` entries as ``chunk_size`` byte chunks.
+
+    At most about one entry plus one chunk is buffered at a time.
+    """
+    def add_entries(zip_file):
+        for name, data in entries:
+            with _ProbingEntry(zip_file, name, mode) as entry:
+                entry.write(data)
+            yield
+
+    return _iter_chunks(add_entries, chunk_size)
+
+
+def iter_split_zip(documentsData: dict, source, mode=ZIP_COMPRESSION, chunk_size=ZIP_CHUNK_SIZE):
+    """Yield a ZIP of the split PDFs in chunks, splitting each category only when it is needed."""
+    def add_entries(zip_file):
+        for category, writer in iter_split_pdf(documentsData, source):
+            with _ProbingEntry(zip_file, f"{category}.pdf", mode) as entry:
+                writer.write(entry)
+            yield
+
+    return _iter_chunks(add_entries, chunk_size)